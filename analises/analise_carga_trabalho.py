@@ -0,0 +1,228 @@
+"""
+Módulo de análises de carga de trabalho da equipe
+(Medico Dimettente e Operatore Triagista)
+
+Os profissionais são codificados como inteiros uma única vez e todas as
+contagens saem de bincount sobre códigos combinados, de modo que o custo
+não cresce com o número de profissionais distintos.
+
+A carga por turno depende do horário de 'Data Accesso'; quando os
+arquivos trazem apenas a data, ela não é calculada.
+"""
+
+import numpy as np
+import pandas as pd
+from config import COLUNAS_EQUIPE, ORDEM_DIAS, ORDEM_URGENZA, TURNOS
+from instrumentacao import instrumentar
+
+
+def _codigo_turno(horas):
+    """Converte horas do dia (0-23) em códigos de turno"""
+    turno_por_hora = np.empty(24, dtype=np.int64)
+    for codigo, (inicio, fim) in enumerate(TURNOS.values()):
+        horas_turno = (
+            range(inicio, fim)
+            if inicio < fim
+            else list(range(inicio, 24)) + list(range(0, fim))
+        )
+        turno_por_hora[list(horas_turno)] = codigo
+
+    return turno_por_hora[horas]
+
+
+def tem_horario(datas):
+    """
+    Se as datas trazem horário (alguma fora da meia-noite)
+
+    Args:
+        datas: Series de datas (ex.: 'Data Accesso')
+
+    Returns:
+        bool
+    """
+    datas = datas.dropna()
+    return bool(len(datas)) and not (datas.dt.normalize() == datas).all()
+
+
+def _codificar(df, coluna):
+    """Codifica profissionais e Categoria Urgenza como inteiros"""
+    profissionais, nomes = pd.factorize(df[coluna], use_na_sentinel=True)
+    categorias = pd.Categorical(
+        df["Categoria Urgenza"], categories=ORDEM_URGENZA
+    ).codes.astype(np.int64)
+
+    return profissionais.astype(np.int64), np.asarray(nomes), categorias
+
+
+def agregar_atendimentos(df, coluna="Medico Dimettente"):
+    """
+    Conta os atendimentos por 'Data Accesso', profissional e Categoria Urgenza
+
+    A tabela agregada (coluna 'Atendimentos') serve de entrada para
+    carga_por_profissional e carga_por_turno com pesos=, e pode ser
+    filtrada por período como o DataFrame original: com datas sem
+    horário, tem uma linha por dia, profissional e categoria.
+
+    Args:
+        df: DataFrame com 'Data Accesso', a coluna do profissional e
+            'Categoria Urgenza'
+        coluna: 'Medico Dimettente' ou 'Operatore Triagista'
+
+    Returns:
+        DataFrame com 'Data Accesso', coluna, 'Categoria Urgenza' e
+        'Atendimentos'
+    """
+    return (
+        df.groupby(
+            ["Data Accesso", coluna, "Categoria Urgenza"], observed=True, dropna=False
+        )
+        .size()
+        .rename("Atendimentos")
+        .reset_index()
+    )
+
+
+def carga_por_profissional(df, coluna="Medico Dimettente", pesos=None):
+    """
+    Calcula atendimentos e mix de urgência por profissional
+
+    Args:
+        df: DataFrame com a coluna do profissional e 'Categoria Urgenza'
+        coluna: 'Medico Dimettente' ou 'Operatore Triagista'
+        pesos: Atendimentos de cada linha (ver agregar_atendimentos) ou
+            None (uma linha por atendimento)
+
+    Returns:
+        DataFrame ordenado por atendimentos (empates pelo nome), com
+        contagem total, contagem por categoria e percentual de casos
+        Arancione/Rossa
+    """
+    profissionais, nomes, categorias = _codificar(df, coluna)
+    pesos = np.ones(len(df), dtype=np.int64) if pesos is None else np.asarray(pesos)
+    validos = profissionais >= 0
+    profissionais, categorias = profissionais[validos], categorias[validos]
+    pesos = pesos[validos]
+
+    total = np.bincount(profissionais, pesos, minlength=len(nomes)).astype(np.int64)
+
+    # Mix de urgência: contagem sobre o código combinado (profissional, categoria)
+    com_categoria = categorias >= 0
+    mix = (
+        np.bincount(
+            profissionais[com_categoria] * len(ORDEM_URGENZA)
+            + categorias[com_categoria],
+            pesos[com_categoria],
+            minlength=len(nomes) * len(ORDEM_URGENZA),
+        )
+        .astype(np.int64)
+        .reshape(len(nomes), len(ORDEM_URGENZA))
+    )
+
+    carga = pd.DataFrame(mix, index=pd.Index(nomes, name=coluna), columns=ORDEM_URGENZA)
+    carga.insert(0, "Atendimentos", total)
+    graves = carga["Arancione"] + carga["Rossa"]
+    carga["Graves (%)"] = (graves / carga["Atendimentos"] * 100).round(2)
+
+    # Empates em ordem alfabética (não dependem da ordem das linhas)
+    return carga.sort_index().sort_values(
+        "Atendimentos", ascending=False, kind="stable"
+    )
+
+
+def carga_por_turno(df, coluna="Medico Dimettente", pesos=None):
+    """
+    Calcula a carga por dia da semana e turno
+
+    Para cada combinação (dia da semana, turno) informa o total de
+    atendimentos, o número de profissionais que atenderam nela e a média
+    de atendimentos por profissional.
+
+    Args:
+        df: DataFrame com a coluna do profissional e 'Data Accesso'
+        coluna: 'Medico Dimettente' ou 'Operatore Triagista'
+        pesos: Atendimentos de cada linha (ver agregar_atendimentos) ou
+            None (uma linha por atendimento)
+
+    Returns:
+        DataFrame com MultiIndex (Dia_Semana, Turno), ou None se
+        'Data Accesso' não tem horário (todos os atendimentos cairiam
+        no turno da meia-noite)
+    """
+    if not tem_horario(df["Data Accesso"]):
+        return None
+
+    profissionais, nomes, _ = _codificar(df, coluna)
+    pesos = np.ones(len(df), dtype=np.int64) if pesos is None else np.asarray(pesos)
+    dias = df["Data Accesso"].dt.dayofweek.to_numpy()
+    turnos = _codigo_turno(df["Data Accesso"].dt.hour.to_numpy())
+
+    validos = profissionais >= 0
+    num_slots = len(ORDEM_DIAS) * len(TURNOS)
+    slots = dias[validos] * len(TURNOS) + turnos[validos]
+
+    # Matriz (profissional x slot) a partir de uma única contagem
+    matriz = (
+        np.bincount(
+            profissionais[validos] * num_slots + slots,
+            pesos[validos],
+            minlength=len(nomes) * num_slots,
+        )
+        .astype(np.int64)
+        .reshape(len(nomes), num_slots)
+    )
+
+    atendimentos = matriz.sum(axis=0)
+    ativos = (matriz > 0).sum(axis=0)
+
+    indice = pd.MultiIndex.from_product(
+        [ORDEM_DIAS, list(TURNOS)], names=["Dia_Semana", "Turno"]
+    )
+    turno = pd.DataFrame(
+        {"Atendimentos": atendimentos, "Profissionais": ativos}, index=indice
+    )
+    turno["Atendimentos por profissional"] = (
+        turno["Atendimentos"] / turno["Profissionais"].where(turno["Profissionais"] > 0)
+    ).round(2)
+
+    return turno
+
+
+@instrumentar
+def analise_carga_trabalho(df, top_n=10):
+    """
+    Análise de carga de trabalho por médico e triagista
+
+    Args:
+        df: DataFrame com colunas necessárias
+        top_n: Número de profissionais a exibir
+
+    Returns:
+        dict com as tabelas por papel ('medico' e 'triagista'); 'turnos'
+        só está presente se 'Data Accesso' tem horário
+    """
+    resultados = {}
+
+    print("\n" + "=" * 80)
+    print("ANÁLISE DE CARGA DE TRABALHO")
+    print("=" * 80)
+
+    for papel, coluna in COLUNAS_EQUIPE.items():
+        carga = carga_por_profissional(df, coluna)
+        turno = carga_por_turno(df, coluna)
+
+        print(f"\n{coluna}: {len(carga):,} profissionais")
+        print("-" * 80)
+        print(f"Top {top_n} por atendimentos:")
+        print(carga.head(top_n))
+
+        resultados[papel] = {"profissionais": carga}
+
+        print(f"\nCarga por dia da semana e turno ({coluna}):")
+        print("-" * 80)
+        if turno is None:
+            print("Indisponível: 'Data Accesso' não tem horário nos arquivos")
+            continue
+        print(turno[turno["Atendimentos"] > 0])
+        resultados[papel]["turnos"] = turno
+
+    return resultados
@@ -0,0 +1,277 @@
+"""
+Análise por estrutura (Struttura)
+
+Por padrão 'Struttura' está em COLUNAS_REMOVER e todas as análises são
+da rede inteira. No modo por estrutura (main.py --por-estrutura ou
+/analise/estruturas na API), a coluna é mantida como categórica e as
+análises de ANALISES_ESTRUTURA (urgenza, dimissione, temporal) são
+executadas em cada estrutura.
+
+Na CLI, as estruturas são distribuídas num pool de processos, das
+maiores para as menores, de modo que o tempo total depende do número de
+processos e da maior estrutura, não do número de estruturas. A API usa
+os dados do armazém de colunas (que guarda 'Struttura') e executa as
+estruturas sequencialmente no processo da requisição. As saídas são
+reunidas em tabelas comparativas com uma coluna (ou linha) por estrutura.
+"""
+
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
+from analise_geral import analise_dimissione, analise_temporal_geral
+from analise_urgenza import analise_urgenza_subgrupo, estatisticas_urgenza
+from config import ANALISES_ESTRUTURA, COLUNA_ESTRUTURA, ORDEM_DIAS, ORDEM_URGENZA
+from instrumentacao import instrumentar
+from motores import pacientes_distintos
+from series_temporais import serie_diaria_urgenza, serie_urgenza, tendencias_urgenza
+from utils import carrega_particoes, colunas_necessarias, preparar_dataframe
+
+
+def _analise_urgenza(df):
+    """Distribuição de Categoria Urgenza e cruzamento com subgrupos"""
+    stats_urgenza = estatisticas_urgenza(df)
+    analise_subgrupo = analise_urgenza_subgrupo(df)
+    return {
+        "resumo": stats_urgenza["resumo"],
+        "subgrupo": analise_subgrupo["tabela"],
+        "subgrupo_percentuais": analise_subgrupo["percentuais"],
+    }
+
+
+def _analise_dimissione(df):
+    """Distribuição de Modalità Dimissione"""
+    return {"resumo": analise_dimissione(df)["resumo"]}
+
+
+def _analise_temporal(df):
+    """Distribuição por dia da semana, série mensal e tendências semanais"""
+    geral = analise_temporal_geral(df)
+    serie_diaria = serie_diaria_urgenza(df)
+    tendencias = tendencias_urgenza(serie_diaria, granularidade="semana", janela=4)
+    serie_mensal = serie_urgenza(serie_diaria, "mes")
+    return {
+        "por_dia": geral["por_dia"],
+        "serie_mensal": serie_mensal,
+        "atendimentos_mes": serie_mensal.sum(axis=1),
+        "serie_semanal": tendencias["serie"],
+        "media_movel": tendencias["media_movel"],
+        "variacao_anual_percentual": tendencias["variacao_percentual"],
+    }
+
+
+# Análises disponíveis por estrutura (mesmos nomes de main.ANALISES)
+ANALISES = {
+    "urgenza": _analise_urgenza,
+    "dimissione": _analise_dimissione,
+    "temporal": _analise_temporal,
+}
+
+
+def _analisar_estrutura(df, analises):
+    """
+    Executa as análises numa estrutura (no processo do pool)
+
+    Os relatórios impressos de cada estrutura são descartados: o resultado
+    é apresentado pelas tabelas comparativas.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultados = {nome: ANALISES[nome](df) for nome in analises}
+        totais = {"Atendimentos": len(df)}
+        if "Paziente" in df.columns:
+            totais["Pacientes únicos"] = pacientes_distintos(df)
+        if "Data Accesso" in df.columns:
+            totais["Dias"] = int(df["Data Accesso"].dt.normalize().nunique())
+        resultados["totais"] = totais
+    return resultados
+
+
+def carregar_estruturas(
+    analises=ANALISES_ESTRUTURA,
+    anos=None,
+    inicio=None,
+    fim=None,
+    cache_dir=None,
+    workers=1,
+):
+    """
+    Carrega e prepara as colunas das análises com COLUNA_ESTRUTURA
+
+    Args:
+        analises: Nomes das análises (chaves de ANALISES)
+        anos: Lista de anos (str) ou None para todos
+        inicio: Data inicial de 'Data Accesso' ou None
+        fim: Data final de 'Data Accesso' ou None
+        cache_dir: Diretório de cache dos arquivos já processados (opcional)
+        workers: Número de threads de leitura de arquivos
+
+    Returns:
+        DataFrame preparado com 'Struttura' categórica
+    """
+    df = carrega_particoes(
+        anos=anos,
+        inicio=inicio,
+        fim=fim,
+        colunas=[*colunas_necessarias(analises), COLUNA_ESTRUTURA],
+        cache_dir=cache_dir,
+        workers=workers,
+    )
+    return preparar_dataframe(df, estrutura=True)
+
+
+@instrumentar
+def analisar_por_estrutura(df, analises=ANALISES_ESTRUTURA, processos=1):
+    """
+    Executa as análises em cada estrutura, em paralelo
+
+    Args:
+        df: DataFrame preparado com COLUNA_ESTRUTURA (ver carregar_estruturas)
+        analises: Nomes das análises (chaves de ANALISES)
+        processos: Processos do pool (1: executa no processo atual)
+
+    Returns:
+        dict {estrutura: {analise: {tabela: DataFrame ou Series}}}, em
+        ordem alfabética de estrutura; cada estrutura tem também 'totais'
+
+    Raises:
+        ValueError: se alguma análise não puder ser feita por estrutura
+    """
+    desconhecidas = [nome for nome in analises if nome not in ANALISES]
+    if desconhecidas:
+        raise ValueError(
+            f"Análises sem versão por estrutura: {', '.join(desconhecidas)}"
+        )
+
+    if df[COLUNA_ESTRUTURA].notna().sum() == 0:
+        raise ValueError(f"Nenhum atendimento com '{COLUNA_ESTRUTURA}' informada")
+
+    # Maiores primeiro: a maior estrutura não fica para o fim do pool
+    particoes = sorted(
+        (
+            (estrutura, parte.drop(columns=COLUNA_ESTRUTURA))
+            for estrutura, parte in df.groupby(COLUNA_ESTRUTURA, observed=True)
+        ),
+        key=lambda particao: len(particao[1]),
+        reverse=True,
+    )
+    estruturas = [estrutura for estrutura, _ in particoes]
+    dados = [parte for _, parte in particoes]
+
+    if processos > 1 and len(particoes) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(processos, len(particoes))
+        ) as executor:
+            saidas = list(executor.map(_analisar_estrutura, dados, repeat(analises)))
+    else:
+        saidas = [_analisar_estrutura(parte, analises) for parte in dados]
+
+    return dict(sorted(zip(estruturas, saidas)))
+
+
+def _juntar(resultados, analise, tabela, coluna=None, indice=None):
+    """Uma tabela de cada estrutura lado a lado (uma coluna por estrutura)"""
+    partes = {}
+    for estrutura, saida in resultados.items():
+        if analise in saida:
+            valores = saida[analise][tabela]
+            partes[estrutura] = valores[coluna] if coluna is not None else valores
+    if not partes:
+        return None
+
+    # Valores ausentes numa estrutura: zero atendimentos
+    juntas = pd.concat(partes, axis=1).fillna(0)
+    if all(pd.api.types.is_integer_dtype(parte) for parte in partes.values()):
+        juntas = juntas.astype(int)
+    juntas.columns.name = COLUNA_ESTRUTURA
+    if indice is not None:
+        juntas = juntas.reindex([valor for valor in indice if valor in juntas.index])
+    return juntas
+
+
+@instrumentar
+def comparar_estruturas(resultados):
+    """
+    Reúne as saídas de cada estrutura em tabelas comparativas
+
+    Args:
+        resultados: Retorno de analisar_por_estrutura()
+
+    Returns:
+        dict {nome: DataFrame}: 'resumo' (uma linha por estrutura) e as
+        tabelas de cada análise (uma coluna por estrutura)
+    """
+    resumo = pd.DataFrame(
+        {estrutura: saida["totais"] for estrutura, saida in resultados.items()}
+    ).T
+    resumo.index.name = COLUNA_ESTRUTURA
+    resumo["Percentual (%)"] = (
+        resumo["Atendimentos"] / resumo["Atendimentos"].sum() * 100
+    ).round(2)
+    if "Dias" in resumo.columns:
+        resumo["Média diária"] = (resumo["Atendimentos"] / resumo["Dias"]).round(2)
+
+    tabelas = {
+        "resumo": resumo,
+        "urgenza_frequencia": _juntar(
+            resultados, "urgenza", "resumo", "Frequência", ORDEM_URGENZA
+        ),
+        "urgenza_percentual": _juntar(
+            resultados, "urgenza", "resumo", "Percentual (%)", ORDEM_URGENZA
+        ),
+        "dimissione_percentual": _juntar(
+            resultados, "dimissione", "resumo", "Percentual (%)"
+        ),
+        "atendimentos_dia_semana": _juntar(
+            resultados, "temporal", "por_dia", indice=ORDEM_DIAS
+        ),
+        "atendimentos_mes": _juntar(resultados, "temporal", "atendimentos_mes"),
+    }
+
+    return {nome: tabela for nome, tabela in tabelas.items() if tabela is not None}
+
+
+@instrumentar
+def relatorio_estruturas(df, analises=ANALISES_ESTRUTURA, processos=1):
+    """
+    Análises por estrutura e tabelas comparativas
+
+    Args:
+        df: DataFrame preparado com COLUNA_ESTRUTURA (ver carregar_estruturas)
+        analises: Nomes das análises (chaves de ANALISES)
+        processos: Processos do pool
+
+    Returns:
+        dict {nome: DataFrame} de comparar_estruturas()
+    """
+    resultados = analisar_por_estrutura(df, analises, processos)
+    tabelas = comparar_estruturas(resultados)
+
+    print("\n" + "=" * 80)
+    print(f"ANÁLISE POR ESTRUTURA ({COLUNA_ESTRUTURA.upper()})")
+    print("=" * 80)
+    print(
+        f"\n{len(resultados)} estrutura(s), {len(df):,} atendimentos "
+        f"({len(df) - int(tabelas['resumo']['Atendimentos'].sum()):,} sem estrutura)"
+    )
+
+    titulos = {
+        "resumo": "Atendimentos por estrutura",
+        "urgenza_percentual": "Categoria Urgenza (%)",
+        "dimissione_percentual": "Modalità Dimissione (%)",
+        "atendimentos_dia_semana": "Atendimentos por dia da semana",
+    }
+    for nome, titulo in titulos.items():
+        if nome in tabelas:
+            print(f"\n{titulo}:")
+            print("-" * 80)
+            print(tabelas[nome])
+
+    return tabelas
+
+
+if __name__ == "__main__":
+    import os
+
+    relatorio_estruturas(carregar_estruturas(), processos=os.cpu_count() or 1)
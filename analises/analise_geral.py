@@ -5,22 +5,27 @@ Módulo para análises de outros aspectos dos dados
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from armazem_colunas import garantir_dataframe
+from motores import contagem, descrever, pacientes_distintos, percentuais
+from instrumentacao import instrumentar
+from intervalos_confianca import intervalos_percentuais
 
 
-def analise_dimissione(df):
+@instrumentar
+def analise_dimissione(df, ic=None):
     """
     Análise de Modalità Dimissione
 
     Args:
-        df: DataFrame com coluna 'Modalità Dimissione'
+        df: DataFrame ou ArmazemColunas com coluna 'Modalità Dimissione'
+        ic: Nível de confiança (ex.: 95) dos intervalos bootstrap por
+            paciente dos percentuais (None: sem intervalos)
 
     Returns:
         dict com estatísticas
     """
-    dimissione_counts = df["Modalità Dimissione"].value_counts()
-    dimissione_perc = df["Modalità Dimissione"].value_counts(normalize=True) * 100
+    dimissione_counts = contagem(df, "Modalità Dimissione")
+    dimissione_perc = percentuais(dimissione_counts)
 
     print("\n" + "=" * 80)
     print("ANÁLISE DE MODALITÀ DIMISSIONE")
@@ -31,6 +36,11 @@ def analise_dimissione(df):
     resumo = pd.DataFrame(
         {"Frequência": dimissione_counts, "Percentual (%)": dimissione_perc.round(2)}
     )
+    if ic is not None:
+        intervalos = intervalos_percentuais(df, "Modalità Dimissione", ic)
+        resumo = resumo.join(
+            intervalos[["IC inferior (%)", "IC superior (%)"]].round(2)
+        )
     print(resumo)
 
     return {
@@ -40,19 +50,20 @@ def analise_dimissione(df):
     }
 
 
+@instrumentar
 def analise_problema_principal(df, top_n=10):
     """
     Análise dos principais problemas
 
     Args:
-        df: DataFrame com coluna 'Problema Principale'
+        df: DataFrame ou ArmazemColunas com coluna 'Problema Principale'
         top_n: Número de problemas principais a exibir
 
     Returns:
         dict com estatísticas
     """
-    problema_counts = df["Problema Principale"].value_counts()
-    problema_perc = df["Problema Principale"].value_counts(normalize=True) * 100
+    problema_counts = contagem(df, "Problema Principale")
+    problema_perc = percentuais(problema_counts)
 
     print("\n" + "=" * 80)
     print(f"ANÁLISE DE PROBLEMA PRINCIPALE (Top {top_n})")
@@ -75,31 +86,27 @@ def analise_problema_principal(df, top_n=10):
     }
 
 
+@instrumentar
 def analise_pacientes_frequentes(df, limite=10):
     """
     Identifica e analisa pacientes frequentes (Heavy Users)
 
     Args:
-        df: DataFrame com coluna 'Paziente'
+        df: DataFrame ou ArmazemColunas com coluna 'Paziente'
         limite: Número mínimo de atendimentos para ser considerado frequente
 
     Returns:
         DataFrame com pacientes frequentes
     """
-    atendimentos_por_paciente = (
-        df.groupby("Paziente").size().sort_values(ascending=False)
-    )
-    pacientes_frequentes = atendimentos_por_paciente[
-        atendimentos_por_paciente >= limite
-    ]
+    # Ordenada por atendimentos; empates ficam em ordem alfabética
+    contagens = contagem(df, "Paziente").rename(None)
+    pacientes_frequentes = contagens[contagens >= limite]
 
     print("\n" + "=" * 80)
     print(f"PACIENTES FREQUENTES (>= {limite} atendimentos)")
     print("=" * 80)
     print(f"\nTotal de pacientes frequentes: {len(pacientes_frequentes)}")
-    print(
-        f"Percentual do total: {len(pacientes_frequentes)/df['Paziente'].nunique()*100:.2f}%"
-    )
+    print(f"Percentual do total: {len(pacientes_frequentes)/len(contagens)*100:.2f}%")
     print(f"\nTop 10 pacientes com mais atendimentos:")
     print("-" * 80)
     print(pacientes_frequentes.head(10))
@@ -107,21 +114,22 @@ def analise_pacientes_frequentes(df, limite=10):
     return pacientes_frequentes
 
 
+@instrumentar
 def analise_temporal_geral(df):
     """
     Análise temporal geral dos atendimentos
 
     Args:
-        df: DataFrame com coluna 'Data Accesso'
+        df: DataFrame ou ArmazemColunas com coluna 'Data Accesso'
 
     Returns:
         dict com análises temporais
     """
     # Por dia da semana
-    atendimentos_dia = df["Dia_Semana"].value_counts()
+    atendimentos_dia = contagem(df, "Dia_Semana")
 
     # Por mês
-    atendimentos_mes = df["Mese_anno_It"].value_counts()
+    atendimentos_mes = contagem(df, "Mese_anno_It")
 
     print("\n" + "=" * 80)
     print("ANÁLISE TEMPORAL GERAL")
@@ -146,12 +154,113 @@ def analise_temporal_geral(df):
     return {"por_dia": atendimentos_dia, "por_mes": atendimentos_mes}
 
 
+def _data_referencia_idade(nascimento, idade):
+    """
+    Data em que 'idade' é a idade em anos completos do maior número de linhas
+
+    Cada linha é compatível com as datas do intervalo [aniversário de
+    'idade' anos, aniversário seguinte); conta-se, em cada início de
+    intervalo, quantos intervalos o contêm (busca binária nos inícios e
+    fins ordenados).
+
+    Returns:
+        tuple (Timestamp, fração das linhas compatíveis com essa data)
+    """
+    nascimento = np.asarray(nascimento, dtype="datetime64[D]")
+    meses = nascimento.astype("datetime64[M]")
+    dia = nascimento - meses.astype("datetime64[D]")
+    anos = np.asarray(idade, dtype=np.int64)
+
+    inicios = np.sort((meses + 12 * anos).astype("datetime64[D]") + dia)
+    fins = np.sort((meses + 12 * (anos + 1)).astype("datetime64[D]") + dia)
+    compativeis = np.searchsorted(inicios, inicios, side="right") - np.searchsorted(
+        fins, inicios, side="right"
+    )
+
+    melhor = int(np.argmax(compativeis))
+    return pd.Timestamp(inicios[melhor]), compativeis[melhor] / len(inicios)
+
+
+@instrumentar
+def validar_idade(df):
+    """
+    Compara a idade calculada no atendimento ('Età Accesso', de 'Data
+    Nascita' e 'Data Accesso') com a coluna 'Età' dos arquivos
+
+    Além das diferenças por ano de atendimento, estima a data em que 'Età'
+    seria a idade dos pacientes: nos dados atuais ela é a idade na data da
+    extração, e não no atendimento, por isso as faixas usam 'Età Accesso'.
+
+    Args:
+        df: DataFrame ou ArmazemColunas com 'Età', 'Età Accesso',
+            'Data Nascita' e 'Data Accesso'
+
+    Returns:
+        dict com 'diferencas' (frequência de 'Età' - 'Età Accesso'),
+        'por_ano' (diferença média e concordância por ano de atendimento),
+        'concordancia' (% de linhas iguais), 'data_referencia' e
+        'cobertura' (% de linhas compatíveis com a data de referência)
+    """
+    df = garantir_dataframe(df, ["Età", "Età Accesso", "Data Nascita", "Data Accesso"])
+    df = df.dropna(subset=["Età", "Età Accesso", "Data Nascita"])
+
+    diferenca = (df["Età"] - df["Età Accesso"]).astype(np.int64)
+    iguais = diferenca == 0
+    concordancia = iguais.mean() * 100
+
+    print("\n" + "=" * 80)
+    print("VALIDAÇÃO DA IDADE: 'Età' x IDADE NO ATENDIMENTO")
+    print("=" * 80)
+
+    frequencia = diferenca.value_counts().sort_index()
+    diferencas = pd.DataFrame(
+        {
+            "Frequência": frequencia,
+            "Percentual (%)": (frequencia / frequencia.sum() * 100).round(2),
+        }
+    )
+    diferencas.index.name = "Diferença (anos)"
+    print(f"\nIdades iguais: {concordancia:.2f}%")
+    print("\nDiferença 'Età' - 'Età Accesso':")
+    print("-" * 80)
+    print(diferencas)
+
+    ano = df["Data Accesso"].dt.year.rename("Ano")
+    por_ano = pd.DataFrame(
+        {
+            "Diferença média (anos)": diferenca.groupby(ano).mean().round(2),
+            "Idades iguais (%)": (iguais.groupby(ano).mean() * 100).round(2),
+        }
+    )
+    print("\nPor ano de atendimento:")
+    print("-" * 80)
+    print(por_ano)
+
+    data_referencia, cobertura = _data_referencia_idade(df["Data Nascita"], df["Età"])
+    print(
+        f"\n'Età' corresponde à idade em {data_referencia:%d/%m/%Y} "
+        f"em {cobertura * 100:.2f}% das linhas"
+    )
+
+    return {
+        "diferencas": diferencas,
+        "por_ano": por_ano,
+        "concordancia": concordancia,
+        "data_referencia": data_referencia,
+        "cobertura": cobertura * 100,
+    }
+
+
+@instrumentar
 def estatisticas_idade(df):
     """
     Estatísticas descritivas da idade dos pacientes
 
+    Usa a idade no atendimento ('Età Accesso') quando disponível e, sem
+    ela, a coluna 'Età' dos arquivos.
+
     Args:
-        df: DataFrame com coluna 'Età'
+        df: DataFrame ou ArmazemColunas com coluna 'Età Accesso' ou 'Età'
 
     Returns:
         DataFrame com estatísticas
@@ -160,7 +269,8 @@ def estatisticas_idade(df):
     print("ESTATÍSTICAS DE IDADE")
     print("=" * 80)
 
-    stats = df["Età"].describe()
+    coluna = "Età Accesso" if "Età Accesso" in df.columns else "Età"
+    stats = descrever(df, coluna)
     print("\nEstatísticas descritivas:")
     print("-" * 80)
     print(stats)
@@ -168,8 +278,8 @@ def estatisticas_idade(df):
     # Por faixa etária
     print("\nDistribuição por faixa etária:")
     print("-" * 80)
-    faixas = df["Fascia d'età"].value_counts()
-    faixas_perc = df["Fascia d'età"].value_counts(normalize=True) * 100
+    faixas = contagem(df, "Fascia d'età")
+    faixas_perc = percentuais(faixas)
 
     resumo_faixas = pd.DataFrame(
         {"Frequência": faixas, "Percentual (%)": faixas_perc.round(2)}
@@ -179,13 +289,15 @@ def estatisticas_idade(df):
     return {"stats": stats, "faixas": resumo_faixas}
 
 
+@instrumentar
 def relatorio_geral(df):
     """
     Gera relatório geral consolidado
 
     Args:
-        df: DataFrame completo
+        df: DataFrame ou ArmazemColunas completo
     """
+
     print("\n" + "=" * 80)
     print("RELATÓRIO GERAL - RESUMO EXECUTIVO")
     print("=" * 80)
@@ -193,30 +305,34 @@ def relatorio_geral(df):
     print(f"\n1. DADOS GERAIS")
     print("-" * 80)
     print(f"Total de atendimentos: {len(df):,}")
-    print(f"Total de pacientes únicos: {df['Paziente'].nunique():,}")
+    pacientes_unicos = pacientes_distintos(df)
+    datas = garantir_dataframe(df, ["Data Accesso"])["Data Accesso"]
+    print(f"Total de pacientes únicos: {pacientes_unicos:,}")
     print(
-        f"Período: {df['Data Accesso'].min().strftime('%d/%m/%Y')} a {df['Data Accesso'].max().strftime('%d/%m/%Y')}"
+        f"Período: {datas.min().strftime('%d/%m/%Y')} a {datas.max().strftime('%d/%m/%Y')}"
     )
-    print(f"Média de atendimentos por paciente: {len(df)/df['Paziente'].nunique():.2f}")
+    print(f"Média de atendimentos por paciente: {len(df)/pacientes_unicos:.2f}")
 
     print(f"\n2. DISTRIBUIÇÃO POR SUBGRUPO")
     print("-" * 80)
-    subgrupos = df["Sottogruppo Pazienti"].value_counts()
+    subgrupos = contagem(df, "Sottogruppo Pazienti")
     for subgrupo, count in subgrupos.items():
         perc = count / len(df) * 100
         print(f"{subgrupo}: {count:,} ({perc:.2f}%)")
 
     print(f"\n3. CATEGORIA URGENZA PREDOMINANTE")
     print("-" * 80)
-    cat_predominante = df["Categoria Urgenza"].value_counts().idxmax()
-    count_predominante = df["Categoria Urgenza"].value_counts().max()
+    categorias = contagem(df, "Categoria Urgenza")
+    cat_predominante = categorias.idxmax()
+    count_predominante = categorias.max()
     perc_predominante = count_predominante / len(df) * 100
     print(f"{cat_predominante}: {count_predominante:,} ({perc_predominante:.2f}%)")
 
     print(f"\n4. MODALITÀ DIMISSIONE MAIS COMUM")
     print("-" * 80)
-    dim_comum = df["Modalità Dimissione"].value_counts().idxmax()
-    count_dim = df["Modalità Dimissione"].value_counts().max()
+    dimissioni = contagem(df, "Modalità Dimissione")
+    dim_comum = dimissioni.idxmax()
+    count_dim = dimissioni.max()
     perc_dim = count_dim / len(df) * 100
     print(f"{dim_comum}: {count_dim:,} ({perc_dim:.2f}%)")
 
@@ -0,0 +1,241 @@
+"""
+Módulo de análises de permanência e ocupação do Pronto Soccorso
+(duração do contato e atendimentos simultâneos)
+
+A ocupação é calculada por varredura de eventos: cada atendimento gera
+uma entrada no período de 'Data Accesso' e uma saída no período seguinte
+a 'Data Fine Contatto'; a soma acumulada desses eventos dá o número de
+atendimentos presentes em cada período, sem percorrer intervalos linha
+a linha.
+"""
+
+import numpy as np
+import pandas as pd
+from config import CORES_URGENZA, ORDEM_SUBGRUPOS, ORDEM_URGENZA
+from instrumentacao import instrumentar
+from utils import carregar_graficos
+
+# Ordem das categorias das colunas usadas para detalhar a ocupação
+ORDEM_DETALHAMENTO = {
+    "Categoria Urgenza": ORDEM_URGENZA,
+    "Sottogruppo Pazienti": ORDEM_SUBGRUPOS,
+}
+
+
+def duracao_contato(df):
+    """
+    Calcula a duração de cada contato em horas
+
+    Args:
+        df: DataFrame com colunas 'Data Accesso' e 'Data Fine Contatto'
+
+    Returns:
+        Series com a duração em horas (NaN se o fim for anterior ao início)
+    """
+    duracao = (df["Data Fine Contatto"] - df["Data Accesso"]) / pd.Timedelta(hours=1)
+    return duracao.where(duracao >= 0)
+
+
+def _codigos_grupo(df, por):
+    """Converte a coluna de detalhamento em códigos inteiros e rótulos"""
+    if por is None:
+        return np.zeros(len(df), dtype=np.int64), ["Total"]
+
+    categorias = ORDEM_DETALHAMENTO.get(por)
+    categorico = pd.Categorical(df[por], categories=categorias)
+    return categorico.codes.astype(np.int64), list(categorico.categories)
+
+
+@instrumentar
+def curva_ocupacao(df, frequencia="D", por=None):
+    """
+    Calcula a curva de atendimentos simultâneos por período
+
+    Um atendimento é contado em todos os períodos entre o da entrada e o
+    da saída, inclusive.
+
+    Args:
+        df: DataFrame com colunas 'Data Accesso' e 'Data Fine Contatto'
+        frequencia: 'h' (horária) ou 'D' (diária)
+        por: Coluna de detalhamento (ex.: 'Categoria Urgenza') ou None
+
+    Returns:
+        DataFrame com DatetimeIndex e uma coluna por grupo
+    """
+    passo = int(
+        np.timedelta64(1, frequencia).astype("timedelta64[ns]").astype(np.int64)
+    )
+    inicio = df["Data Accesso"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    fim = df["Data Fine Contatto"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    grupos, rotulos = _codigos_grupo(df, por)
+
+    nat = np.iinfo(np.int64).min
+    validos = (inicio != nat) & (fim != nat) & (fim >= inicio) & (grupos >= 0)
+    inicio, fim, grupos = inicio[validos], fim[validos], grupos[validos]
+
+    if len(inicio) == 0:
+        return pd.DataFrame(columns=rotulos, dtype="int64")
+
+    origem = inicio.min() // passo * passo
+    periodo_inicio = (inicio - origem) // passo
+    periodo_fim = (fim - origem) // passo
+    num_periodos = int(periodo_fim.max()) + 1
+
+    # Entradas (+1) e saídas (-1, no período seguinte ao fim) por grupo
+    largura = num_periodos + 1
+    eventos = np.bincount(
+        grupos * largura + periodo_inicio, minlength=len(rotulos) * largura
+    ) - np.bincount(
+        grupos * largura + periodo_fim + 1, minlength=len(rotulos) * largura
+    )
+    ocupacao = np.cumsum(eventos.reshape(len(rotulos), largura), axis=1)
+
+    indice = pd.date_range(pd.Timestamp(origem), periods=num_periodos, freq=frequencia)
+    curva = pd.DataFrame(ocupacao[:, :num_periodos].T, index=indice, columns=rotulos)
+    curva.index.name = "Periodo"
+
+    return curva
+
+
+def fluxo_diario(df):
+    """
+    Calcula entradas e saídas de atendimentos por dia
+
+    Args:
+        df: DataFrame com colunas 'Data Accesso' e 'Data Fine Contatto'
+
+    Returns:
+        DataFrame com colunas 'Entradas', 'Saídas' e 'Saldo'
+    """
+    entradas = df["Data Accesso"].dt.normalize().value_counts()
+    saidas = df["Data Fine Contatto"].dt.normalize().value_counts()
+
+    fluxo = pd.DataFrame({"Entradas": entradas, "Saídas": saidas}).fillna(0)
+    fluxo = fluxo.astype("int64").sort_index()
+    fluxo["Saldo"] = fluxo["Entradas"] - fluxo["Saídas"]
+    fluxo.index.name = "Data"
+
+    return fluxo
+
+
+def estatisticas_permanencia(df, por="Categoria Urgenza"):
+    """
+    Estatísticas da duração do contato por grupo
+
+    Args:
+        df: DataFrame com colunas de datas e a coluna de detalhamento
+        por: Coluna de detalhamento
+
+    Returns:
+        DataFrame com contagem, média, mediana e percentil 90 (horas)
+    """
+    grupos = pd.Categorical(df[por], categories=ORDEM_DETALHAMENTO.get(por))
+    duracao = duracao_contato(df)
+
+    agrupado = duracao.groupby(grupos, observed=False)
+    resumo = pd.DataFrame(
+        {
+            "Atendimentos": agrupado.count(),
+            "Média (h)": agrupado.mean(),
+            "Mediana (h)": agrupado.median(),
+            "P90 (h)": agrupado.quantile(0.9),
+        }
+    )
+    resumo.index.name = por
+
+    return resumo
+
+
+@instrumentar
+def analise_permanencia(df, frequencia="D"):
+    """
+    Análise de permanência e ocupação
+
+    Args:
+        df: DataFrame com colunas necessárias
+        frequencia: Frequência da curva de ocupação ('h' ou 'D')
+
+    Returns:
+        dict com estatísticas e curvas de ocupação
+    """
+    duracao = duracao_contato(df)
+    por_urgenza = estatisticas_permanencia(df, "Categoria Urgenza")
+    por_subgrupo = estatisticas_permanencia(df, "Sottogruppo Pazienti")
+    ocupacao_urgenza = curva_ocupacao(df, frequencia, "Categoria Urgenza")
+    ocupacao_subgrupo = curva_ocupacao(df, frequencia, "Sottogruppo Pazienti")
+    ocupacao_total = ocupacao_urgenza.sum(axis=1)
+
+    print("\n" + "=" * 80)
+    print("ANÁLISE DE PERMANÊNCIA E OCUPAÇÃO")
+    print("=" * 80)
+
+    print(f"\nDuração média do contato: {duracao.mean():.2f} h")
+    print(f"Duração mediana do contato: {duracao.median():.2f} h")
+    print(f"Contatos com fim anterior ao início: {int(duracao.isna().sum()):,}")
+
+    print("\nDuração por Categoria Urgenza:")
+    print("-" * 80)
+    print(por_urgenza.round(2))
+
+    print("\nDuração por Sottogruppo Pazienti:")
+    print("-" * 80)
+    print(por_subgrupo.round(2))
+
+    if len(ocupacao_total) > 0:
+        print(f"\nOcupação simultânea (frequência '{frequencia}'):")
+        print("-" * 80)
+        print(f"Média: {ocupacao_total.mean():.2f}")
+        print(
+            f"Pico: {ocupacao_total.max():,} "
+            f"em {ocupacao_total.idxmax().strftime('%d/%m/%Y %H:%M')}"
+        )
+
+    return {
+        "duracao": duracao,
+        "por_urgenza": por_urgenza,
+        "por_subgrupo": por_subgrupo,
+        "ocupacao_urgenza": ocupacao_urgenza,
+        "ocupacao_subgrupo": ocupacao_subgrupo,
+    }
+
+
+@instrumentar
+def grafico_ocupacao(ocupacao, salvar=False, caminho_saida=None):
+    """
+    Cria gráfico de área empilhada da ocupação por Categoria Urgenza
+
+    Args:
+        ocupacao: DataFrame retornado por curva_ocupacao()
+        salvar: Se True, salva o gráfico
+        caminho_saida: Caminho para salvar o gráfico
+    """
+    plt, _ = carregar_graficos()
+    fig, ax = plt.subplots(figsize=(24, 10))
+
+    ax.stackplot(
+        ocupacao.index,
+        ocupacao.T.values,
+        labels=ocupacao.columns,
+        colors=[CORES_URGENZA.get(cat, "#95A5A6") for cat in ocupacao.columns],
+        alpha=0.9,
+    )
+
+    ax.set_xlabel("Período", fontsize=16, fontweight="bold")
+    ax.set_ylabel("Atendimentos Simultâneos", fontsize=16, fontweight="bold")
+    ax.set_title(
+        "Ocupação do Pronto Soccorso por Categoria Urgenza",
+        fontsize=18,
+        fontweight="bold",
+        pad=20,
+    )
+    ax.legend(
+        title="Categoria Urgenza", fontsize=13, title_fontsize=14, loc="upper left"
+    )
+    ax.grid(True, alpha=0.3, linestyle="--")
+
+    plt.tight_layout()
+
+    if salvar and caminho_saida:
+        plt.savefig(caminho_saida, dpi=300, bbox_inches="tight")
+
+    plt.show()
@@ -0,0 +1,167 @@
+"""
+Módulo de análises de retorno de pacientes ao Pronto Soccorso
+(intervalos entre atendimentos e retornos em 72h / 30 dias)
+
+Os atendimentos são ordenados uma única vez por (paciente, data de acesso);
+os intervalos e indicadores de retorno saem de diferenças entre posições
+vizinhas desse arranjo, sem groupby-apply por paciente.
+"""
+
+import numpy as np
+import pandas as pd
+from config import (
+    BINS_INTERVALO,
+    JANELAS_RETORNO,
+    ORDEM_SUBGRUPOS,
+    ORDEM_URGENZA,
+    ROTULOS_INTERVALO,
+)
+from indice_pacientes import ids_pacientes
+from instrumentacao import instrumentar
+
+
+@instrumentar
+def intervalos_retorno(df):
+    """
+    Calcula intervalos entre atendimentos consecutivos de cada paciente
+
+    Args:
+        df: DataFrame com colunas 'Paziente' e 'Data Accesso'
+
+    Returns:
+        DataFrame alinhado ao índice de df com as colunas:
+        - 'Horas desde anterior': intervalo até o atendimento anterior
+        - 'Horas até próximo': intervalo até o atendimento seguinte
+        - uma coluna booleana por janela de JANELAS_RETORNO, verdadeira
+          quando o paciente retornou dentro da janela
+    """
+    codigos = ids_pacientes(df)
+    tempos = df["Data Accesso"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+
+    # Ordenação única por paciente e data de acesso
+    ordem = np.lexsort((tempos, codigos))
+    codigos_ord = codigos[ordem]
+    tempos_ord = tempos[ordem]
+
+    mesmo_paciente = codigos_ord[1:] == codigos_ord[:-1]
+    horas = np.diff(tempos_ord) / 3.6e12
+
+    anterior = np.full(len(ordem), np.nan)
+    anterior[1:] = np.where(mesmo_paciente, horas, np.nan)
+    proximo = np.full(len(ordem), np.nan)
+    proximo[:-1] = np.where(mesmo_paciente, horas, np.nan)
+
+    # Devolver os valores à ordem original das linhas
+    desde_anterior = np.empty_like(anterior)
+    desde_anterior[ordem] = anterior
+    ate_proximo = np.empty_like(proximo)
+    ate_proximo[ordem] = proximo
+
+    retornos = pd.DataFrame(
+        {
+            "Horas desde anterior": desde_anterior,
+            "Horas até próximo": ate_proximo,
+        },
+        index=df.index,
+    )
+    for nome, limite_horas in JANELAS_RETORNO.items():
+        retornos[nome] = ate_proximo <= limite_horas
+
+    return retornos
+
+
+def taxas_retorno(df, retornos, por):
+    """
+    Calcula taxas de retorno por grupo
+
+    Args:
+        df: DataFrame com a coluna de agrupamento
+        retornos: Resultado de intervalos_retorno()
+        por: Coluna de agrupamento (ex.: 'Sottogruppo Pazienti')
+
+    Returns:
+        DataFrame com atendimentos e percentual de retornos em cada janela
+    """
+    ordem = {
+        "Categoria Urgenza": ORDEM_URGENZA,
+        "Sottogruppo Pazienti": ORDEM_SUBGRUPOS,
+    }.get(por)
+    grupos = pd.Categorical(df[por], categories=ordem)
+
+    agrupado = retornos[list(JANELAS_RETORNO)].groupby(grupos, observed=False)
+    taxas = agrupado.mean() * 100
+    taxas.columns = [f"{nome} (%)" for nome in taxas.columns]
+    taxas.insert(0, "Atendimentos", agrupado.size())
+    taxas.index.name = por
+
+    return taxas
+
+
+def distribuicao_intervalos(df, retornos, por):
+    """
+    Distribuição dos intervalos entre atendimentos por grupo
+
+    Args:
+        df: DataFrame com a coluna de agrupamento
+        retornos: Resultado de intervalos_retorno()
+        por: Coluna de agrupamento
+
+    Returns:
+        DataFrame (grupos x faixas de intervalo) com as contagens
+    """
+    dias = retornos["Horas desde anterior"] / 24
+    faixas = pd.cut(
+        dias, bins=BINS_INTERVALO, labels=ROTULOS_INTERVALO, include_lowest=True
+    ).rename("Intervalo desde anterior")
+
+    return pd.crosstab(df[por], faixas)
+
+
+@instrumentar
+def analise_retornos(df):
+    """
+    Análise de retornos e intervalos entre atendimentos
+
+    Args:
+        df: DataFrame com colunas necessárias
+
+    Returns:
+        dict com intervalos, taxas e distribuições
+    """
+    retornos = intervalos_retorno(df)
+    taxas_subgrupo = taxas_retorno(df, retornos, "Sottogruppo Pazienti")
+    taxas_urgenza = taxas_retorno(df, retornos, "Categoria Urgenza")
+    dist_subgrupo = distribuicao_intervalos(df, retornos, "Sottogruppo Pazienti")
+    dist_urgenza = distribuicao_intervalos(df, retornos, "Categoria Urgenza")
+
+    dias = retornos["Horas desde anterior"].dropna() / 24
+
+    print("\n" + "=" * 80)
+    print("ANÁLISE DE RETORNOS")
+    print("=" * 80)
+
+    print(f"\nAtendimentos que são retorno de um anterior: {len(dias):,}")
+    if len(dias) > 0:
+        print(f"Intervalo mediano entre atendimentos: {dias.median():.1f} dias")
+    for nome in JANELAS_RETORNO:
+        print(f"{nome}: {retornos[nome].mean() * 100:.2f}% dos atendimentos")
+
+    print("\nTaxas de retorno por Sottogruppo Pazienti:")
+    print("-" * 80)
+    print(taxas_subgrupo.round(2))
+
+    print("\nTaxas de retorno por Categoria Urgenza:")
+    print("-" * 80)
+    print(taxas_urgenza.round(2))
+
+    print("\nIntervalos desde o atendimento anterior por Sottogruppo Pazienti:")
+    print("-" * 80)
+    print(dist_subgrupo)
+
+    return {
+        "retornos": retornos,
+        "taxas_subgrupo": taxas_subgrupo,
+        "taxas_urgenza": taxas_urgenza,
+        "distribuicao_subgrupo": dist_subgrupo,
+        "distribuicao_urgenza": dist_urgenza,
+    }
@@ -4,29 +4,39 @@ Módulo de análises de Categoria Urgenza
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from config import CORES_URGENZA, ORDEM_URGENZA
+from config import CORES_URGENZA, ORDEM_DIAS, ORDEM_URGENZA
+from armazem_colunas import garantir_dataframe
+from motores import contagem, pacientes_distintos, percentuais, tabela_cruzada
+from instrumentacao import instrumentar
+from intervalos_confianca import intervalos_percentuais
+from series_temporais import serie_diaria_urgenza, serie_urgenza, rotulos_periodo
+from utils import carregar_graficos
 
 
-def estatisticas_urgenza(df):
+@instrumentar
+def estatisticas_urgenza(df, ic=None):
     """
     Calcula estatísticas descritivas de Categoria Urgenza
 
     Args:
-        df: DataFrame com coluna 'Categoria Urgenza'
+        df: DataFrame ou ArmazemColunas com coluna 'Categoria Urgenza'
+        ic: Nível de confiança (ex.: 95) dos intervalos bootstrap por
+            paciente dos percentuais (None: sem intervalos)
 
     Returns:
         dict com estatísticas calculadas
     """
-    urgenza_counts = df["Categoria Urgenza"].value_counts().sort_index()
-    urgenza_perc = (
-        df["Categoria Urgenza"].value_counts(normalize=True).sort_index() * 100
-    )
+    urgenza_counts = contagem(df, "Categoria Urgenza").sort_index()
+    urgenza_perc = percentuais(urgenza_counts)
 
     resumo = pd.DataFrame(
         {"Frequência": urgenza_counts, "Percentual (%)": urgenza_perc.round(2)}
     )
+    if ic is not None:
+        intervalos = intervalos_percentuais(df, "Categoria Urgenza", ic)
+        resumo = resumo.join(
+            intervalos[["IC inferior (%)", "IC superior (%)"]].round(2)
+        )
 
     print("=" * 80)
     print("ANÁLISE DE CATEGORIA URGENZA")
@@ -36,15 +46,18 @@ def estatisticas_urgenza(df):
     print(resumo)
 
     print(f"\nTotal de atendimentos: {len(df):,}")
-    print(f"Total de pacientes únicos: {df['Paziente'].nunique():,}")
+    print(f"Total de pacientes únicos: {pacientes_distintos(df):,}")
 
     print("\n2. ANÁLISE DETALHADA POR CATEGORIA")
     print("-" * 80)
 
+    # Pacientes distintos de todas as categorias numa única passada
+    pacientes_categoria = pacientes_distintos(df, "Categoria Urgenza")
+
     for categoria in urgenza_counts.index:
         qtd = urgenza_counts[categoria]
         perc = urgenza_perc[categoria]
-        pacientes = df[df["Categoria Urgenza"] == categoria]["Paziente"].nunique()
+        pacientes = pacientes_categoria[categoria]
         print(f"\n{categoria}:")
         print(f"  - Atendimentos: {qtd:,} ({perc:.2f}%)")
         print(f"  - Pacientes únicos: {pacientes:,}")
@@ -52,6 +65,7 @@ def estatisticas_urgenza(df):
     return {"counts": urgenza_counts, "percentuais": urgenza_perc, "resumo": resumo}
 
 
+@instrumentar
 def grafico_barras_urgenza(
     urgenza_counts, urgenza_perc, salvar=False, caminho_saida=None
 ):
@@ -64,6 +78,7 @@ def grafico_barras_urgenza(
         salvar: Se True, salva o gráfico
         caminho_saida: Caminho para salvar o gráfico
     """
+    plt, _ = carregar_graficos()
     fig, axes = plt.subplots(1, 2, figsize=(24, 8))
 
     # Ordenar as categorias
@@ -154,6 +169,7 @@ def grafico_barras_urgenza(
     plt.show()
 
 
+@instrumentar
 def grafico_pizza_urgenza(urgenza_counts, salvar=False, caminho_saida=None):
     """
     Cria gráfico de pizza de Categoria Urgenza
@@ -163,6 +179,7 @@ def grafico_pizza_urgenza(urgenza_counts, salvar=False, caminho_saida=None):
         salvar: Se True, salva o gráfico
         caminho_saida: Caminho para salvar o gráfico
     """
+    plt, _ = carregar_graficos()
     fig, ax = plt.subplots(figsize=(14, 10))
 
     urgenza_ordenada = urgenza_counts.reindex(
@@ -209,26 +226,27 @@ def grafico_pizza_urgenza(urgenza_counts, salvar=False, caminho_saida=None):
     plt.show()
 
 
-def analise_urgenza_subgrupo(df):
+@instrumentar
+def analise_urgenza_subgrupo(df, ic=None):
     """
     Análise cruzada de Categoria Urgenza por Sottogruppo Pazienti
 
     Args:
-        df: DataFrame com colunas necessárias
+        df: DataFrame ou ArmazemColunas com colunas necessárias
+        ic: Nível de confiança (ex.: 95) dos intervalos bootstrap por
+            paciente dos percentuais (None: sem intervalos)
 
     Returns:
-        dict com tabelas de análise cruzada
+        dict com tabelas de análise cruzada (e 'ic_inferior' e
+        'ic_superior' dos percentuais, se ic for informado)
     """
-    urgenza_subgrupo = pd.crosstab(
-        df["Categoria Urgenza"],
-        df["Sottogruppo Pazienti"],
-        margins=True,
-        margins_name="Total",
+    urgenza_subgrupo = tabela_cruzada(
+        df, "Categoria Urgenza", "Sottogruppo Pazienti", margens=True
     )
 
     urgenza_subgrupo_perc = (
-        pd.crosstab(
-            df["Categoria Urgenza"], df["Sottogruppo Pazienti"], normalize="index"
+        tabela_cruzada(
+            df, "Categoria Urgenza", "Sottogruppo Pazienti", normalizar="index"
         )
         * 100
     )
@@ -241,19 +259,43 @@ def analise_urgenza_subgrupo(df):
     print("=" * 80)
     print(urgenza_subgrupo_perc.round(2))
 
-    return {"tabela": urgenza_subgrupo, "percentuais": urgenza_subgrupo_perc}
+    resultado = {"tabela": urgenza_subgrupo, "percentuais": urgenza_subgrupo_perc}
+    if ic is not None:
+        intervalos = intervalos_percentuais(
+            df, ["Categoria Urgenza", "Sottogruppo Pazienti"], ic
+        )
+        for chave, coluna in (
+            ("ic_inferior", "IC inferior (%)"),
+            ("ic_superior", "IC superior (%)"),
+        ):
+            resultado[chave] = (
+                intervalos[coluna].unstack().reindex_like(urgenza_subgrupo_perc)
+            )
+
+        print(f"\n   Intervalos de confiança de {ic}% (bootstrap por paciente)")
+        print("-" * 80)
+        print(
+            resultado["ic_inferior"].round(2).astype(str)
+            + " - "
+            + resultado["ic_superior"].round(2).astype(str)
+        )
 
+    return resultado
 
+
+@instrumentar
 def heatmap_urgenza_subgrupo(df, salvar=False, caminho_saida=None):
     """
     Cria heatmap de Categoria Urgenza por Sottogruppo Pazienti
 
     Args:
-        df: DataFrame com colunas necessárias
+        df: DataFrame ou ArmazemColunas com colunas necessárias
         salvar: Se True, salva o gráfico
         caminho_saida: Caminho para salvar o gráfico
     """
-    urgenza_subgrupo = pd.crosstab(df["Categoria Urgenza"], df["Sottogruppo Pazienti"])
+
+    plt, sns = carregar_graficos()
+    urgenza_subgrupo = tabela_cruzada(df, "Categoria Urgenza", "Sottogruppo Pazienti")
 
     # Reordenar categorias
     urgenza_subgrupo = urgenza_subgrupo.reindex(
@@ -293,26 +335,129 @@ def heatmap_urgenza_subgrupo(df, salvar=False, caminho_saida=None):
     plt.show()
 
 
+@instrumentar
+def perfil_chegadas(df):
+    """
+    Calcula o histograma de chegadas por categoria, dia da semana e hora
+
+    Args:
+        df: DataFrame ou ArmazemColunas com colunas 'Categoria Urgenza' e 'Data Accesso'
+
+    Returns:
+        Array (categorias x 7 dias x 24 horas) com as contagens, na ordem
+        de ORDEM_URGENZA e ORDEM_DIAS
+    """
+    df = garantir_dataframe(df, ["Categoria Urgenza", "Data Accesso"])
+
+    categorias = pd.Categorical(
+        df["Categoria Urgenza"], categories=ORDEM_URGENZA
+    ).codes.astype(np.int64)
+    tempos = df["Data Accesso"].to_numpy().astype("datetime64[h]")
+
+    validos = (categorias >= 0) & ~np.isnat(tempos)
+    horas_epoca = tempos[validos].astype(np.int64)
+    horas = horas_epoca % 24
+    dias = (horas_epoca // 24 + 3) % 7  # 01/01/1970 foi uma quinta-feira
+
+    # Uma única contagem sobre o código combinado (categoria, dia, hora)
+    codigos = (categorias[validos] * 7 + dias) * 24 + horas
+
+    return np.bincount(codigos, minlength=len(ORDEM_URGENZA) * 7 * 24).reshape(
+        len(ORDEM_URGENZA), 7, 24
+    )
+
+
+def tabela_chegadas(perfil, categoria=None):
+    """
+    Converte o histograma de chegadas em tabela dia da semana x hora
+
+    Args:
+        perfil: Array retornado por perfil_chegadas()
+        categoria: Categoria Urgenza a selecionar (None soma todas)
+
+    Returns:
+        DataFrame com índice em ORDEM_DIAS e colunas de 0 a 23
+    """
+    if categoria is None:
+        contagens = perfil.sum(axis=0)
+    else:
+        contagens = perfil[ORDEM_URGENZA.index(categoria)]
+
+    tabela = pd.DataFrame(contagens, index=ORDEM_DIAS, columns=range(24))
+    tabela.index.name = "Dia_Semana"
+    tabela.columns.name = "Ora"
+
+    return tabela
+
+
+@instrumentar
+def heatmap_chegadas(perfil, categoria=None, salvar=False, caminho_saida=None):
+    """
+    Cria heatmap de chegadas por dia da semana e hora do dia
+
+    Args:
+        perfil: Array retornado por perfil_chegadas()
+        categoria: Categoria Urgenza a exibir (None para todas)
+        salvar: Se True, salva o gráfico
+        caminho_saida: Caminho para salvar o gráfico
+    """
+    plt, sns = carregar_graficos()
+    chegadas = tabela_chegadas(perfil, categoria)
+
+    fig, ax = plt.subplots(figsize=(24, 8))
+
+    sns.heatmap(
+        chegadas,
+        annot=True,
+        fmt="d",
+        cmap="YlOrRd",
+        cbar_kws={"label": "Chegadas"},
+        linewidths=0.5,
+        linecolor="gray",
+        ax=ax,
+        annot_kws={"fontsize": 9, "fontweight": "bold"},
+    )
+
+    ax.set_xlabel("Hora do Dia", fontsize=16, fontweight="bold")
+    ax.set_ylabel("Dia da Semana", fontsize=16, fontweight="bold")
+    titulo = "Chegadas por Dia da Semana e Hora"
+    if categoria is not None:
+        titulo += f" - Categoria {categoria}"
+    ax.set_title(titulo, fontsize=18, fontweight="bold", pad=20)
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=0, fontsize=12)
+    ax.set_yticklabels(ax.get_yticklabels(), rotation=0, fontsize=12)
+
+    plt.tight_layout()
+
+    if salvar and caminho_saida:
+        plt.savefig(caminho_saida, dpi=300, bbox_inches="tight")
+
+    plt.show()
+
+
+@instrumentar
 def evolucao_temporal_urgenza(df, salvar=False, caminho_saida=None):
     """
     Análise temporal de Categoria Urgenza
 
     Args:
-        df: DataFrame com colunas necessárias
+        df: DataFrame ou ArmazemColunas com colunas necessárias
         salvar: Se True, salva o gráfico
         caminho_saida: Caminho para salvar o gráfico
     """
-    urgenza_mes = pd.crosstab(df["Mese_anno_It"], df["Categoria Urgenza"])
+    df = garantir_dataframe(df, ["Categoria Urgenza", "Data Accesso"])
 
-    # Reordenar categorias
-    urgenza_mes = urgenza_mes[
-        [cat for cat in ORDEM_URGENZA if cat in urgenza_mes.columns]
-    ]
+    # Série mensal em ordem cronológica (índice de datas, não de rótulos)
+    urgenza_mes = serie_urgenza(serie_diaria_urgenza(df), "mes")
+    urgenza_mes = urgenza_mes.loc[:, urgenza_mes.sum() > 0]
+    urgenza_mes.index = rotulos_periodo(urgenza_mes.index, "mes")
+    urgenza_mes.index.name = "Mese_anno_It"
 
     print("\n5. DISTRIBUIÇÃO TEMPORAL: CATEGORIA URGENZA POR MÊS")
     print("=" * 80)
     print(urgenza_mes)
 
+    plt, _ = carregar_graficos()
     fig, ax = plt.subplots(figsize=(24, 10))
 
     for cat in urgenza_mes.columns:
@@ -346,22 +491,23 @@ def evolucao_temporal_urgenza(df, salvar=False, caminho_saida=None):
     plt.show()
 
 
+@instrumentar
 def analise_urgenza_idade(df):
     """
     Análise cruzada de Categoria Urgenza por Fascia d'età
 
     Args:
-        df: DataFrame com colunas necessárias
+        df: DataFrame ou ArmazemColunas com colunas necessárias
 
     Returns:
         dict com tabelas de análise cruzada
     """
-    urgenza_idade = pd.crosstab(
-        df["Categoria Urgenza"], df["Fascia d'età"], margins=True, margins_name="Total"
+    urgenza_idade = tabela_cruzada(
+        df, "Categoria Urgenza", "Fascia d'età", margens=True
     )
 
     urgenza_idade_perc = (
-        pd.crosstab(df["Categoria Urgenza"], df["Fascia d'età"], normalize="index")
+        tabela_cruzada(df, "Categoria Urgenza", "Fascia d'età", normalizar="index")
         * 100
     )
 
@@ -376,12 +522,13 @@ def analise_urgenza_idade(df):
     return {"tabela": urgenza_idade, "percentuais": urgenza_idade_perc}
 
 
+@instrumentar
 def resumo_executivo_urgenza(df, urgenza_counts, urgenza_perc):
     """
     Gera resumo executivo da análise de Categoria Urgenza
 
     Args:
-        df: DataFrame completo
+        df: DataFrame ou ArmazemColunas completo
         urgenza_counts: Series com contagens
         urgenza_perc: Series com percentuais
     """
@@ -3,53 +3,310 @@ API Flask para disponibilizar análises via web
 Exemplo de como hospedar as análises em um servidor
 """
 
-from flask import Flask, jsonify, send_file, request
+from flask import Flask, jsonify, send_file, request, g, Response
 import pandas as pd
+import json
 import os
+import time
 from pathlib import Path
 from io import BytesIO
 import matplotlib
 
 matplotlib.use("Agg")  # Backend sem GUI para servidor
 
-from config import CAMINHO_2022, CAMINHO_2023, CAMINHO_2024
-from utils import configurar_ambiente, carrega_dados, preparar_dataframe
+from config import (
+    COLUNAS_EQUIPE,
+    CONSULTA_LIMITE_LINHAS,
+    HORIZONTE_PREVISAO,
+    LIMITES_FAIXAS,
+    MAX_TOP_CATEGORIAS,
+    ORDEM_URGENZA,
+    REPLICAS_BOOTSTRAP,
+    TOP_CATEGORIAS,
+)
+from utils import (
+    agrupar_contagens,
+    configurar_ambiente,
+    faixa_etaria,
+    filtrar_periodo,
+    resumo_boxplot,
+)
 from analise_urgenza import (
     estatisticas_urgenza,
     analise_urgenza_subgrupo,
     analise_urgenza_idade,
+    perfil_chegadas,
+    tabela_chegadas,
 )
 from analise_geral import (
     analise_dimissione,
     analise_problema_principal,
     relatorio_geral,
 )
+from series_temporais import (
+    serie_diaria_urgenza,
+    serie_urgenza,
+    media_movel,
+    variacao_anual,
+)
+from analise_permanencia import (
+    duracao_contato,
+    curva_ocupacao,
+    estatisticas_permanencia,
+)
+from analise_retornos import intervalos_retorno, taxas_retorno, distribuicao_intervalos
+from analise_carga_trabalho import (
+    agregar_atendimentos,
+    carga_por_profissional,
+    carga_por_turno,
+)
+import metricas
+from armazem_colunas import obter_armazem
+from banco_consulta import consultar, consultar_tabela, identificador, obter_banco
+from indice_pacientes import indice_do_dataframe
+from intervalos_confianca import amostras_bootstrap, intervalos_amostras
+from previsao import obter_modelos, prever
+from analise_estrutura import (
+    analisar_por_estrutura,
+    comparar_estruturas,
+)
+from qualidade_dados import (
+    atualizar_qualidade,
+    ausentes_por_arquivo,
+    ausentes_por_coluna,
+    ausentes_por_semana,
+    resumo_descartes,
+    violacoes,
+)
 
 app = Flask(__name__)
 
 # Variável global para cachear dados (evitar recarregar sempre)
 _df_cache = None
 
+# Cache de resultados derivados dos dados (limpo ao recarregar)
+_cache_resultados = {}
+
+# Caminho do banco de consulta SQLite já sincronizado com o armazém
+_banco_cache = None
+
+
+def obter_resultado(chave, calcular):
+    """Obtém um resultado derivado dos dados com cache"""
+    acerto = chave in _cache_resultados
+    metricas.registrar_cache("resultados", acerto)
+
+    if not acerto:
+        _cache_resultados[chave] = calcular(obter_dados())
+
+    return _cache_resultados[chave]
+
 
 def obter_dados():
     """Obtém dados com cache"""
     global _df_cache
 
+    metricas.registrar_cache("dados", _df_cache is not None)
+
     if _df_cache is None:
         print("Carregando dados...")
+        inicio = time.perf_counter()
         configurar_ambiente()
 
-        df_2022 = carrega_dados(CAMINHO_2022)
-        df_2023 = carrega_dados(CAMINHO_2023)
-        df_2024 = carrega_dados(CAMINHO_2024)
-
-        df_raw = pd.concat([df_2022, df_2023, df_2024], ignore_index=True)
-        _df_cache = preparar_dataframe(df_raw)
+        # Conjunto preparado aberto do armazém de colunas (memory-map),
+        # reconstruído a partir dos CSVs só quando os dados mudaram
+        armazem = obter_armazem()
+        _df_cache = armazem.para_dataframe()
         print(f"Dados carregados: {len(_df_cache)} registros")
 
+        # Histograma de chegadas construído uma única vez na carga
+        _cache_resultados["perfil_chegadas"] = perfil_chegadas(_df_cache)
+
+        # Índice de atendimentos por paciente, persistido com o armazém
+        _cache_resultados["indice_pacientes"] = armazem.indice_pacientes()
+
+        # Versão dos dados (chave do cache em disco dos intervalos bootstrap)
+        _cache_resultados["versao_dados"] = armazem.versao
+
+        # Métricas calculadas uma vez na carga: /metrics nunca toca nos dados
+        metricas.registrar_carga(
+            registros=len(_df_cache),
+            memoria_bytes=int(_df_cache.memory_usage(deep=True).sum()),
+            versao=armazem.versao,
+            duracao=time.perf_counter() - inicio,
+        )
+
     return _df_cache
 
 
+def obter_banco_dados():
+    """
+    Obtém o banco de consulta (SQLite) sincronizado com o armazém
+
+    Não materializa o DataFrame: os endpoints de agregação consultam o
+    banco diretamente.
+    """
+    global _banco_cache
+
+    metricas.registrar_cache("banco", _banco_cache is not None)
+
+    if _banco_cache is None:
+        _banco_cache = obter_banco(obter_armazem())
+
+    return _banco_cache
+
+
+def consultar_banco(sql, parametros=None):
+    """Executa uma consulta interna no banco e devolve um DataFrame"""
+    return consultar_tabela(sql, parametros, caminho=obter_banco_dados())
+
+
+def _frequencias(coluna, top=None):
+    """
+    Contagem e percentual de cada valor de uma coluna (consulta ao banco)
+
+    Returns:
+        tuple (dict contagem, dict percentual), do valor mais frequente
+        ao menos frequente
+    """
+    nome = identificador(coluna)
+    tabela = consultar_banco(
+        f"SELECT {nome} AS valor, COUNT(*) AS n, "
+        f"COUNT(*) * 100.0 / SUM(COUNT(*)) OVER () AS percentual "
+        f"FROM atendimentos WHERE {nome} IS NOT NULL "
+        f"GROUP BY valor ORDER BY n DESC, valor LIMIT ?",
+        [top if top is not None else -1],
+    )
+    valores = tabela["valor"].tolist()
+    return (
+        dict(zip(valores, tabela["n"].tolist())),
+        dict(zip(valores, tabela["percentual"].round(2).tolist())),
+    )
+
+
+def _totais(filtro="", parametros=None):
+    """Atendimentos, pacientes distintos e período (consulta ao banco)"""
+    totais = consultar_banco(
+        'SELECT COUNT(*) AS atendimentos, COUNT(DISTINCT "ID Paziente") AS pacientes, '
+        'MIN("Data Accesso") AS inicio, MAX("Data Accesso") AS fim '
+        f"FROM atendimentos {filtro}",
+        parametros,
+    ).iloc[0]
+    return {
+        "atendimentos": int(totais["atendimentos"]),
+        "pacientes": int(totais["pacientes"]),
+        "inicio": totais["inicio"][:10] if totais["inicio"] else None,
+        "fim": totais["fim"][:10] if totais["fim"] else None,
+    }
+
+
+def _nivel_confianca():
+    """
+    Nível de confiança do parâmetro ?ic= (ex.: ic=95)
+
+    Returns:
+        float ou None se o parâmetro não foi informado
+
+    Raises:
+        ValueError: se o nível não for um número entre 0 e 100
+    """
+    ic = request.args.get("ic")
+    if ic is None:
+        return None
+
+    try:
+        nivel = float(ic)
+    except ValueError:
+        nivel = None
+    if nivel is None or not 0 < nivel < 100:
+        raise ValueError(f"Nível de confiança inválido: {ic}")
+    return nivel
+
+
+def _top_parametro(padrao):
+    """
+    Número de categorias do parâmetro ?top= (entre 1 e MAX_TOP_CATEGORIAS)
+
+    Returns:
+        int (padrao se o parâmetro não foi informado)
+
+    Raises:
+        ValueError: se o valor estiver fora do intervalo
+    """
+    top = request.args.get("top", default=padrao, type=int)
+    if not 1 <= top <= MAX_TOP_CATEGORIAS:
+        raise ValueError(f"top inválido: {top} (entre 1 e {MAX_TOP_CATEGORIAS})")
+    return top
+
+
+def _data_parametro(nome):
+    """
+    Data de um parâmetro da consulta (ex.: ?inicio=2023-01-01)
+
+    Returns:
+        pd.Timestamp ou None se o parâmetro não foi informado
+
+    Raises:
+        ValueError: se o valor não for uma data
+    """
+    valor = request.args.get(nome)
+    if valor is None:
+        return None
+
+    try:
+        data = pd.Timestamp(valor)
+    except ValueError:
+        data = None
+    if data is None or pd.isna(data):
+        raise ValueError(f"Data inválida em {nome}: {valor}")
+    return data
+
+
+def _intervalos(colunas, nivel):
+    """
+    Intervalos bootstrap por paciente dos percentuais (com cache)
+
+    Returns:
+        dict {célula: [inferior, superior]} (com duas colunas,
+        {valor da segunda: {valor da primeira: [inferior, superior]}})
+    """
+
+    # Réplicas em cache por colunas; o nível só escolhe os percentis
+    percentuais, amostras = obter_resultado(
+        ("intervalos", tuple(colunas)),
+        lambda df: amostras_bootstrap(
+            df, colunas, versao=_cache_resultados.get("versao_dados")
+        ),
+    )
+    intervalos = intervalos_amostras(percentuais, amostras, nivel)
+    limites = (
+        intervalos[["IC inferior (%)", "IC superior (%)"]].round(2).apply(list, axis=1)
+    )
+    if len(colunas) == 1:
+        return limites.to_dict()
+    return limites.unstack().to_dict()
+
+
+@app.before_request
+def iniciar_cronometro():
+    """Marca o início da requisição para o histograma de latência"""
+    g.inicio_requisicao = time.perf_counter()
+
+
+@app.after_request
+def registrar_metricas(resposta):
+    """Registra contagem e latência da requisição por rota"""
+    inicio = g.pop("inicio_requisicao", None)
+    if inicio is not None:
+        # Regra da rota (ex.: /dados/exportar/<formato>) para limitar rótulos
+        rota = request.url_rule.rule if request.url_rule else "nao_encontrada"
+        metricas.registrar_requisicao(
+            rota, request.method, resposta.status_code, time.perf_counter() - inicio
+        )
+
+    return resposta
+
+
 @app.route("/")
 def home():
     """Página inicial com informações da API"""
@@ -59,12 +316,26 @@ def home():
             "versao": "1.0",
             "endpoints": {
                 "/status": "Status e informações básicas",
-                "/analise/urgenza": "Estatísticas de Categoria Urgenza",
-                "/analise/dimissione": "Estatísticas de Modalità Dimissione",
+                "/analise/urgenza": "Estatísticas de Categoria Urgenza (?ic=95)",
+                "/analise/dimissione": "Estatísticas de Modalità Dimissione (?ic=95)",
                 "/analise/problemas": "Top problemas principais",
                 "/analise/resumo": "Resumo geral",
+                "/analise/idade?limites=0,18,65": "Faixas etárias (limites opcionais)",
+                "/analise/temporal": "Série temporal de Categoria Urgenza",
+                "/previsao?dias=28": "Previsão diária de chegadas por categoria",
+                "/analise/permanencia": "Duração do contato e ocupação",
+                "/analise/retornos": "Retornos em 72h / 30 dias",
+                "/analise/carga": "Carga de trabalho por médico ou triagista",
+                "/analise/chegadas": "Chegadas por dia da semana e hora",
+                "/analise/distribuicao?coluna=Età": "Resumo de contagem ou boxplot",
+                "/analise/estruturas": "Comparação entre estruturas (?estrutura=)",
+                "/pacientes/<id ou nome>": "Histórico de atendimentos de um paciente",
+                "/pacientes?id=1&id=2": "Histórico de vários pacientes (ou POST)",
+                "/consulta?sql=SELECT ...": "Consulta SQL somente leitura (NDJSON)",
+                "/qualidade": "Valores ausentes, descartes e violações de regras",
                 "/dados/total": "Total de registros",
                 "/dados/periodo": "Período dos dados",
+                "/metrics": "Métricas no formato do Prometheus",
             },
         }
     )
@@ -74,15 +345,16 @@ def home():
 def status():
     """Status da API e dados carregados"""
     try:
-        df = obter_dados()
+        totais = _totais()
+        colunas = consultar_banco("SELECT * FROM atendimentos LIMIT 0").columns
         return jsonify(
             {
                 "status": "online",
-                "registros_carregados": len(df),
-                "pacientes_unicos": int(df["Paziente"].nunique()),
-                "periodo_inicio": df["Data Accesso"].min().strftime("%Y-%m-%d"),
-                "periodo_fim": df["Data Accesso"].max().strftime("%Y-%m-%d"),
-                "colunas": list(df.columns),
+                "registros_carregados": totais["atendimentos"],
+                "pacientes_unicos": totais["pacientes"],
+                "periodo_inicio": totais["inicio"],
+                "periodo_fim": totais["fim"],
+                "colunas": list(colunas),
             }
         )
     except Exception as e:
@@ -91,60 +363,87 @@ def status():
 
 @app.route("/analise/urgenza")
 def analise_urgenza_endpoint():
-    """Retorna estatísticas de Categoria Urgenza"""
+    """
+    Retorna estatísticas de Categoria Urgenza
+    Exemplo: /analise/urgenza?ic=95 (intervalos de confiança bootstrap)
+    """
     try:
-        df = obter_dados()
+        try:
+            nivel = _nivel_confianca()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
 
-        urgenza_counts = df["Categoria Urgenza"].value_counts().to_dict()
-        urgenza_perc = (
-            (df["Categoria Urgenza"].value_counts(normalize=True) * 100)
-            .round(2)
+        urgenza_counts, urgenza_perc = _frequencias("Categoria Urgenza")
+
+        # Análise por subgrupo (percorre só o índice de Categoria Urgenza)
+        urgenza_subgrupo = (
+            consultar_banco(
+                'SELECT "Categoria Urgenza" AS categoria, '
+                '"Sottogruppo Pazienti" AS subgrupo, COUNT(*) AS n '
+                'FROM atendimentos WHERE "Categoria Urgenza" IS NOT NULL '
+                'AND "Sottogruppo Pazienti" IS NOT NULL GROUP BY 1, 2'
+            )
+            .pivot(index="categoria", columns="subgrupo", values="n")
+            .fillna(0)
+            .astype(int)
             .to_dict()
         )
+        totais = _totais()
 
-        # Análise por subgrupo
-        urgenza_subgrupo = pd.crosstab(
-            df["Categoria Urgenza"], df["Sottogruppo Pazienti"]
-        ).to_dict()
-
-        return jsonify(
-            {
-                "status": "success",
-                "distribuicao": {
-                    "contagem": urgenza_counts,
-                    "percentual": urgenza_perc,
-                },
-                "por_subgrupo": urgenza_subgrupo,
-                "total_atendimentos": len(df),
-                "pacientes_unicos": int(df["Paziente"].nunique()),
+        resposta = {
+            "status": "success",
+            "distribuicao": {
+                "contagem": urgenza_counts,
+                "percentual": urgenza_perc,
+            },
+            "por_subgrupo": urgenza_subgrupo,
+            "total_atendimentos": totais["atendimentos"],
+            "pacientes_unicos": totais["pacientes"],
+        }
+        if nivel is not None:
+            resposta["intervalo_confianca"] = {
+                "nivel": nivel,
+                "replicas": REPLICAS_BOOTSTRAP,
+                "percentual": _intervalos(["Categoria Urgenza"], nivel),
+                "por_subgrupo": _intervalos(
+                    ["Categoria Urgenza", "Sottogruppo Pazienti"], nivel
+                ),
             }
-        )
+
+        return jsonify(resposta)
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
 @app.route("/analise/dimissione")
 def analise_dimissione_endpoint():
-    """Retorna estatísticas de Modalità Dimissione"""
+    """
+    Retorna estatísticas de Modalità Dimissione
+    Exemplo: /analise/dimissione?ic=95 (intervalos de confiança bootstrap)
+    """
     try:
-        df = obter_dados()
+        try:
+            nivel = _nivel_confianca()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
 
-        dimissione_counts = df["Modalità Dimissione"].value_counts().to_dict()
-        dimissione_perc = (
-            (df["Modalità Dimissione"].value_counts(normalize=True) * 100)
-            .round(2)
-            .to_dict()
-        )
+        dimissione_counts, dimissione_perc = _frequencias("Modalità Dimissione")
 
-        return jsonify(
-            {
-                "status": "success",
-                "distribuicao": {
-                    "contagem": dimissione_counts,
-                    "percentual": dimissione_perc,
-                },
+        resposta = {
+            "status": "success",
+            "distribuicao": {
+                "contagem": dimissione_counts,
+                "percentual": dimissione_perc,
+            },
+        }
+        if nivel is not None:
+            resposta["intervalo_confianca"] = {
+                "nivel": nivel,
+                "replicas": REPLICAS_BOOTSTRAP,
+                "percentual": _intervalos(["Modalità Dimissione"], nivel),
             }
-        )
+
+        return jsonify(resposta)
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -153,16 +452,12 @@ def analise_dimissione_endpoint():
 def analise_problemas_endpoint():
     """Retorna top problemas principais"""
     try:
-        df = obter_dados()
-        top_n = request.args.get("top", default=10, type=int)
+        try:
+            top_n = _top_parametro(10)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
 
-        problema_counts = df["Problema Principale"].value_counts().head(top_n).to_dict()
-        problema_perc = (
-            (df["Problema Principale"].value_counts(normalize=True) * 100)
-            .head(top_n)
-            .round(2)
-            .to_dict()
-        )
+        problema_counts, problema_perc = _frequencias("Problema Principale", top_n)
 
         return jsonify(
             {
@@ -181,35 +476,36 @@ def analise_problemas_endpoint():
 def resumo_endpoint():
     """Retorna resumo geral das análises"""
     try:
-        df = obter_dados()
+        totais = _totais()
 
-        # Categoria urgenza predominante
-        cat_urgenza = df["Categoria Urgenza"].value_counts()
+        # Categoria urgenza predominante (primeira em ordem de frequência)
+        cat_urgenza, _ = _frequencias("Categoria Urgenza", top=1)
+        predominante, contagem = next(iter(cat_urgenza.items()))
 
         # Subgrupos
-        subgrupos = df["Sottogruppo Pazienti"].value_counts()
+        subgrupos, _ = _frequencias("Sottogruppo Pazienti")
 
         # Faixas etárias
-        faixas = df["Fascia d'età"].value_counts()
+        faixas, _ = _frequencias("Fascia d'età")
 
         resumo = {
             "status": "success",
             "dados_gerais": {
-                "total_atendimentos": len(df),
-                "pacientes_unicos": int(df["Paziente"].nunique()),
+                "total_atendimentos": totais["atendimentos"],
+                "pacientes_unicos": totais["pacientes"],
                 "media_atendimentos_paciente": round(
-                    len(df) / df["Paziente"].nunique(), 2
+                    totais["atendimentos"] / totais["pacientes"], 2
                 ),
-                "periodo_inicio": df["Data Accesso"].min().strftime("%Y-%m-%d"),
-                "periodo_fim": df["Data Accesso"].max().strftime("%Y-%m-%d"),
+                "periodo_inicio": totais["inicio"],
+                "periodo_fim": totais["fim"],
             },
             "categoria_urgenza": {
-                "predominante": cat_urgenza.idxmax(),
-                "contagem": int(cat_urgenza.max()),
-                "percentual": round(cat_urgenza.max() / len(df) * 100, 2),
+                "predominante": predominante,
+                "contagem": contagem,
+                "percentual": round(contagem / totais["atendimentos"] * 100, 2),
             },
-            "subgrupos": subgrupos.to_dict(),
-            "faixas_etarias": faixas.to_dict(),
+            "subgrupos": subgrupos,
+            "faixas_etarias": faixas,
         }
 
         return jsonify(resumo)
@@ -217,6 +513,672 @@ def resumo_endpoint():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/analise/idade")
+def analise_idade_endpoint():
+    """
+    Retorna a distribuição por faixa etária (idade no atendimento) e os
+    percentuais de cada faixa por Categoria Urgenza
+    Exemplo: /analise/idade?limites=0,18,65
+
+    Os limites são a idade mínima de cada faixa; sem o parâmetro, valem
+    as faixas de config.LIMITES_FAIXAS.
+    """
+    try:
+        texto = request.args.get("limites")
+
+        # Contagens por idade (uma vez); as faixas de cada requisição só
+        # agrupam essas poucas linhas, sem percorrer os atendimentos
+        idades, por_urgenza = obter_resultado(
+            "idades",
+            lambda df: (
+                df["Età Accesso"].value_counts(sort=False),
+                pd.crosstab(df["Età Accesso"], df["Categoria Urgenza"]),
+            ),
+        )
+
+        try:
+            limites = (
+                tuple(int(limite) for limite in texto.split(","))
+                if texto
+                else tuple(LIMITES_FAIXAS)
+            )
+            contagem = idades.groupby(
+                faixa_etaria(idades.index, limites), observed=False
+            ).sum()
+            por_faixa = (
+                por_urgenza.groupby(
+                    faixa_etaria(por_urgenza.index, limites), observed=False
+                )
+                .sum()
+                .T
+            )
+        except ValueError:
+            return (
+                jsonify({"status": "error", "message": f"Limites inválidos: {texto}"}),
+                400,
+            )
+        percentuais = por_faixa.div(por_faixa.sum(axis=1), axis=0) * 100
+
+        return jsonify(
+            {
+                "status": "success",
+                "limites": list(limites),
+                "faixas": list(contagem.index),
+                "contagem": {faixa: int(total) for faixa, total in contagem.items()},
+                "percentual_por_urgenza": percentuais.round(2).to_dict(orient="index"),
+            }
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/analise/temporal")
+def analise_temporal_endpoint():
+    """
+    Retorna a série temporal de Categoria Urgenza
+    Exemplo: /analise/temporal?granularidade=semana&janela=4
+    """
+    try:
+        granularidade = request.args.get("granularidade", default="mes")
+        janela = request.args.get("janela", default=3, type=int)
+
+        serie_diaria = obter_resultado("serie_diaria", serie_diaria_urgenza)
+        serie = serie_urgenza(serie_diaria, granularidade)
+        movel = media_movel(serie, janela)
+        variacao = variacao_anual(serie, granularidade)["percentual"]
+
+        def para_dict(tabela):
+            tabela = tabela.round(2).astype(object)
+            tabela = tabela.where(tabela.notna(), None)
+            tabela.index = tabela.index.strftime("%Y-%m-%d")
+            return tabela.to_dict(orient="index")
+
+        return jsonify(
+            {
+                "status": "success",
+                "granularidade": granularidade,
+                "janela": janela,
+                "contagem": para_dict(serie),
+                "media_movel": para_dict(movel),
+                "variacao_anual_perc": para_dict(variacao),
+            }
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/previsao")
+def previsao_endpoint():
+    """
+    Retorna a previsão diária de chegadas por Categoria Urgenza
+    Exemplo: /previsao?dias=28&categoria=Gialla&ic=80
+
+    Os parâmetros dos modelos são ajustados uma vez por versão dos dados
+    (cache em disco); cada requisição só avalia o modelo nos dias pedidos.
+    """
+    try:
+        dias = request.args.get("dias", default=HORIZONTE_PREVISAO, type=int)
+        categoria = request.args.get("categoria")
+        try:
+            nivel = _nivel_confianca()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        if nivel is None:
+            nivel = 95.0
+
+        if not 1 <= dias <= 366:
+            return (
+                jsonify({"status": "error", "message": f"Dias inválido: {dias}"}),
+                400,
+            )
+        if categoria is not None and categoria not in ORDEM_URGENZA:
+            return (
+                jsonify(
+                    {"status": "error", "message": f"Categoria inválida: {categoria}"}
+                ),
+                400,
+            )
+
+        def calcular(df):
+            return obter_modelos(
+                obter_resultado("serie_diaria", serie_diaria_urgenza),
+                versao=_cache_resultados.get("versao_dados"),
+            )
+
+        modelos = obter_resultado("modelos_previsao", calcular)
+        previsao = prever(modelos, dias, nivel=nivel)
+
+        def para_dict(tabela):
+            if categoria is not None:
+                tabela = tabela[[categoria]]
+            tabela = tabela.round(2)
+            tabela.index = tabela.index.strftime("%Y-%m-%d")
+            return tabela.to_dict(orient="index")
+
+        return jsonify(
+            {
+                "status": "success",
+                "treino": {"inicio": modelos["inicio"], "fim": modelos["fim"]},
+                "dias": dias,
+                "nivel": nivel,
+                "previsto": para_dict(previsao["previsto"]),
+                "inferior": para_dict(previsao["inferior"]),
+                "superior": para_dict(previsao["superior"]),
+            }
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/analise/permanencia")
+def analise_permanencia_endpoint():
+    """
+    Retorna duração do contato e curva de ocupação
+    Exemplo: /analise/permanencia?frequencia=h&por=Sottogruppo Pazienti
+    """
+    try:
+        frequencia = request.args.get("frequencia", default="D")
+        por = request.args.get("por", default="Categoria Urgenza")
+
+        if frequencia not in ("h", "D"):
+            return (
+                jsonify(
+                    {"status": "error", "message": "Frequência deve ser 'h' ou 'D'"}
+                ),
+                400,
+            )
+        if por not in ("Categoria Urgenza", "Sottogruppo Pazienti"):
+            return (
+                jsonify({"status": "error", "message": f"Coluna inválida: {por}"}),
+                400,
+            )
+
+        duracao = obter_resultado("duracao_contato", duracao_contato)
+        estatisticas = obter_resultado(
+            ("permanencia", por), lambda df: estatisticas_permanencia(df, por)
+        )
+        ocupacao = obter_resultado(
+            ("ocupacao", frequencia, por),
+            lambda df: curva_ocupacao(df, frequencia, por),
+        )
+
+        estatisticas = estatisticas.round(2).astype(object)
+        ocupacao_total = ocupacao.sum(axis=1)
+
+        # Sem atendimentos com Data Fine Contatto: sem duração nem ocupação
+        com_duracao = duracao.notna().any()
+        com_ocupacao = not ocupacao_total.empty
+
+        return jsonify(
+            {
+                "status": "success",
+                "duracao_media_horas": (
+                    round(float(duracao.mean()), 2) if com_duracao else None
+                ),
+                "duracao_mediana_horas": (
+                    round(float(duracao.median()), 2) if com_duracao else None
+                ),
+                "por_grupo": estatisticas.where(estatisticas.notna(), None).to_dict(
+                    orient="index"
+                ),
+                "ocupacao": {
+                    "frequencia": frequencia,
+                    "media": (
+                        round(float(ocupacao_total.mean()), 2) if com_ocupacao else None
+                    ),
+                    "pico": int(ocupacao_total.max()) if com_ocupacao else None,
+                    "pico_periodo": (
+                        ocupacao_total.idxmax().isoformat() if com_ocupacao else None
+                    ),
+                    "serie": {
+                        periodo.isoformat(): linha
+                        for periodo, linha in ocupacao.to_dict(orient="index").items()
+                    },
+                },
+            }
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/analise/retornos")
+def analise_retornos_endpoint():
+    """
+    Retorna taxas de retorno e distribuição dos intervalos
+    Exemplo: /analise/retornos?por=Categoria Urgenza
+    """
+    try:
+        por = request.args.get("por", default="Sottogruppo Pazienti")
+
+        if por not in ("Categoria Urgenza", "Sottogruppo Pazienti"):
+            return (
+                jsonify({"status": "error", "message": f"Coluna inválida: {por}"}),
+                400,
+            )
+
+        retornos = obter_resultado("retornos", intervalos_retorno)
+        df = obter_dados()
+        taxas = obter_resultado(
+            ("taxas_retorno", por), lambda df: taxas_retorno(df, retornos, por)
+        )
+        distribuicao = obter_resultado(
+            ("distribuicao_intervalos", por),
+            lambda df: distribuicao_intervalos(df, retornos, por),
+        )
+
+        taxas = taxas.round(2).astype(object)
+        dias = retornos["Horas desde anterior"].dropna() / 24
+
+        return jsonify(
+            {
+                "status": "success",
+                "intervalo_mediano_dias": (
+                    round(float(dias.median()), 1) if len(dias) > 0 else None
+                ),
+                "taxas": taxas.where(taxas.notna(), None).to_dict(orient="index"),
+                "distribuicao_intervalos": distribuicao.to_dict(orient="index"),
+                "total_atendimentos": len(df),
+            }
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/analise/carga")
+def analise_carga_endpoint():
+    """
+    Retorna a carga de trabalho por profissional e por turno
+    Exemplo: /analise/carga?papel=triagista&top=5&inicio=2023-01-01&fim=2023-06-30
+    """
+    try:
+        papel = request.args.get("papel", default="medico")
+        top_n = request.args.get("top", default=10, type=int)
+        try:
+            inicio = _data_parametro("inicio")
+            fim = _data_parametro("fim")
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        if top_n < 1:
+            return (
+                jsonify({"status": "error", "message": f"top inválido: {top_n}"}),
+                400,
+            )
+        if papel not in COLUNAS_EQUIPE:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"Papel inválido: {papel}. "
+                        f"Use um de: {', '.join(COLUNAS_EQUIPE)}",
+                    }
+                ),
+                400,
+            )
+        coluna = COLUNAS_EQUIPE[papel]
+
+        # Contagens agregadas por papel (uma vez); o período de cada
+        # requisição filtra essa tabela, menor que a de atendimentos
+        agregados = filtrar_periodo(
+            obter_resultado(
+                ("carga", papel), lambda df: agregar_atendimentos(df, coluna)
+            ),
+            inicio,
+            fim,
+        )
+        pesos = agregados["Atendimentos"]
+        profissionais = carga_por_profissional(agregados, coluna, pesos)
+        resposta = {
+            "status": "success",
+            "papel": coluna,
+            "periodo": {
+                "inicio": inicio.isoformat() if inicio is not None else None,
+                "fim": fim.isoformat() if fim is not None else None,
+            },
+            "total_profissionais": len(profissionais),
+            "top_profissionais": [
+                {"profissional": nome, **valores}
+                for nome, valores in profissionais.head(top_n)
+                .to_dict(orient="index")
+                .items()
+            ],
+        }
+
+        # Sem horário em 'Data Accesso' não há como atribuir turnos
+        turnos = carga_por_turno(agregados, coluna, pesos)
+        if turnos is None:
+            resposta["turnos"] = None
+            resposta["mensagem_turnos"] = (
+                "Carga por turno indisponível: 'Data Accesso' não tem horário"
+            )
+        else:
+            turnos = turnos[turnos["Atendimentos"] > 0].astype(object)
+            resposta["turnos"] = [
+                {"dia_semana": dia, "turno": turno, **valores}
+                for (dia, turno), valores in turnos.where(turnos.notna(), None)
+                .to_dict(orient="index")
+                .items()
+            ]
+
+        return jsonify(resposta)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/analise/chegadas")
+def analise_chegadas_endpoint():
+    """
+    Retorna as chegadas por dia da semana e hora do dia
+    Exemplo: /analise/chegadas?categoria=Gialla
+    """
+    try:
+        categoria = request.args.get("categoria")
+
+        if categoria is not None and categoria not in ORDEM_URGENZA:
+            return (
+                jsonify(
+                    {"status": "error", "message": f"Categoria inválida: {categoria}"}
+                ),
+                400,
+            )
+
+        perfil = obter_resultado("perfil_chegadas", perfil_chegadas)
+        chegadas = tabela_chegadas(perfil, categoria)
+
+        return jsonify(
+            {
+                "status": "success",
+                "categoria": categoria,
+                "dias": list(chegadas.index),
+                "horas": list(chegadas.columns),
+                "contagem": chegadas.values.tolist(),
+                "total": int(chegadas.values.sum()),
+            }
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/analise/distribuicao")
+def analise_distribuicao_endpoint():
+    """
+    Retorna o resumo usado nos gráficos de uma coluna: contagens (top N e
+    "Outros") ou estatísticas do boxplot (colunas numéricas)
+    Exemplo: /analise/distribuicao?coluna=Età&tipo=boxplot
+    """
+    try:
+        coluna = request.args.get("coluna")
+        tipo = request.args.get("tipo")
+        try:
+            top_n = _top_parametro(TOP_CATEGORIAS)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        df = obter_dados()
+        if coluna not in df.columns:
+            return (
+                jsonify({"status": "error", "message": f"Coluna inválida: {coluna}"}),
+                400,
+            )
+
+        numerica = pd.api.types.is_numeric_dtype(df[coluna].dtype)
+        tipo = tipo or ("boxplot" if numerica else "contagem")
+        if tipo not in ("contagem", "boxplot") or (tipo == "boxplot" and not numerica):
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"Tipo inválido para a coluna {coluna}: {tipo}",
+                    }
+                ),
+                400,
+            )
+
+        if tipo == "boxplot":
+            resumo = obter_resultado(
+                ("distribuicao", coluna, tipo), lambda df: resumo_boxplot(df[coluna])
+            )
+            return jsonify(
+                {"status": "success", "coluna": coluna, "tipo": tipo, **resumo}
+            )
+
+        # Uma contagem por coluna; o corte em top_n é feito a cada requisição
+        contagens = obter_resultado(
+            ("distribuicao", coluna, tipo), lambda df: df[coluna].value_counts()
+        )
+        contagem = agrupar_contagens(contagens, top=top_n)
+        return jsonify(
+            {
+                "status": "success",
+                "coluna": coluna,
+                "tipo": tipo,
+                "total": int(contagem.sum()),
+                "contagem": [
+                    {"valor": str(valor), "total": int(total)}
+                    for valor, total in contagem.items()
+                ],
+            }
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def _tabela_json(tabela):
+    """Series/DataFrame como dict para JSON (datas do índice em AAAA-MM-DD)"""
+    if isinstance(tabela.index, pd.DatetimeIndex):
+        tabela = tabela.copy()
+        tabela.index = tabela.index.strftime("%Y-%m-%d")
+    if isinstance(tabela, pd.Series):
+        return tabela.to_dict()
+    return tabela.to_dict(orient="index")
+
+
+@app.route("/analise/estruturas")
+def analise_estruturas_endpoint():
+    """
+    Retorna as tabelas comparativas entre estruturas (Struttura) ou, com
+    ?estrutura=, as análises de uma estrutura
+    Exemplo: /analise/estruturas?estrutura=DEA - PRONTO SOCCORSO P.O. CHIARI
+
+    As estruturas são analisadas uma vez, no próprio processo, a partir dos
+    dados do armazém (que guarda 'Struttura'), e os resultados ficam em
+    cache até /recarregar.
+    """
+    try:
+        estrutura = request.args.get("estrutura")
+
+        resultados = obter_resultado("estruturas", analisar_por_estrutura)
+
+        if estrutura is None:
+            tabelas = obter_resultado(
+                "estruturas_comparacao", lambda df: comparar_estruturas(resultados)
+            )
+            return jsonify(
+                {
+                    "status": "success",
+                    "estruturas": list(resultados),
+                    **{nome: _tabela_json(tabela) for nome, tabela in tabelas.items()},
+                }
+            )
+
+        if estrutura not in resultados:
+            return (
+                jsonify(
+                    {"status": "error", "message": f"Estrutura inválida: {estrutura}"}
+                ),
+                400,
+            )
+
+        saida = resultados[estrutura]
+        return jsonify(
+            {
+                "status": "success",
+                "estrutura": estrutura,
+                "totais": saida["totais"],
+                "urgenza": _tabela_json(saida["urgenza"]["resumo"]),
+                "urgenza_subgrupo_percentuais": _tabela_json(
+                    saida["urgenza"]["subgrupo_percentuais"]
+                ),
+                "dimissione": _tabela_json(saida["dimissione"]["resumo"]),
+                "atendimentos_dia_semana": _tabela_json(saida["temporal"]["por_dia"]),
+                "atendimentos_mes": _tabela_json(saida["temporal"]["atendimentos_mes"]),
+            }
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# Colunas de cada atendimento no histórico de um paciente
+COLUNAS_HISTORICO = {
+    "numero_scheda": "Numero Scheda PS",
+    "data_accesso": "Data Accesso",
+    "data_fine_contatto": "Data Fine Contatto",
+    "categoria_urgenza": "Categoria Urgenza",
+    "problema_principale": "Problema Principale",
+    "modalita_dimissione": "Modalità Dimissione",
+}
+
+# Máximo de pacientes por consulta em lote
+MAX_PACIENTES_LOTE = 500
+
+
+def _id_paciente(indice, paciente):
+    """ID de um paciente a partir do ID numérico ou do nome (None se não existir)"""
+    paciente = str(paciente).strip()
+    if paciente.isdigit():
+        id_paciente = int(paciente)
+        return id_paciente if id_paciente < len(indice) else None
+    id_paciente = indice.id_paciente(paciente)
+    return (
+        id_paciente if id_paciente is not None else indice.id_paciente(paciente.upper())
+    )
+
+
+def _historico_paciente(df, indice, id_paciente):
+    """
+    Histórico de um paciente a partir do índice
+
+    Só as linhas do paciente são lidas (posições do índice), então o
+    custo não depende do tamanho do conjunto de dados.
+    """
+    visitas = df.iloc[indice.visitas(id_paciente)]
+    colunas = {
+        chave: coluna
+        for chave, coluna in COLUNAS_HISTORICO.items()
+        if coluna in visitas.columns
+    }
+
+    linha_do_tempo = []
+    for _, visita in visitas[list(colunas.values())].iterrows():
+        registro = {}
+        for chave, coluna in colunas.items():
+            valor = visita[coluna]
+            if isinstance(valor, pd.Timestamp):
+                valor = valor.isoformat()
+            registro[chave] = None if pd.isna(valor) else valor
+        linha_do_tempo.append(registro)
+
+    urgenza = visitas["Categoria Urgenza"].value_counts()
+
+    return {
+        "id": int(id_paciente),
+        "paziente": indice.nome(id_paciente),
+        "subgrupo": (
+            visitas["Sottogruppo Pazienti"].iloc[0] if len(visitas) > 0 else None
+        ),
+        "atendimentos": indice.contagem(id_paciente),
+        "historico_urgenza": {
+            categoria: int(urgenza[categoria])
+            for categoria in ORDEM_URGENZA
+            if categoria in urgenza.index
+        },
+        "visitas": linha_do_tempo,
+    }
+
+
+@app.route("/pacientes/<paciente>")
+def paciente_endpoint(paciente):
+    """
+    Retorna o histórico de atendimentos de um paciente
+    Exemplo: /pacientes/MARINO FRANCESCO ou /pacientes/47563 (ID Paziente)
+    """
+    try:
+        df = obter_dados()
+        indice = obter_resultado("indice_pacientes", indice_do_dataframe)
+
+        id_paciente = _id_paciente(indice, paciente)
+        if id_paciente is None:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"Paciente não encontrado: {paciente}",
+                    }
+                ),
+                404,
+            )
+
+        return jsonify(
+            {"status": "success", **_historico_paciente(df, indice, id_paciente)}
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/pacientes", methods=["GET", "POST"])
+def pacientes_lote_endpoint():
+    """
+    Retorna o histórico de vários pacientes
+    Exemplos: /pacientes?id=47563&id=MARINO FRANCESCO
+              POST /pacientes {"pacientes": [47563, "MARINO FRANCESCO"]}
+    """
+    try:
+        if request.method == "POST":
+            pacientes = (request.get_json(silent=True) or {}).get("pacientes", [])
+        else:
+            pacientes = request.args.getlist("id")
+
+        if not isinstance(pacientes, list) or not pacientes:
+            return (
+                jsonify({"status": "error", "message": "Informe os pacientes"}),
+                400,
+            )
+        if len(pacientes) > MAX_PACIENTES_LOTE:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"Máximo de {MAX_PACIENTES_LOTE} pacientes",
+                    }
+                ),
+                400,
+            )
+
+        df = obter_dados()
+        indice = obter_resultado("indice_pacientes", indice_do_dataframe)
+
+        encontrados = []
+        nao_encontrados = []
+        for paciente in pacientes:
+            id_paciente = _id_paciente(indice, paciente)
+            if id_paciente is None:
+                nao_encontrados.append(paciente)
+            else:
+                encontrados.append(_historico_paciente(df, indice, id_paciente))
+
+        return jsonify(
+            {
+                "status": "success",
+                "pacientes": encontrados,
+                "nao_encontrados": nao_encontrados,
+            }
+        )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @app.route("/dados/filtrar")
 def filtrar_dados():
     """
@@ -224,33 +1186,188 @@ def filtrar_dados():
     Exemplo: /dados/filtrar?categoria=Verde&ano=2023
     """
     try:
-        df = obter_dados()
+        # Filtros como predicados da consulta: o de ano é um intervalo de
+        # 'Data Accesso' (índice); subgrupos vêm do histórico completo
+        condicoes = []
+        parametros = []
 
-        # Aplicar filtros
         if "categoria" in request.args:
-            categoria = request.args["categoria"]
-            df = df[df["Categoria Urgenza"] == categoria]
+            condicoes.append('"Categoria Urgenza" = ?')
+            parametros.append(request.args["categoria"])
 
         if "ano" in request.args:
             ano = int(request.args["ano"])
-            df = df[df["Data Accesso"].dt.year == ano]
+            condicoes.append('"Data Accesso" >= ? AND "Data Accesso" < ?')
+            parametros += [f"{ano}-01-01", f"{ano + 1}-01-01"]
 
         if "subgrupo" in request.args:
-            subgrupo = request.args["subgrupo"]
-            df = df[df["Sottogruppo Pazienti"] == subgrupo]
+            condicoes.append('"Sottogruppo Pazienti" = ?')
+            parametros.append(request.args["subgrupo"])
+
+        filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        totais = _totais(filtro, parametros)
 
         return jsonify(
             {
                 "status": "success",
                 "filtros_aplicados": dict(request.args),
-                "registros_encontrados": len(df),
-                "pacientes_unicos": int(df["Paziente"].nunique()),
+                "registros_encontrados": totais["atendimentos"],
+                "pacientes_unicos": totais["pacientes"],
             }
         )
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/consulta", methods=["GET", "POST"])
+def consulta_endpoint():
+    """
+    Consulta SQL somente leitura sobre a tabela 'atendimentos'
+
+    Resposta em NDJSON, transmitida à medida que as linhas são lidas: uma
+    linha {"colunas": [...]}, uma lista de valores por linha do resultado
+    e, ao final, {"linhas": n, "truncado": bool} (ou {"erro": ...} se o
+    tempo máximo for excedido durante a leitura).
+
+    Exemplos: /consulta?sql=SELECT COUNT(*) AS n FROM atendimentos
+              /consulta?sql=SELECT * FROM atendimentos WHERE "Paziente" = ?&p=ROSSI MARIO
+              POST /consulta {"sql": "...", "parametros": [...], "limite": 100}
+    """
+    try:
+        if request.method == "POST":
+            corpo = request.get_json(silent=True) or {}
+        else:
+            corpo = {
+                "sql": request.args.get("sql"),
+                "parametros": request.args.getlist("p"),
+                "limite": request.args.get("limite", type=int),
+            }
+
+        sql = corpo.get("sql")
+        parametros = corpo.get("parametros") or []
+        limite = corpo.get("limite")
+        limite = CONSULTA_LIMITE_LINHAS if limite is None else limite
+
+        if not isinstance(sql, str) or not sql.strip():
+            return jsonify({"status": "error", "message": "Informe a consulta"}), 400
+        if not isinstance(parametros, (list, dict)):
+            return (
+                jsonify({"status": "error", "message": "Parâmetros inválidos"}),
+                400,
+            )
+        if not isinstance(limite, int) or limite < 1:
+            return jsonify({"status": "error", "message": "Limite inválido"}), 400
+        limite = min(limite, CONSULTA_LIMITE_LINHAS)
+
+        # Uma linha a mais que o limite indica resultado truncado
+        try:
+            colunas, linhas = consultar(
+                sql, parametros, limite=limite + 1, caminho=obter_banco_dados()
+            )
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except TimeoutError as e:
+            return jsonify({"status": "error", "message": str(e)}), 408
+
+        def gerar():
+            yield json.dumps({"colunas": colunas}, ensure_ascii=False) + "\n"
+            enviadas = 0
+            truncado = False
+            try:
+                for linha in linhas:
+                    if enviadas == limite:
+                        truncado = True
+                        break
+                    yield json.dumps(linha, ensure_ascii=False) + "\n"
+                    enviadas += 1
+            except (ValueError, TimeoutError) as e:
+                yield json.dumps({"erro": str(e)}, ensure_ascii=False) + "\n"
+                return
+            finally:
+                linhas.close()
+            yield json.dumps({"linhas": enviadas, "truncado": truncado}) + "\n"
+
+        return Response(gerar(), mimetype="application/x-ndjson")
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def _registros(tabela, colunas):
+    """Tabela de qualidade como dict {índice: {chave: valor}} para JSON"""
+    tabela = tabela[list(colunas)].rename(columns=colunas)
+    return tabela.astype(object).where(tabela.notna(), None).to_dict(orient="index")
+
+
+def _perfil_qualidade(detalhe=None):
+    """Resposta de /qualidade a partir dos perfis (atualizados de forma incremental)"""
+    qualidade = atualizar_qualidade()
+    linhas = {
+        "Linhas": "linhas",
+        "Descartadas": "descartadas",
+        "Percentual (%)": "percentual",
+    }
+
+    resposta = {
+        "status": "success",
+        "arquivos": len(qualidade),
+        "descartes": resumo_descartes(qualidade),
+        "colunas": _registros(
+            ausentes_por_coluna(qualidade),
+            {
+                "Ausentes": "ausentes",
+                "Percentual (%)": "percentual",
+                "Removida": "removida",
+                "Descartes (única causa)": "descartes_unica_causa",
+            },
+        ),
+        "regras": _registros(
+            violacoes(qualidade),
+            {
+                "Descrição": "descricao",
+                "Linhas": "linhas",
+                "Percentual (%)": "percentual",
+            },
+        ),
+    }
+
+    if detalhe == "arquivo":
+        resposta["por_arquivo"] = _registros(
+            ausentes_por_arquivo(qualidade),
+            {"Ano": "ano", "Semana": "semana", **linhas},
+        )
+    elif detalhe == "semana":
+        resposta["por_semana"] = _registros(ausentes_por_semana(qualidade), linhas)
+
+    return resposta
+
+
+@app.route("/qualidade")
+def qualidade_endpoint():
+    """
+    Retorna o perfil de qualidade dos arquivos brutos: valores ausentes,
+    linhas descartadas pelo dropna() (e por quê) e violações de regras
+    Exemplo: /qualidade?detalhe=arquivo (ou detalhe=semana)
+    """
+    try:
+        detalhe = request.args.get("detalhe")
+        if detalhe not in (None, "arquivo", "semana"):
+            return (
+                jsonify({"status": "error", "message": f"Detalhe inválido: {detalhe}"}),
+                400,
+            )
+
+        # Não depende do DataFrame carregado: não passa por obter_resultado()
+        chave = ("qualidade", detalhe)
+        acerto = chave in _cache_resultados
+        metricas.registrar_cache("resultados", acerto)
+        if not acerto:
+            _cache_resultados[chave] = _perfil_qualidade(detalhe)
+
+        return jsonify(_cache_resultados[chave])
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @app.route("/dados/exportar/<formato>")
 def exportar_dados(formato):
     """
@@ -313,8 +1430,11 @@ def exportar_dados(formato):
 @app.route("/recarregar")
 def recarregar_dados():
     """Força recarregamento dos dados"""
-    global _df_cache
+    global _df_cache, _banco_cache
     _df_cache = None
+    _banco_cache = None
+    _cache_resultados.clear()
+    metricas.registrar_descarga()
 
     df = obter_dados()
 
@@ -327,6 +1447,15 @@ def recarregar_dados():
     )
 
 
+@app.route("/metrics")
+def metrics():
+    """Métricas da API no formato de texto do Prometheus (não carrega dados)"""
+    return Response(
+        metricas.exposicao(entradas_cache_resultados=len(_cache_resultados)),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 if __name__ == "__main__":
     # Configuração para desenvolvimento
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,478 @@
+"""
+Armazém de colunas do conjunto de dados preparado
+
+Grava a saída de preparar_dataframe() em disco como um arquivo .npy por
+coluna e abre cada um com memory-map: abrir o armazém só lê o manifesto,
+e as páginas dos arquivos ficam no cache do sistema operacional,
+compartilhadas entre CLI, notebooks e workers da API.
+
+Codificação das colunas:
+    - texto: dicionário (códigos int32, -1 para ausentes) + array dos
+      valores distintos (texto de largura fixa, também memory-mapped)
+    - categorias do pandas: códigos int32 + valores distintos e ordem
+    - datas: int64 (NaT = mínimo do int64) + unidade
+    - períodos: ordinais int64 + dtype (frequência)
+    - inteiros anuláveis (ex.: UInt32): valores + máscara de ausentes
+    - demais colunas numéricas: o próprio array NumPy
+
+'Struttura' é mantida como categórica (preparar_dataframe com
+estrutura=True), para a análise por estrutura a partir do armazém.
+
+Com 'ID Paziente' presente, o índice CSR de atendimentos por paciente
+(indice_pacientes.py) é gravado junto, já ordenado por data de acesso.
+
+O armazém é reconstruído quando a assinatura do catálogo (checksums dos
+arquivos de dados) muda. Cada reconstrução grava os arquivos num novo
+subdiretório e só então troca o manifesto (um arquivo, trocado
+atomicamente), que aponta para ele: quem lê vê o armazém antigo ou o
+novo, nunca uma mistura. A reconstrução é feita sob uma trava de
+arquivo, de modo que CLI e API não reconstroem ao mesmo tempo; o
+subdiretório anterior é mantido para processos que ainda o têm aberto.
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+from catalogo import assinatura_catalogo, atualizar_catalogo
+from config import CAMINHO_ARMAZEM, CAMINHO_BASE
+from indice_pacientes import IndicePacientes, construir_indice
+from instrumentacao import instrumentar
+from utils import carrega_particoes, preparar_dataframe, versao_dados
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Versão do formato em disco (armazéns de outra versão são reconstruídos)
+FORMATO = 6
+
+MANIFESTO = "manifesto.json"
+TRAVA = ".trava"
+
+
+def _valores_distintos(categorias, coluna):
+    """Valores distintos como array NumPy sem objetos (texto de largura fixa)"""
+    valores = np.array(categorias.tolist())
+    if valores.dtype == object:
+        raise TypeError(f"Valores distintos não suportados na coluna {coluna}")
+    return valores
+
+
+def _codificar(serie):
+    """
+    Converte uma coluna em arrays NumPy e descrição para o manifesto
+
+    Returns:
+        tuple (dict de descrição, dict {sufixo do arquivo: array})
+    """
+    dtype = serie.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        descricao = {
+            "tipo": "categoria",
+            "dtype_categorias": str(dtype.categories.dtype),
+            "ordenada": bool(dtype.ordered),
+        }
+        return descricao, {
+            "": serie.cat.codes.to_numpy().astype(np.int32),
+            "_categorias": _valores_distintos(dtype.categories, serie.name),
+        }
+
+    if isinstance(dtype, pd.PeriodDtype):
+        descricao = {"tipo": "periodo", "dtype": str(dtype)}
+        return descricao, {"": serie.array.asi8.astype(np.int64)}
+
+    if pd.api.types.is_datetime64_dtype(dtype):
+        unidade = np.datetime_data(dtype)[0]
+        descricao = {"tipo": "data", "unidade": unidade}
+        return descricao, {"": serie.to_numpy().view(np.int64)}
+
+    if pd.api.types.is_string_dtype(dtype) or dtype == object:
+        codigos, categorias = pd.factorize(serie, sort=True)
+        descricao = {"tipo": "dicionario", "dtype": str(dtype)}
+        return descricao, {
+            "": codigos.astype(np.int32),
+            "_categorias": _valores_distintos(categorias, serie.name),
+        }
+
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and hasattr(
+        dtype, "numpy_dtype"
+    ):
+        # Inteiros, decimais e booleanos anuláveis do pandas
+        mascara = serie.isna().to_numpy()
+        valores = serie.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+        descricao = {"tipo": "anulavel", "dtype": str(dtype)}
+        return descricao, {"": valores, "_mascara": mascara}
+
+    if isinstance(dtype, np.dtype):
+        return {"tipo": "numerico", "dtype": str(dtype)}, {"": serie.to_numpy()}
+
+    raise TypeError(f"Tipo de coluna não suportado: {serie.name} ({dtype})")
+
+
+@contextlib.contextmanager
+def _travar(diretorio):
+    """Trava exclusiva entre processos para gravar o armazém"""
+    os.makedirs(diretorio, exist_ok=True)
+    with open(os.path.join(diretorio, TRAVA), "a+b") as arquivo:
+        if fcntl is not None:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+        else:
+            # LK_LOCK desiste após ~10 s: tenta até conseguir
+            arquivo.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@instrumentar
+def salvar_armazem(df, diretorio=CAMINHO_ARMAZEM, fonte=None):
+    """
+    Grava o DataFrame preparado como armazém de colunas
+
+    Os arquivos vão para um novo subdiretório e o manifesto, que aponta
+    para ele, é trocado no final (sob a trava do armazém); o subdiretório
+    anterior é mantido para processos com o armazém antigo aberto.
+
+    Args:
+        df: DataFrame retornado por preparar_dataframe()
+        diretorio: Diretório do armazém
+        fonte: Assinatura dos dados de origem (ver assinatura_catalogo)
+
+    Returns:
+        Caminho do diretório do armazém
+    """
+    with _travar(diretorio):
+        return _gravar_armazem(df, diretorio, fonte)
+
+
+def _gravar_armazem(df, diretorio, fonte):
+    """Grava o armazém (com a trava já obtida; ver salvar_armazem)"""
+    anterior = _ler_manifesto(diretorio) or {}
+    versao = versao_dados(df)
+    dados = f"{versao}-{time.time_ns()}"
+    temporario = os.path.join(diretorio, dados)
+    os.makedirs(temporario)
+
+    colunas = []
+    for posicao, coluna in enumerate(df.columns):
+        descricao, arrays = _codificar(df[coluna])
+        descricao["nome"] = coluna
+        descricao["arquivo"] = f"c{posicao:03d}"
+        for sufixo, array in arrays.items():
+            np.save(os.path.join(temporario, f"c{posicao:03d}{sufixo}.npy"), array)
+        colunas.append(descricao)
+
+    if isinstance(df.index, pd.RangeIndex):
+        indice = {"inicio": df.index.start, "passo": df.index.step}
+    else:
+        np.save(os.path.join(temporario, "indice.npy"), df.index.to_numpy(np.int64))
+        indice = {"arquivo": "indice"}
+
+    # Índice de atendimentos por paciente (os IDs são os da coluna)
+    if "ID Paziente" in df.columns:
+        ids = df["ID Paziente"].to_numpy()
+        total = int(ids.max()) + 1 if len(ids) else 0
+        datas = df["Data Accesso"] if "Data Accesso" in df.columns else None
+        indice_pacientes = construir_indice(ids, np.empty(total), datas)
+        np.save(os.path.join(temporario, "pacientes_ordem.npy"), indice_pacientes.ordem)
+        np.save(
+            os.path.join(temporario, "pacientes_offsets.npy"), indice_pacientes.offsets
+        )
+
+    manifesto = {
+        "formato": FORMATO,
+        "linhas": len(df),
+        "versao": versao,
+        "fonte": fonte,
+        "dados": dados,
+        "indice": indice,
+        "colunas": colunas,
+    }
+    caminho = os.path.join(diretorio, MANIFESTO)
+    with open(f"{caminho}.tmp", "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False)
+
+    # Troca atômica do manifesto: o novo subdiretório passa a valer
+    os.replace(f"{caminho}.tmp", caminho)
+
+    # Mantém o subdiretório anterior (pode estar aberto em outro processo)
+    manter = {MANIFESTO, TRAVA, dados, anterior.get("dados")}
+    for nome in os.listdir(diretorio):
+        if nome not in manter:
+            caminho_antigo = os.path.join(diretorio, nome)
+            if os.path.isdir(caminho_antigo):
+                shutil.rmtree(caminho_antigo, ignore_errors=True)
+            else:
+                with contextlib.suppress(OSError):
+                    os.remove(caminho_antigo)
+
+    return diretorio
+
+
+def _ler_manifesto(diretorio):
+    """Manifesto do armazém (None se não existir ou estiver corrompido)"""
+    try:
+        with open(os.path.join(diretorio, MANIFESTO), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+class ArmazemColunas:
+    """
+    Conjunto de dados preparado aberto a partir do disco
+
+    Comporta-se como um DataFrame somente leitura para o que as análises
+    usam: len(), `in`, .columns e armazem["coluna"] (Series) ou
+    armazem[["a", "b"]] (DataFrame). As colunas só são lidas (e, no caso
+    de texto, decodificadas) quando acessadas.
+    """
+
+    def __init__(self, diretorio, manifesto):
+        self.diretorio = diretorio
+        self.manifesto = manifesto
+        # Subdiretório dos arquivos desta versão (fixo enquanto aberto)
+        self._dados = os.path.join(diretorio, manifesto["dados"])
+        self._descricoes = {
+            descricao["nome"]: descricao for descricao in manifesto["colunas"]
+        }
+        self._series = {}
+        self._indice = None
+
+    def __len__(self):
+        return self.manifesto["linhas"]
+
+    def __contains__(self, coluna):
+        return coluna in self._descricoes
+
+    def __getitem__(self, chave):
+        if isinstance(chave, list):
+            return self.para_dataframe(chave)
+        return self.serie(chave)
+
+    def __repr__(self):
+        return (
+            f"ArmazemColunas({self.diretorio!r}, linhas={len(self)}, "
+            f"colunas={len(self._descricoes)})"
+        )
+
+    @property
+    def columns(self):
+        return pd.Index(list(self._descricoes))
+
+    @property
+    def versao(self):
+        """Versão dos dados (mesmo valor de versao_dados no DataFrame)"""
+        return self.manifesto["versao"]
+
+    @property
+    def fonte(self):
+        """Assinatura dos arquivos de origem (ver assinatura_catalogo)"""
+        return self.manifesto.get("fonte")
+
+    @property
+    def index(self):
+        if self._indice is None:
+            indice = self.manifesto["indice"]
+            if "arquivo" in indice:
+                self._indice = pd.Index(self._array(indice["arquivo"]), copy=False)
+            else:
+                inicio, passo = indice["inicio"], indice["passo"]
+                self._indice = pd.RangeIndex(inicio, inicio + passo * len(self), passo)
+        return self._indice
+
+    def indice_pacientes(self):
+        """
+        Índice CSR de atendimentos por paciente (memory-mapped)
+
+        Os IDs são os da coluna 'ID Paziente' e os nomes, o dicionário
+        de 'Paziente' (ambos em ordem alfabética).
+        """
+        if "ID Paziente" not in self:
+            raise KeyError("ID Paziente")
+
+        return IndicePacientes(
+            ids=self._array(self._descricao("ID Paziente")["arquivo"]),
+            nomes=self._array(f"{self._descricao('Paziente')['arquivo']}_categorias"),
+            ordem=self._array("pacientes_ordem"),
+            offsets=self._array("pacientes_offsets"),
+        )
+
+    def _array(self, nome):
+        """Array memory-mapped (somente leitura) de um arquivo do armazém"""
+        return np.load(os.path.join(self._dados, f"{nome}.npy"), mmap_mode="r")
+
+    def _descricao(self, coluna):
+        if coluna not in self._descricoes:
+            raise KeyError(coluna)
+        return self._descricoes[coluna]
+
+    def codigos(self, coluna):
+        """
+        Códigos int32 de uma coluna codificada por dicionário (-1: ausente)
+
+        Permite agrupar e contar sobre inteiros sem decodificar o texto.
+        """
+        descricao = self._descricao(coluna)
+        if descricao["tipo"] not in ("dicionario", "categoria"):
+            raise TypeError(f"Coluna sem dicionário: {coluna}")
+        return self._array(descricao["arquivo"])
+
+    def categorias(self, coluna):
+        """Valores distintos de uma coluna codificada, na ordem dos códigos"""
+        descricao = self._descricao(coluna)
+        if descricao["tipo"] not in ("dicionario", "categoria"):
+            raise TypeError(f"Coluna sem dicionário: {coluna}")
+
+        dtype = descricao.get("dtype_categorias", descricao.get("dtype"))
+        return pd.Index(self._array(f"{descricao['arquivo']}_categorias"), dtype=dtype)
+
+    def serie(self, coluna):
+        """Coluna como Series do pandas (com o dtype original)"""
+        if coluna not in self._series:
+            self._series[coluna] = self._decodificar(coluna)
+        return self._series[coluna]
+
+    def _decodificar(self, coluna):
+        descricao = self._descricao(coluna)
+        tipo = descricao["tipo"]
+        valores = self._array(descricao["arquivo"])
+
+        if tipo == "categoria":
+            dtype = pd.CategoricalDtype(
+                self.categorias(coluna), ordered=descricao["ordenada"]
+            )
+            dados = pd.Categorical.from_codes(valores, dtype=dtype)
+        elif tipo == "dicionario":
+            dados = pd.Categorical.from_codes(
+                valores, categories=self.categorias(coluna)
+            ).astype(descricao["dtype"])
+        elif tipo == "data":
+            dados = valores.view(f"datetime64[{descricao['unidade']}]")
+        elif tipo == "periodo":
+            dados = pd.arrays.PeriodArray(
+                np.asarray(valores),
+                dtype=pd.api.types.pandas_dtype(descricao["dtype"]),
+            )
+        elif tipo == "anulavel":
+            dtype = pd.api.types.pandas_dtype(descricao["dtype"])
+            mascara = self._array(f"{descricao['arquivo']}_mascara")
+            dados = dtype.construct_array_type()(
+                np.asarray(valores), np.asarray(mascara)
+            )
+        else:
+            dados = valores
+
+        # copy=False: colunas numéricas e datas continuam apontando para o mmap
+        return pd.Series(dados, index=self.index, name=coluna, copy=False)
+
+    def para_dataframe(self, colunas=None):
+        """
+        Materializa o armazém (ou parte das colunas) como DataFrame
+
+        Args:
+            colunas: Lista de colunas ou None para todas
+
+        Returns:
+            DataFrame com as colunas na ordem pedida
+        """
+        colunas = list(self._descricoes) if colunas is None else colunas
+        return pd.DataFrame(
+            {coluna: self.serie(coluna) for coluna in colunas}, index=self.index
+        )
+
+
+def abrir_armazem(diretorio=CAMINHO_ARMAZEM):
+    """
+    Abre um armazém existente (só lê o manifesto)
+
+    Returns:
+        ArmazemColunas
+
+    Raises:
+        FileNotFoundError: se não houver armazém válido em diretorio
+    """
+    manifesto = _ler_manifesto(diretorio)
+    if manifesto is None or manifesto.get("formato") != FORMATO:
+        raise FileNotFoundError(f"Armazém de colunas não encontrado em {diretorio}")
+
+    return ArmazemColunas(diretorio, manifesto)
+
+
+@instrumentar
+def obter_armazem(diretorio=CAMINHO_ARMAZEM, base=CAMINHO_BASE, workers=1):
+    """
+    Abre o armazém, reconstruindo-o se os dados de origem mudaram
+
+    Args:
+        diretorio: Diretório do armazém
+        base: Diretório das partições
+        workers: Número de threads de leitura (se precisar reconstruir)
+
+    Returns:
+        ArmazemColunas com todas as partições preparadas
+    """
+    catalogo = atualizar_catalogo(base, workers)
+    fonte = assinatura_catalogo(catalogo, base)
+
+    def desatualizado(manifesto):
+        return (
+            manifesto is None
+            or manifesto.get("formato") != FORMATO
+            or manifesto.get("fonte") != fonte
+        )
+
+    if desatualizado(_ler_manifesto(diretorio)):
+        with _travar(diretorio):
+            # Outro processo pode ter reconstruído enquanto esperávamos
+            if desatualizado(_ler_manifesto(diretorio)):
+                df = preparar_dataframe(
+                    carrega_particoes(workers=workers, base=base), estrutura=True
+                )
+                _gravar_armazem(df, diretorio, fonte)
+
+    return abrir_armazem(diretorio)
+
+
+def garantir_dataframe(dados, colunas=None):
+    """
+    Aceita DataFrame ou ArmazemColunas e devolve um DataFrame
+
+    Um DataFrame é devolvido sem cópia; de um armazém só as colunas
+    pedidas são materializadas.
+
+    Args:
+        dados: DataFrame ou ArmazemColunas
+        colunas: Colunas usadas pela análise (None: todas)
+
+    Returns:
+        DataFrame
+    """
+    if isinstance(dados, ArmazemColunas):
+        return dados.para_dataframe(colunas)
+    return dados
+
+
+if __name__ == "__main__":
+    armazem = obter_armazem()
+    print(armazem)
+    print(f"Versão dos dados: {armazem.versao}")
@@ -0,0 +1,326 @@
+"""
+Banco de consulta SQL embarcado (SQLite)
+
+Grava o conjunto preparado (armazém de colunas) num arquivo SQLite local,
+sem servidor, para consultas ad hoc em SQL e para os endpoints de
+agregação da API. A tabela 'atendimentos' é gravada em ordem de 'Data
+Accesso' (as linhas de um período ficam contíguas no arquivo) e tem
+índices nas chaves de filtro e agrupamento mais usadas:
+
+    - 'Data Accesso'                              (filtros de período)
+    - ('ID Paziente', 'Data Accesso')             (histórico por paciente)
+    - ('Categoria Urgenza', 'Sottogruppo
+      Pazienti', 'ID Paziente')                   (contagens por categoria)
+    - dimissione, problema, subgrupo e faixa etária (frequências)
+
+Os agrupamentos sobre essas colunas percorrem só o índice, sem ler as
+linhas da tabela.
+
+Datas são gravadas como texto 'AAAA-MM-DD HH:MM:SS' (funcionam com
+date(), strftime() e comparações de texto), períodos como 'AAAA-MM' e
+categorias como texto.
+
+As consultas abrem o arquivo somente leitura e só podem executar um
+SELECT (qualquer outra operação é negada pelo autorizador do SQLite),
+com limite de linhas e tempo máximo. O banco é reconstruído quando a
+versão dos dados do armazém muda.
+"""
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+from config import CAMINHO_BANCO, CONSULTA_LIMITE_LINHAS, CONSULTA_TIMEOUT
+
+TABELA = "atendimentos"
+
+# Versão do esquema (bancos de outra versão são reconstruídos)
+FORMATO = 2
+
+INDICES = {
+    "idx_data": ["Data Accesso"],
+    "idx_paciente": ["ID Paziente", "Data Accesso"],
+    "idx_urgenza": ["Categoria Urgenza", "Sottogruppo Pazienti", "ID Paziente"],
+    "idx_dimissione": ["Modalità Dimissione"],
+    "idx_problema": ["Problema Principale"],
+    "idx_subgrupo": ["Sottogruppo Pazienti"],
+    "idx_faixa": ["Fascia d'età"],
+}
+
+# Operações permitidas nas consultas (todas as demais são negadas)
+OPERACOES_LEITURA = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+}
+
+
+def identificador(coluna):
+    """Nome de coluna entre aspas para SQL"""
+    return '"' + coluna.replace('"', '""') + '"'
+
+
+def _coluna_sql(serie):
+    """
+    Converte uma coluna para gravação no SQLite
+
+    Returns:
+        tuple (tipo SQL, lista de valores Python com None para ausentes)
+    """
+    dtype = serie.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        tipo, valores = "TEXT", serie.dt.strftime("%Y-%m-%d %H:%M:%S")
+    elif isinstance(dtype, pd.PeriodDtype):
+        tipo, valores = "TEXT", serie.astype(str)
+    elif pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        tipo, valores = "INTEGER", serie
+    elif pd.api.types.is_float_dtype(dtype):
+        tipo, valores = "REAL", serie
+    else:
+        tipo, valores = "TEXT", serie.astype(object)
+
+    ausentes = serie.isna().to_numpy()
+    valores = valores.astype(object).tolist()
+    if ausentes.any():
+        valores = [
+            None if ausente else valor for valor, ausente in zip(valores, ausentes)
+        ]
+    return tipo, valores
+
+
+def salvar_banco(df, caminho=CAMINHO_BANCO, versao=None, fonte=None):
+    """
+    Grava o DataFrame preparado no banco de consulta
+
+    O banco é montado num arquivo temporário e trocado no final.
+
+    Args:
+        df: DataFrame retornado por preparar_dataframe()
+        caminho: Arquivo do banco
+        versao: Versão dos dados (ver ArmazemColunas.versao)
+        fonte: Assinatura dos arquivos de origem do armazém (ver
+            assinatura_catalogo)
+
+    Returns:
+        Caminho do arquivo do banco
+    """
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+
+    temporario = f"{caminho}.tmp-{os.getpid()}"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+
+    # Chave de ordenação: linhas de um mesmo período ficam contíguas
+    if "Data Accesso" in df.columns:
+        df = df.sort_values("Data Accesso", kind="stable")
+
+    tipos = {}
+    valores = {}
+    for coluna in df.columns:
+        tipos[coluna], valores[coluna] = _coluna_sql(df[coluna])
+
+    colunas = ", ".join(
+        f"{identificador(coluna)} {tipo}" for coluna, tipo in tipos.items()
+    )
+    marcadores = ", ".join("?" * len(tipos))
+
+    conexao = sqlite3.connect(temporario)
+    try:
+        conexao.execute("PRAGMA journal_mode = OFF")
+        conexao.execute("PRAGMA synchronous = OFF")
+        conexao.execute(f"CREATE TABLE {TABELA} ({colunas})")
+        conexao.executemany(
+            f"INSERT INTO {TABELA} VALUES ({marcadores})",
+            zip(*valores.values()),
+        )
+
+        for nome, chaves in INDICES.items():
+            if all(chave in tipos for chave in chaves):
+                conexao.execute(
+                    f"CREATE INDEX {nome} ON {TABELA} "
+                    f"({', '.join(identificador(chave) for chave in chaves)})"
+                )
+
+        conexao.execute("CREATE TABLE _metadados (chave TEXT PRIMARY KEY, valor TEXT)")
+        conexao.executemany(
+            "INSERT INTO _metadados VALUES (?, ?)",
+            [
+                ("formato", str(FORMATO)),
+                ("versao", versao),
+                ("fonte", fonte),
+                ("linhas", str(len(df))),
+            ],
+        )
+        conexao.commit()
+        conexao.execute("ANALYZE")
+        conexao.commit()
+    finally:
+        conexao.close()
+
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def _metadados(caminho):
+    """Metadados do banco (None se não existir ou estiver corrompido)"""
+    if not os.path.exists(caminho):
+        return None
+
+    try:
+        conexao = sqlite3.connect(
+            f"{Path(caminho).resolve().as_uri()}?mode=ro", uri=True
+        )
+        try:
+            return dict(conexao.execute("SELECT chave, valor FROM _metadados"))
+        finally:
+            conexao.close()
+    except sqlite3.Error:
+        return None
+
+
+def obter_banco(armazem, caminho=CAMINHO_BANCO):
+    """
+    Garante o banco de consulta atualizado com o armazém
+
+    O banco é reconstruído quando a versão dos dados ou a assinatura dos
+    arquivos de origem do armazém mudam: arquivos corrigidos reconstroem o
+    armazém (nova 'fonte') e, com ele, o banco.
+
+    Args:
+        armazem: ArmazemColunas (ver obter_armazem)
+        caminho: Arquivo do banco
+
+    Returns:
+        Caminho do arquivo do banco
+    """
+    metadados = _metadados(caminho)
+    if (
+        metadados is None
+        or metadados.get("formato") != str(FORMATO)
+        or metadados.get("versao") != armazem.versao
+        or metadados.get("fonte") != armazem.fonte
+    ):
+        salvar_banco(
+            armazem.para_dataframe(),
+            caminho,
+            versao=armazem.versao,
+            fonte=armazem.fonte,
+        )
+
+    return caminho
+
+
+def _autorizar(operacao, *_):
+    """Autorizador do SQLite: só leitura"""
+    return sqlite3.SQLITE_OK if operacao in OPERACOES_LEITURA else sqlite3.SQLITE_DENY
+
+
+def conectar(caminho=CAMINHO_BANCO):
+    """
+    Abre o banco somente leitura (arquivo em modo ro e só SELECT)
+
+    Raises:
+        FileNotFoundError: se o banco não existir
+    """
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Banco de consulta não encontrado em {caminho}")
+
+    conexao = sqlite3.connect(
+        f"{Path(caminho).resolve().as_uri()}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+    )
+    conexao.execute("PRAGMA query_only = ON")
+    conexao.set_authorizer(_autorizar)
+    return conexao
+
+
+def _erro_consulta(erro):
+    """Converte erros do SQLite (tempo esgotado vira TimeoutError)"""
+    if isinstance(erro, sqlite3.OperationalError) and "interrupted" in str(erro):
+        return TimeoutError("Tempo máximo da consulta excedido")
+    return ValueError(f"Consulta inválida: {erro}")
+
+
+def consultar(
+    sql,
+    parametros=None,
+    limite=CONSULTA_LIMITE_LINHAS,
+    timeout=CONSULTA_TIMEOUT,
+    caminho=CAMINHO_BANCO,
+):
+    """
+    Executa uma consulta SQL somente leitura
+
+    A consulta é compilada e iniciada antes do retorno (erros de sintaxe,
+    de permissão ou de parâmetros aparecem aqui); as linhas são lidas do
+    banco à medida que o gerador é consumido.
+
+    Args:
+        sql: Um único comando SELECT (parâmetros com ? ou :nome)
+        parametros: Lista ou dict com os valores dos parâmetros
+        limite: Número máximo de linhas (None: sem limite)
+        timeout: Tempo máximo em segundos, incluindo a leitura das linhas
+        caminho: Arquivo do banco
+
+    Returns:
+        tuple (nomes das colunas, gerador de tuplas)
+
+    Raises:
+        ValueError: consulta inválida ou não permitida
+        TimeoutError: tempo máximo excedido
+    """
+    conexao = conectar(caminho)
+    prazo = time.perf_counter() + timeout if timeout else None
+    if prazo is not None:
+        # Chamado a cada 10 mil instruções da VM; retorno verdadeiro interrompe
+        conexao.set_progress_handler(lambda: time.perf_counter() > prazo, 10_000)
+
+    try:
+        cursor = conexao.execute(sql, parametros or ())
+    except sqlite3.Error as erro:
+        conexao.close()
+        raise _erro_consulta(erro) from erro
+
+    colunas = [descricao[0] for descricao in cursor.description or []]
+
+    def linhas():
+        lidas = 0
+        try:
+            while limite is None or lidas < limite:
+                tamanho = 1000 if limite is None else min(1000, limite - lidas)
+                bloco = cursor.fetchmany(tamanho)
+                if not bloco:
+                    break
+                lidas += len(bloco)
+                yield from bloco
+        except sqlite3.Error as erro:
+            raise _erro_consulta(erro) from erro
+        finally:
+            conexao.close()
+
+    return colunas, linhas()
+
+
+def consultar_tabela(sql, parametros=None, caminho=CAMINHO_BANCO):
+    """
+    Executa uma consulta e devolve o resultado completo como DataFrame
+
+    Returns:
+        DataFrame com as colunas da consulta
+    """
+    colunas, linhas = consultar(sql, parametros, limite=None, caminho=caminho)
+    return pd.DataFrame.from_records(list(linhas), columns=colunas)
+
+
+if __name__ == "__main__":
+    from armazem_colunas import obter_armazem
+
+    caminho = obter_banco(obter_armazem())
+    print(consultar_tabela("SELECT chave, valor FROM _metadados").to_string())
+    print(f"Banco de consulta: {caminho}")
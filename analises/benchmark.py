@@ -0,0 +1,495 @@
+"""
+Suíte de benchmarks reprodutível sobre dados sintéticos
+
+Gera (uma única vez) conjuntos sintéticos com o esquema real em tamanhos
+crescentes e mede o tempo de carga, preparação, de cada função pública
+de analise_urgenza e analise_geral (em cada motor de cálculo instalado)
+e de cada endpoint da API (via test client do Flask), além do tempo de
+importação dos pontos de entrada (python -X importtime). A previsão de
+chegadas é medida no ajuste e avaliada por backtest (MAE e WAPE por
+categoria, gravados junto dos tempos). Os resultados são gravados em
+JSON, um arquivo por commit, para comparação entre versões.
+
+Uso:
+    python benchmark.py                              # 100k, 1M e 10M linhas
+    python benchmark.py --tamanhos 100000 --repeticoes 3
+    python benchmark.py --comparar resultados_benchmark/a.json resultados_benchmark/b.json
+"""
+
+import argparse
+import contextlib
+import inspect
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import matplotlib
+
+matplotlib.use("Agg")  # Backend sem GUI para medir os gráficos
+
+import numpy as np
+import pandas as pd
+
+import analise_geral
+import analise_urgenza
+import previsao
+from armazem_colunas import abrir_armazem, salvar_armazem
+from banco_consulta import obter_banco
+from dados_sinteticos import gerar_dados_sinteticos
+from motores import definir_motor, motores_disponiveis
+from series_temporais import serie_diaria_urgenza
+from utils import carrega_dados, preparar_dataframe
+
+TAMANHOS_PADRAO = [100_000, 1_000_000, 10_000_000]
+DIRETORIO_DADOS = "./benchmark_dados"
+DIRETORIO_RESULTADOS = "./resultados_benchmark"
+
+# Rotas que não devem ser medidas (efeitos colaterais ou saída gigante)
+ROTAS_IGNORADAS = {"/recarregar", "/dados/exportar/<formato>"}
+
+# Módulos cujo tempo de importação é medido em um interpretador novo
+MODULOS_IMPORTACAO = ["main", "utils", "analise_urgenza", "analise_geral", "app"]
+
+# Dependências pesadas que só devem ser importadas ao gerar gráficos
+MODULOS_GRAFICOS = ("matplotlib.pyplot", "seaborn")
+
+
+def cronometrar(funcao, *args, repeticoes=1, **kwargs):
+    """
+    Mede o menor tempo de execução entre as repetições
+
+    A saída em tela da função é descartada e as figuras abertas são
+    fechadas ao final de cada execução.
+
+    Returns:
+        tuple (segundos, resultado da última execução)
+    """
+    import matplotlib.pyplot as plt
+
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            resultado = funcao(*args, **kwargs)
+            tempos.append(time.perf_counter() - inicio)
+        plt.close("all")
+
+    return min(tempos), resultado
+
+
+def funcoes_publicas(modulo):
+    """Lista (nome, função) definidas no próprio módulo e não privadas"""
+    return [
+        (nome, funcao)
+        for nome, funcao in inspect.getmembers(modulo, inspect.isfunction)
+        if funcao.__module__ == modulo.__name__ and not nome.startswith("_")
+    ]
+
+
+def argumentos_analises(df):
+    """
+    Monta os argumentos das funções que não recebem apenas o DataFrame
+
+    Returns:
+        dict {nome da função: tupla de argumentos}
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = analise_urgenza.estatisticas_urgenza(df)
+    perfil = analise_urgenza.perfil_chegadas(df)
+
+    return {
+        "grafico_barras_urgenza": (stats["counts"], stats["percentuais"]),
+        "grafico_pizza_urgenza": (stats["counts"],),
+        "resumo_executivo_urgenza": (df, stats["counts"], stats["percentuais"]),
+        "tabela_chegadas": (perfil,),
+        "heatmap_chegadas": (perfil,),
+    }
+
+
+def benchmark_carga(diretorio, repeticoes=1):
+    """
+    Mede carrega_dados (por ano) e preparar_dataframe
+
+    Returns:
+        tuple (dict de tempos, DataFrame preparado)
+    """
+    tempos = {}
+    partes = []
+
+    for ano in sorted(os.listdir(diretorio)):
+        caminho_ano = os.path.join(diretorio, ano)
+        if not os.path.isdir(caminho_ano):
+            continue
+        tempos[f"carrega_dados[{ano}]"], df_ano = cronometrar(
+            carrega_dados, caminho_ano, repeticoes=repeticoes
+        )
+        partes.append(df_ano)
+
+    df_raw = pd.concat(partes, ignore_index=True)
+    tempos["carrega_dados"] = sum(tempos.values())
+    tempos["preparar_dataframe"], df = cronometrar(
+        lambda: preparar_dataframe(df_raw.copy(), estrutura=True),
+        repeticoes=repeticoes,
+    )
+
+    return tempos, df
+
+
+def benchmark_analises(df, repeticoes=1):
+    """
+    Mede cada função pública de analise_urgenza e analise_geral
+
+    Returns:
+        dict {'modulo.funcao': segundos} (None se a função falhar)
+    """
+    especiais = argumentos_analises(df)
+    tempos = {}
+
+    for modulo in (analise_urgenza, analise_geral):
+        for nome, funcao in funcoes_publicas(modulo):
+            argumentos = especiais.get(nome, (df,))
+            try:
+                tempos[f"{modulo.__name__}.{nome}"], _ = cronometrar(
+                    funcao, *argumentos, repeticoes=repeticoes
+                )
+            except Exception as e:
+                print(f"  ⚠ {modulo.__name__}.{nome} falhou: {e}")
+                tempos[f"{modulo.__name__}.{nome}"] = None
+
+    return tempos
+
+
+def benchmark_motores(df, repeticoes=1):
+    """
+    Mede as análises em cada motor de cálculo instalado
+
+    Returns:
+        dict {'motor[nome] modulo.funcao': segundos}
+    """
+    tempos = {}
+
+    try:
+        for motor in motores_disponiveis():
+            definir_motor(motor)
+            for etapa, segundos in benchmark_analises(df, repeticoes).items():
+                tempos[f"motor[{motor}] {etapa}"] = segundos
+    finally:
+        definir_motor("pandas")
+
+    return tempos
+
+
+def benchmark_previsao(df):
+    """
+    Mede o ajuste dos modelos de previsão e avalia a acurácia (backtest)
+
+    Returns:
+        tuple (dict de tempos, dict {categoria: {métrica: valor}})
+    """
+    serie_diaria = serie_diaria_urgenza(df)
+    tempos = {}
+    tempos["previsao.ajustar_modelos"], _ = cronometrar(
+        previsao.ajustar_modelos, serie_diaria
+    )
+    tempos["previsao.backtest"], avaliacao = cronometrar(
+        previsao.backtest, serie_diaria
+    )
+
+    print("Backtest da previsão:")
+    print(avaliacao.round(2))
+
+    acuracia = json.loads(avaliacao.round(4).to_json(orient="index"))
+    return tempos, acuracia
+
+
+def benchmark_endpoints(df):
+    """
+    Mede cada endpoint GET sem parâmetros de rota via test client
+
+    O DataFrame preparado é gravado num armazém de colunas e num banco de
+    consulta temporários, que substituem os da API durante a medição (os
+    endpoints leem o banco, não só o DataFrame em memória); cada rota é
+    medida na primeira chamada (cache de resultados frio) e na segunda
+    (quente). Os caches da API são limpos ao final.
+
+    Returns:
+        dict {'GET rota [frio|quente]': segundos}
+    """
+    import app as api
+
+    with tempfile.TemporaryDirectory() as temporario:
+        armazem = abrir_armazem(
+            salvar_armazem(df, os.path.join(temporario, "armazem"), fonte="sintetico")
+        )
+        obter_armazem = api.obter_armazem
+        api.obter_armazem = lambda: armazem
+        try:
+            api._df_cache = None
+            api._cache_resultados.clear()
+            api._banco_cache = obter_banco(
+                armazem, caminho=os.path.join(temporario, "consulta.sqlite")
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                api.obter_dados()
+            return _medir_rotas(api)
+        finally:
+            api.obter_armazem = obter_armazem
+            api._df_cache = None
+            api._banco_cache = None
+            api._cache_resultados.clear()
+
+
+def _medir_rotas(api):
+    """Mede as rotas GET da API já apontada para os dados sintéticos"""
+    cliente = api.app.test_client()
+    tempos = {}
+
+    for regra in api.app.url_map.iter_rules():
+        if (
+            regra.endpoint == "static"
+            or "GET" not in regra.methods
+            or regra.arguments
+            or regra.rule in ROTAS_IGNORADAS
+        ):
+            continue
+
+        for estado in ("frio", "quente"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                resposta = cliente.get(regra.rule)
+                duracao = time.perf_counter() - inicio
+            tempos[f"GET {regra.rule} [{estado}]"] = (
+                duracao if resposta.status_code < 500 else None
+            )
+
+    return tempos
+
+
+def medir_importacao(modulo, repeticoes=3):
+    """
+    Mede o tempo de importação de um módulo com python -X importtime
+
+    Cada repetição usa um interpretador novo (sem cache de módulos em
+    memória); vale o menor tempo cumulativo informado para o módulo.
+
+    Returns:
+        dict com 'segundos' e 'graficos' (se matplotlib.pyplot ou seaborn
+        foram importados junto com o módulo)
+    """
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    tempos = []
+    importados = set()
+
+    for _ in range(repeticoes):
+        processo = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+            capture_output=True,
+            text=True,
+            cwd=diretorio,
+            check=True,
+        )
+        # Linhas: "import time: self [us] | cumulative | pacote"
+        for linha in processo.stderr.splitlines():
+            if not linha.startswith("import time:") or "|" not in linha:
+                continue
+            _, cumulativo, nome = linha.split("|")
+            importados.add(nome.strip())
+            if nome.rstrip() == f" {modulo}":
+                tempos.append(int(cumulativo) / 1e6)
+
+    return {
+        "segundos": min(tempos) if tempos else None,
+        "graficos": any(nome in importados for nome in MODULOS_GRAFICOS),
+    }
+
+
+def benchmark_importacao(modulos=MODULOS_IMPORTACAO, repeticoes=3):
+    """
+    Mede o tempo de importação de cada ponto de entrada
+
+    Returns:
+        dict {modulo: {'segundos': ..., 'graficos': ...}}
+    """
+    print(f"\n{'=' * 80}\nBENCHMARK: tempo de importação\n{'=' * 80}")
+    resultados = {}
+    for modulo in modulos:
+        resultados[modulo] = medir_importacao(modulo, repeticoes)
+        print(
+            f"  {modulo:<20} {resultados[modulo]['segundos']:.3f}s"
+            f"{'  (importa matplotlib/seaborn)' if resultados[modulo]['graficos'] else ''}"
+        )
+
+    return resultados
+
+
+def executar_benchmarks(tamanhos, diretorio_dados=DIRETORIO_DADOS, repeticoes=1):
+    """
+    Executa a suíte completa para cada tamanho de conjunto sintético
+
+    Returns:
+        dict {tamanho: {etapa: segundos}}
+    """
+    resultados = {}
+
+    for tamanho in tamanhos:
+        print(f"\n{'=' * 80}\nBENCHMARK: {tamanho:,} linhas\n{'=' * 80}")
+        diretorio = os.path.join(diretorio_dados, str(tamanho))
+
+        if not os.path.isdir(diretorio):
+            print(f"Gerando dados sintéticos em {diretorio}...")
+            gerar_dados_sinteticos(tamanho, diretorio)
+
+        tempos, df = benchmark_carga(diretorio, repeticoes)
+        print(f"Carga e preparação: {len(df):,} registros preparados")
+        tempos.update(benchmark_analises(df, repeticoes))
+        print(f"Análises: {len(tempos)} etapas medidas")
+        tempos.update(benchmark_motores(df, repeticoes))
+        print(f"Motores ({', '.join(motores_disponiveis())}): {len(tempos)} etapas")
+        tempos_previsao, acuracia = benchmark_previsao(df)
+        tempos.update(tempos_previsao)
+        tempos.update(benchmark_endpoints(df))
+        print(f"Endpoints: {len(tempos)} etapas medidas")
+
+        resultados[str(tamanho)] = {
+            "registros_preparados": len(df),
+            "tempos": tempos,
+            "previsao": acuracia,
+        }
+
+    return resultados
+
+
+def commit_atual():
+    """Retorna o hash do commit atual (ou None fora de um repositório git)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def salvar_resultados(resultados, caminho=None, importacao=None):
+    """
+    Grava os resultados em JSON com metadados do ambiente
+
+    Args:
+        resultados: Retorno de executar_benchmarks()
+        caminho: Arquivo de saída (padrão: resultados_benchmark/<commit>.json)
+        importacao: Retorno de benchmark_importacao() (opcional)
+
+    Returns:
+        Caminho do arquivo gravado
+    """
+    commit = commit_atual()
+    if caminho is None:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        caminho = os.path.join(DIRETORIO_RESULTADOS, f"{commit or 'local'}.json")
+
+    documento = {
+        "commit": commit,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "importacao": importacao or {},
+        "resultados": resultados,
+    }
+
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(documento, arquivo, indent=2, ensure_ascii=False)
+
+    return caminho
+
+
+def comparar_resultados(caminho_base, caminho_novo):
+    """
+    Imprime a razão de tempos (novo / base) entre dois arquivos de resultados
+
+    Returns:
+        DataFrame com tempos e razões por tamanho e etapa
+    """
+    with open(caminho_base, encoding="utf-8") as arquivo:
+        base = json.load(arquivo)
+    with open(caminho_novo, encoding="utf-8") as arquivo:
+        novo = json.load(arquivo)
+
+    linhas = []
+    for tamanho, dados in novo["resultados"].items():
+        tempos_base = base["resultados"].get(tamanho, {}).get("tempos", {})
+        for etapa, segundos in dados["tempos"].items():
+            anterior = tempos_base.get(etapa)
+            linhas.append(
+                {
+                    "Tamanho": int(tamanho),
+                    "Etapa": etapa,
+                    "Base (s)": anterior,
+                    "Novo (s)": segundos,
+                    "Razão": (segundos / anterior if anterior and segundos else np.nan),
+                }
+            )
+
+    # Tempo de importação entra como tamanho 0 (independe dos dados)
+    importacao_base = base.get("importacao", {})
+    for modulo, medida in novo.get("importacao", {}).items():
+        anterior = importacao_base.get(modulo, {}).get("segundos")
+        segundos = medida["segundos"]
+        linhas.append(
+            {
+                "Tamanho": 0,
+                "Etapa": f"import {modulo}",
+                "Base (s)": anterior,
+                "Novo (s)": segundos,
+                "Razão": (segundos / anterior if anterior and segundos else np.nan),
+            }
+        )
+
+    comparacao = pd.DataFrame(linhas).set_index(["Tamanho", "Etapa"])
+
+    print(f"Comparação {base['commit']} -> {novo['commit']}")
+    print("=" * 80)
+    print(comparacao.round(4))
+
+    return comparacao
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks sobre dados sintéticos")
+    parser.add_argument(
+        "--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO, metavar="N"
+    )
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument(
+        "--sem-importacao",
+        action="store_true",
+        help="Não mede o tempo de importação dos módulos",
+    )
+    parser.add_argument("--dados", default=DIRETORIO_DADOS)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de resultados")
+    parser.add_argument(
+        "--comparar", nargs=2, metavar=("BASE", "NOVO"), help="Compara dois JSONs"
+    )
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar_resultados(*args.comparar)
+        sys.exit(0)
+
+    importacao = None if args.sem_importacao else benchmark_importacao()
+    resultados = executar_benchmarks(args.tamanhos, args.dados, args.repeticoes)
+    caminho = salvar_resultados(resultados, args.saida, importacao)
+    print(f"\nResultados gravados em {caminho}")
@@ -0,0 +1,341 @@
+"""
+Catálogo dos arquivos de dados
+
+Descobre as partições sob CAMINHO_BASE (um diretório por ano, arquivos
+como '2022.17.csv' ou '2024 - 22.csv') e guarda, para cada CSV, ano e
+número do arquivo no ano (do nome), linhas, tamanho, checksum e o
+intervalo de 'Data Accesso' que ele cobre. O catálogo fica em disco:
+na inicialização só os arquivos novos ou alterados são inspecionados.
+
+Com as datas registradas, consultas com predicado de ano ou período
+descartam os arquivos fora do intervalo antes de qualquer leitura. A
+poda usa as datas registradas e não o nome do diretório: arquivos na
+virada do ano (ex.: 2022.27.csv, de 19/12/2022 a 02/01/2023) contêm
+atendimentos de dois anos.
+
+Uma entrada só vale enquanto o tamanho e a data de modificação do
+arquivo não mudarem; arquivos sem entrada válida são sempre lidos.
+"""
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from config import CAMINHO_BASE, CAMINHO_CATALOGO
+
+# Nomes dos arquivos: '2022.17.csv', '2024-1.csv', '2024 - 22.csv', '2024- 4.csv'
+PADRAO_NOME = re.compile(r"^(\d{4})\s*[-.]\s*(\d+)\.csv$", re.IGNORECASE)
+
+
+def _chave(caminho_arquivo):
+    """Chave do arquivo no catálogo (caminho absoluto)"""
+    return os.path.realpath(caminho_arquivo)
+
+
+def carregar_catalogo(caminho=CAMINHO_CATALOGO):
+    """
+    Lê o catálogo do disco
+
+    Returns:
+        dict {caminho absoluto: entrada} (vazio se não existir)
+    """
+    if not os.path.exists(caminho):
+        return {}
+
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        # Catálogo corrompido: será reconstruído nas próximas leituras
+        return {}
+
+
+def salvar_catalogo(catalogo, caminho=CAMINHO_CATALOGO):
+    """Grava o catálogo de forma atômica"""
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(catalogo, arquivo, indent=1, ensure_ascii=False, sort_keys=True)
+    os.replace(temporario, caminho)
+
+
+def entrada_arquivo(catalogo, caminho_arquivo):
+    """
+    Retorna a entrada válida de um arquivo (ou None)
+
+    A entrada é descartada se o arquivo mudou de tamanho ou foi modificado.
+    """
+    entrada = catalogo.get(_chave(caminho_arquivo))
+    if entrada is None or "checksum" not in entrada:
+        return None  # Ausente ou de uma versão anterior do catálogo
+
+    info = os.stat(caminho_arquivo)
+    if entrada["tamanho"] != info.st_size or entrada["modificado"] != info.st_mtime_ns:
+        return None
+
+    return entrada
+
+
+def particao_do_nome(caminho_arquivo):
+    """
+    Extrai ano e número do arquivo no ano a partir do nome
+
+    Arquivos com nome fora do padrão herdam o ano do diretório (se for
+    um ano) e ficam sem número.
+
+    Returns:
+        tuple (ano str ou None, semana int ou None)
+    """
+    nome = os.path.basename(caminho_arquivo)
+    encontrado = PADRAO_NOME.match(nome.strip())
+    if encontrado:
+        return encontrado.group(1), int(encontrado.group(2))
+
+    pasta = os.path.basename(os.path.dirname(caminho_arquivo))
+    return (pasta if pasta.isdigit() else None), None
+
+
+def _checksum(caminho_arquivo):
+    """SHA-256 do conteúdo do arquivo"""
+    resumo = hashlib.sha256()
+    with open(caminho_arquivo, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def registrar_arquivo(catalogo, caminho_arquivo, df):
+    """
+    Registra um arquivo recém-lido no catálogo
+
+    Args:
+        catalogo: dict retornado por carregar_catalogo()
+        caminho_arquivo: Caminho do CSV
+        df: Conteúdo completo do arquivo (com 'Data Accesso')
+    """
+    info = os.stat(caminho_arquivo)
+    datas = df["Data Accesso"]
+    ano, semana = particao_do_nome(caminho_arquivo)
+
+    catalogo[_chave(caminho_arquivo)] = {
+        "ano": ano,
+        "semana": semana,
+        "tamanho": info.st_size,
+        "modificado": info.st_mtime_ns,
+        "checksum": _checksum(caminho_arquivo),
+        "linhas": len(df),
+        "inicio": datas.min().isoformat() if datas.notna().any() else None,
+        "fim": datas.max().isoformat() if datas.notna().any() else None,
+    }
+
+
+def descobrir_arquivos(base=CAMINHO_BASE):
+    """
+    Lista os CSVs das partições sob base/<ano>/
+
+    Returns:
+        Lista de caminhos ordenada por (ano, número no ano, nome)
+    """
+    arquivos = []
+    for pasta in os.scandir(base):
+        if not pasta.is_dir():
+            continue
+        for arquivo in os.scandir(pasta.path):
+            if arquivo.is_file() and arquivo.name.lower().endswith(".csv"):
+                arquivos.append(arquivo.path)
+
+    def ordem(caminho):
+        ano, semana = particao_do_nome(caminho)
+        return (ano or "", semana if semana is not None else -1, caminho)
+
+    return sorted(arquivos, key=ordem)
+
+
+def _inspecionar(caminho_arquivo):
+    """Lê só 'Data Accesso' de um CSV (linhas e intervalo de datas)"""
+    # latin-1 decodifica qualquer byte; as datas são ASCII
+    return pd.read_csv(
+        caminho_arquivo,
+        encoding="latin-1",
+        usecols=["Data Accesso"],
+        parse_dates=["Data Accesso"],
+        dayfirst=True,
+    )
+
+
+def atualizar_catalogo(base=CAMINHO_BASE, workers=1, caminho=CAMINHO_CATALOGO):
+    """
+    Descobre as partições e atualiza o catálogo em disco
+
+    Só arquivos novos ou alterados são lidos (apenas a coluna 'Data
+    Accesso'); entradas de arquivos removidos de base são descartadas.
+
+    Args:
+        base: Diretório com um subdiretório por ano
+        workers: Número de threads de inspeção dos arquivos novos
+        caminho: Arquivo do catálogo
+
+    Returns:
+        dict do catálogo atualizado
+    """
+    catalogo = carregar_catalogo(caminho)
+    arquivos = descobrir_arquivos(base)
+
+    novos = [
+        arquivo for arquivo in arquivos if entrada_arquivo(catalogo, arquivo) is None
+    ]
+    if workers > 1 and len(novos) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            conteudos = list(executor.map(_inspecionar, novos))
+    else:
+        conteudos = [_inspecionar(arquivo) for arquivo in novos]
+
+    for arquivo, df in zip(novos, conteudos):
+        registrar_arquivo(catalogo, arquivo, df)
+
+    # Arquivos que saíram da base
+    raiz = os.path.join(os.path.realpath(base), "")
+    existentes = {_chave(arquivo) for arquivo in arquivos}
+    removidos = [
+        chave
+        for chave in catalogo
+        if chave.startswith(raiz) and chave not in existentes
+    ]
+    for chave in removidos:
+        del catalogo[chave]
+
+    if novos or removidos:
+        salvar_catalogo(catalogo, caminho)
+
+    return catalogo
+
+
+def selecionar_arquivos(catalogo, anos=None, inicio=None, fim=None, base=CAMINHO_BASE):
+    """
+    Seleciona os arquivos das partições pedidas
+
+    Args:
+        catalogo: dict retornado por atualizar_catalogo()
+        anos: Anos das partições (str ou int) ou None para todos
+        inicio: Data inicial (inclusiva) ou None
+        fim: Data final (inclusiva) ou None
+        base: Diretório das partições
+
+    Returns:
+        Lista de caminhos ordenada por (ano, número no ano)
+    """
+    raiz = os.path.join(os.path.realpath(base), "")
+    anos = {str(ano) for ano in anos} if anos else None
+
+    entradas = sorted(
+        (
+            (entrada["ano"] or "", entrada["semana"] or -1, chave)
+            for chave, entrada in catalogo.items()
+            if chave.startswith(raiz) and (anos is None or entrada["ano"] in anos)
+        )
+    )
+
+    return podar_arquivos(catalogo, [chave for _, _, chave in entradas], inicio, fim)
+
+
+def assinatura_catalogo(catalogo, base=CAMINHO_BASE):
+    """
+    Identificador do conteúdo das partições sob base
+
+    Muda quando um arquivo é adicionado, removido ou alterado; serve para
+    invalidar estruturas derivadas do conjunto completo (ex.: armazém de
+    colunas).
+
+    Returns:
+        str hexadecimal com 16 caracteres
+    """
+    raiz = os.path.join(os.path.realpath(base), "")
+    checksums = sorted(
+        entrada["checksum"]
+        for chave, entrada in catalogo.items()
+        if chave.startswith(raiz)
+    )
+    return hashlib.sha256("\n".join(checksums).encode()).hexdigest()[:16]
+
+
+def anos_disponiveis(base=CAMINHO_BASE):
+    """Anos das partições encontradas em base (sem ler os arquivos)"""
+    anos = {particao_do_nome(arquivo)[0] for arquivo in descobrir_arquivos(base)}
+    return sorted(ano for ano in anos if ano)
+
+
+def resumo_catalogo(catalogo, base=CAMINHO_BASE):
+    """
+    Resume o catálogo por ano
+
+    Returns:
+        DataFrame com arquivos, linhas, tamanho e período de cada ano
+    """
+    raiz = os.path.join(os.path.realpath(base), "")
+    entradas = pd.DataFrame(
+        [entrada for chave, entrada in catalogo.items() if chave.startswith(raiz)]
+    )
+    if entradas.empty:
+        return pd.DataFrame(
+            columns=["Arquivos", "Linhas", "Tamanho (MB)", "Início", "Fim"]
+        )
+
+    agrupado = entradas.groupby("ano")
+    resumo = pd.DataFrame(
+        {
+            "Arquivos": agrupado.size(),
+            "Linhas": agrupado["linhas"].sum(),
+            "Tamanho (MB)": (agrupado["tamanho"].sum() / 1024**2).round(2),
+            "Início": agrupado["inicio"].min().str[:10],
+            "Fim": agrupado["fim"].max().str[:10],
+        }
+    )
+    resumo.index.name = "Ano"
+
+    return resumo
+
+
+def podar_arquivos(catalogo, arquivos, inicio=None, fim=None):
+    """
+    Remove da lista os arquivos que não têm atendimentos no período
+
+    Arquivos sem entrada válida no catálogo são mantidos.
+
+    Args:
+        catalogo: dict retornado por carregar_catalogo()
+        arquivos: Lista de caminhos de CSV
+        inicio: Data inicial (inclusiva) ou None
+        fim: Data final (inclusiva) ou None
+
+    Returns:
+        Lista de arquivos que podem conter atendimentos no período
+    """
+    if inicio is None and fim is None:
+        return list(arquivos)
+
+    inicio = pd.Timestamp(inicio) if inicio is not None else None
+    fim = pd.Timestamp(fim) if fim is not None else None
+    selecionados = []
+
+    for arquivo in arquivos:
+        entrada = entrada_arquivo(catalogo, arquivo)
+        if entrada is not None:
+            if entrada["inicio"] is None:
+                continue  # Arquivo sem datas válidas
+            if inicio is not None and pd.Timestamp(entrada["fim"]) < inicio:
+                continue
+            if fim is not None and pd.Timestamp(entrada["inicio"]) > fim:
+                continue
+        selecionados.append(arquivo)
+
+    return selecionados
+
+
+if __name__ == "__main__":
+    print(resumo_catalogo(atualizar_catalogo()))
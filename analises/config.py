@@ -4,16 +4,51 @@ Configurações e constantes do projeto
 
 import os
 
-# Caminhos dos dados
+# Caminho dos dados: um subdiretório por ano, descobertos pelo catálogo
 CAMINHO_BASE = "../dados/csv"
-CAMINHO_2022 = "../dados/csv/2022"
-CAMINHO_2023 = "../dados/csv/2023"
-CAMINHO_2024 = "../dados/csv/2024"
+
+# Catálogo das partições e do período coberto por cada arquivo (ver catalogo.py)
+CAMINHO_CATALOGO = "./cache/catalogo.json"
+
+# Armazém de colunas memory-mapped do conjunto preparado (ver armazem_colunas.py)
+CAMINHO_ARMAZEM = "./cache/armazem"
+
+# Banco SQLite de consultas ad hoc e da API (ver banco_consulta.py)
+CAMINHO_BANCO = "./cache/consulta.sqlite"
+CONSULTA_LIMITE_LINHAS = 10_000  # Máximo de linhas por consulta em /consulta
+CONSULTA_TIMEOUT = 10  # Segundos
+
+# Perfil de qualidade dos arquivos brutos (ver qualidade_dados.py)
+CAMINHO_QUALIDADE = "./cache/qualidade.json"
+TOLERANCIA_IDADE = 1  # Anos de diferença aceitos entre 'Età' e 'Data Nascita'
+
+# Motor de cálculo das análises: "pandas", "duckdb" ou "polars" (ver motores.py)
+MOTOR_CALCULO = "pandas"
+
+# Testes de associação (ver testes_estatisticos.py)
+PERMUTACOES = 10_000  # Permutações do teste de permutação
+LOTE_PERMUTACOES = 1_000  # Permutações por lote (cada lote tem sua semente)
+SEMENTE_ALEATORIA = 42  # Semente dos sorteios (resultados reproduzíveis)
+
+# Intervalos de confiança bootstrap por paciente (ver intervalos_confianca.py)
+CAMINHO_BOOTSTRAP = "./cache/bootstrap"
+REPLICAS_BOOTSTRAP = 1_000
+LOTE_BOOTSTRAP = 100  # Réplicas por lote (pesos lote x pacientes em memória)
+
+# Previsão de chegadas diárias por categoria (ver previsao.py)
+CAMINHO_PREVISAO = "./cache/previsao"
+HARMONICOS_ANUAIS = 2  # Pares seno/cosseno da sazonalidade anual
+MEIA_VIDA_TREINO = 60  # Dias para o peso de um dia do treino cair à metade
+HORIZONTE_PREVISAO = 28  # Dias previstos (padrão)
+BACKTEST_ORIGENS = 4  # Janelas de HORIZONTE_PREVISAO dias avaliadas no backtest
 
 # Configurações de visualização
 FIGURA_TAMANHO = [22, 9]
 FONTE_TAMANHO = 21
 ESTILO_GRAFICO = "bmh"
+TOP_CATEGORIAS = 10  # Categorias exibidas nos countplots (demais em "Outros")
+MAX_TOP_CATEGORIAS = 100  # Maior ?top= aceito por /analise/distribuicao
+MAX_OUTLIERS = 200  # Outliers distintos guardados no resumo de cada boxplot
 
 # Cores para categorias de urgência
 CORES_URGENZA = {
@@ -30,8 +65,21 @@ ORDEM_URGENZA = ["Bianca", "Verde", "Gialla", "Arancione", "Rossa"]
 # Ordem dos subgrupos de pacientes
 ORDEM_SUBGRUPOS = ["Common user", "Frequent User", "Heavy User", "High User"]
 
-# Ordem das faixas etárias
-ORDEM_FAIXAS = ["15-44 anni", "45-64 anni", "> 64 anni"]
+# Faixas etárias: idade mínima (inclusiva, em anos completos) de cada
+# faixa, em ordem crescente; a última faixa não tem limite superior
+LIMITES_FAIXAS = [0, 15, 45, 65]
+
+# Ordem das faixas etárias (rótulos de LIMITES_FAIXAS)
+ORDEM_FAIXAS = ["< 15 anni", "15-44 anni", "45-64 anni", "> 64 anni"]
+
+# Códigos de 'Urgenza' e suas categorias
+MAPEAMENTO_URGENZA = {
+    1: "Bianca",
+    2: "Verde",
+    3: "Gialla",
+    4: "Arancione",
+    5: "Rossa",
+}
 
 # Mapeamento de dias da semana
 MAPEAMENTO_DIAS = {
@@ -44,6 +92,66 @@ MAPEAMENTO_DIAS = {
     6: "Domenica",
 }
 
+# Nomes dos meses em italiano
+MESI_ITALIANI = {
+    1: "Gennaio",
+    2: "Febbraio",
+    3: "Marzo",
+    4: "Aprile",
+    5: "Maggio",
+    6: "Giugno",
+    7: "Luglio",
+    8: "Agosto",
+    9: "Settembre",
+    10: "Ottobre",
+    11: "Novembre",
+    12: "Dicembre",
+}
+
+# Granularidades das séries temporais (frequência de resample do pandas)
+GRANULARIDADES = {
+    "dia": "D",
+    "semana": "W-MON",
+    "mes": "MS",
+}
+
+# Períodos equivalentes a um ano em cada granularidade (para variação anual)
+PERIODOS_ANO = {
+    "dia": 364,  # 52 semanas exatas, preserva o dia da semana
+    "semana": 52,
+    "mes": 12,
+}
+
+# Janelas de retorno ao Pronto Soccorso (em horas)
+JANELAS_RETORNO = {
+    "Retorno 72h": 72,
+    "Retorno 30d": 30 * 24,
+}
+
+# Faixas de intervalo entre atendimentos (em dias)
+BINS_INTERVALO = [0, 3, 7, 30, 90, 365, float("inf")]
+ROTULOS_INTERVALO = [
+    "<= 3 dias",
+    "4-7 dias",
+    "8-30 dias",
+    "31-90 dias",
+    "91-365 dias",
+    "> 365 dias",
+]
+
+# Colunas de profissionais para análise de carga de trabalho
+COLUNAS_EQUIPE = {
+    "medico": "Medico Dimettente",
+    "triagista": "Operatore Triagista",
+}
+
+# Turnos de trabalho (hora de início inclusiva, hora de fim exclusiva)
+TURNOS = {
+    "Mattina": (7, 14),
+    "Pomeriggio": (14, 21),
+    "Notte": (21, 7),
+}
+
 # Ordem dos dias da semana
 ORDEM_DIAS = [
     "Lunedì",
@@ -62,3 +170,31 @@ COLUNAS_REMOVER = [
     "Struttura di Ricovero/Trasferimento",
     "Sessione Ticket",
 ]
+
+# Colunas de data dos CSVs (convertidas na leitura)
+COLUNAS_DATA = ["Data Accesso", "Data Fine Contatto", "Data Nascita"]
+
+# Identificador do atendimento: sempre carregado, pois a remoção de
+# duplicatas pela linha inteira equivale à remoção pela ficha
+COLUNAS_CHAVE = ["Numero Scheda PS"]
+
+# Colunas dos CSVs de que cada análise precisa (além de COLUNAS_CHAVE)
+COLUNAS_ANALISES = {
+    "urgenza": ["Urgenza", "Paziente"],
+    "dimissione": ["Modalità Dimissione"],
+    "problemas": ["Problema Principale"],
+    "frequentes": ["Paziente"],
+    "temporal": ["Urgenza", "Data Accesso"],
+    "chegadas": ["Urgenza", "Data Accesso"],
+    "idade": ["Urgenza", "Età", "Data Nascita", "Data Accesso"],
+    "associacao": ["Urgenza", "Paziente", "Data Nascita", "Data Accesso"],
+    "previsao": ["Urgenza", "Data Accesso"],
+    "permanencia": ["Urgenza", "Paziente", "Data Accesso", "Data Fine Contatto"],
+    "retornos": ["Urgenza", "Paziente", "Data Accesso"],
+    "carga": ["Urgenza", "Data Accesso", "Medico Dimettente", "Operatore Triagista"],
+}
+
+# Análise por estrutura (opcional: main.py --por-estrutura): a coluna de
+# COLUNAS_REMOVER mantida como categórica e as análises de cada estrutura
+COLUNA_ESTRUTURA = "Struttura"
+ANALISES_ESTRUTURA = ["urgenza", "dimissione", "temporal"]
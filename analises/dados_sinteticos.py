@@ -0,0 +1,263 @@
+"""
+Gerador de dados sintéticos de atendimentos do Pronto Soccorso
+
+Produz arquivos CSV semanais com o mesmo esquema dos dados reais em
+dados/csv (mesmas colunas e ordem, cabeçalho 'Et&agrave;', codificação
+latin-1, datas dd/mm/aaaa e quebras de linha CRLF), organizados em
+subdiretórios por ano com nomes como '2022/2022.17.csv'.
+
+Uso:
+    python dados_sinteticos.py 1000000 ./benchmark_dados/1000000
+"""
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# Colunas na ordem exata dos arquivos reais
+COLUNAS_CSV = [
+    "Urgenza",
+    "Data Accesso",
+    "Data Fine Contatto",
+    "Struttura",
+    "Paziente",
+    "Modalità Dimissione",
+    "Problema Principale",
+    "Numero Scheda PS",
+    "Medico Dimettente",
+    "Struttura di Ricovero/Trasferimento",
+    "Et&agrave;",
+    "Fast Track",
+    "Operatore Triagista",
+    "Sessione Ticket",
+    "Data Nascita",
+]
+
+# Distribuições aproximadas observadas nos dados reais
+URGENZA_PROB = {1: 0.018, 2: 0.143, 3: 0.466, 4: 0.314, 5: 0.059}
+
+DIMISSIONE_PROB = {
+    "Dimissione a domicilio": 0.844,
+    "Ricoverato": 0.100,
+    "Il paziente abbandona il PS prima della visita medica": 0.029,
+    "Trasferimento ad altro istituto": 0.012,
+    "Rifiuta ricovero": 0.007,
+    "Il paziente abbandona il PS in corso di accertamenti e/o prima della "
+    "chiusura della cartella clinica": 0.007,
+    "Inserito per errore": 0.001,
+}
+
+PROBLEMA_PROB = {
+    "Altri sintomi o disturbi": 0.280,
+    "Trauma": 0.213,
+    "Dolore addominale": 0.085,
+    "Febbre": 0.069,
+    "Sintomi o disturbi ostetrico-ginecologici": 0.052,
+    "Dolore toracico": 0.048,
+    "Sintomi o disturbi urologici": 0.041,
+    "Dispnea": 0.039,
+    "Sintomi o disturbi oculistici": 0.032,
+    "Altri sintomi sistema nervoso": 0.032,
+    "Sintomi o disturbi otorinolaringoiatrici": 0.031,
+    "Sintomi o disturbi dermatologici": 0.014,
+    "Alterazioni del ritmo": 0.012,
+    "Emorragia non traumatica": 0.012,
+    "Sindrome neurologica acuta": 0.012,
+    "Reazione allergica": 0.009,
+    "Violenza altrui": 0.004,
+    "Intossicazione": 0.003,
+    "Psichiatrico": 0.002,
+    "Coma": 0.001,
+}
+
+REPARTI_RICOVERO = [
+    "MEDICINA\rPRESIDIO OSPEDALIERO CHIARI",
+    "OSTETRICIA_GINECOLOGIA\rPRESIDIO OSPEDALIERO CHIARI",
+    "CHIRURGIA\rPRESIDIO OSPEDALIERO CHIARI",
+    "PEDIATRIA\rPRESIDIO OSPEDALIERO CHIARI",
+    "CARDIOLOGIA\rPRESIDIO OSPEDALIERO CHIARI",
+    "ORTOPEDIA E TRAUMATOLOGIA\rPRESIDIO OSPEDALIERO CHIARI",
+    "PO ISEO",
+]
+
+STRUTTURA = "DEA - PRONTO SOCCORSO P.O. CHIARI"
+
+SILLABE = [
+    "BA", "BE", "BO", "CA", "CE", "CO", "DA", "DE", "DI", "FA", "FE", "GA",
+    "GE", "LA", "LE", "LI", "LO", "MA", "ME", "MI", "NA", "NE", "NI", "PA",
+    "PE", "RA", "RE", "RI", "RO", "SA", "SE", "TA", "TE", "TO", "VA", "ZA",
+]  # fmt: skip
+
+NOMI = [
+    "ANDREA", "ANNA", "ALBERTO", "CHIARA", "DAVIDE", "ELENA", "FABIO", "FRANCESCO",
+    "GIULIA", "GIUSEPPE", "LAURA", "LUCA", "LUIGI", "MARCO", "MARIA", "MASSIMO",
+    "MATTEO", "PAOLA", "PAOLO", "ROBERTO", "SARA", "SIMONE", "SONIA", "STEFANO",
+]  # fmt: skip
+
+
+def _nomes_pessoas(quantidade, rng):
+    """Gera nomes distintos no formato 'COGNOME NOME' (maiúsculas)"""
+    sillabe = np.array(SILLABE)
+    nomi = np.array(NOMI)
+    indices = np.arange(quantidade)
+    n = len(sillabe)
+
+    # Sobrenome de três sílabas + 'NI' e nome; segundo nome só quando necessário
+    nome = nomi[indices % len(nomi)]
+    resto = indices // len(nomi)
+    cognome = np.char.add(
+        np.char.add(sillabe[resto % n], sillabe[resto // n % n]),
+        np.char.add(sillabe[resto // n**2 % n], "NI"),
+    )
+    nomes = np.char.add(np.char.add(cognome, " "), nome)
+
+    extra = resto // n**3
+    if quantidade > 0 and extra.max() > 0:
+        segundo = np.where(extra > 0, np.char.add(" ", nomi[extra % len(nomi)]), "")
+        nomes = np.char.add(nomes, segundo)
+
+    return rng.permutation(nomes)
+
+
+def _escolher(rng, probabilidades, tamanho):
+    """Sorteia valores de um dicionário {valor: probabilidade}"""
+    valores = np.array(list(probabilidades))
+    pesos = np.array(list(probabilidades.values()), dtype=float)
+    return valores[rng.choice(len(valores), size=tamanho, p=pesos / pesos.sum())]
+
+
+def _formatar_datas(datas):
+    """Formata datetime64[D] como dd/mm/aaaa"""
+    return pd.DatetimeIndex(datas).strftime("%d/%m/%Y")
+
+
+def gerar_atendimentos(num_linhas, inicio="2022-01-01", dias=3 * 365, seed=42):
+    """
+    Gera atendimentos sintéticos em memória
+
+    Args:
+        num_linhas: Número de atendimentos
+        inicio: Data do primeiro atendimento
+        dias: Número de dias cobertos
+        seed: Semente do gerador aleatório
+
+    Returns:
+        DataFrame com as colunas de COLUNAS_CSV, ordenado por 'Data Accesso'
+    """
+    rng = np.random.default_rng(seed)
+
+    # Pacientes: cerca de 2 atendimentos por paciente, com cauda longa
+    num_pacientes = max(1, num_linhas // 2)
+    nomes_pacientes = _nomes_pessoas(num_pacientes, rng)
+    nascimento_paciente = np.datetime64("1930-01-01") + rng.integers(
+        0, 365 * 90, num_pacientes
+    ).astype("timedelta64[D]")
+    paciente = np.minimum(
+        (num_pacientes * rng.random(num_linhas) ** 2.5).astype(np.int64),
+        num_pacientes - 1,
+    )
+
+    acesso = np.sort(
+        np.datetime64(inicio)
+        + rng.integers(0, dias, num_linhas).astype("timedelta64[D]")
+    )
+    fim = acesso + rng.choice([0, 1, 2], size=num_linhas, p=[0.899, 0.1, 0.001]).astype(
+        "timedelta64[D]"
+    )
+    nascita = nascimento_paciente[paciente]
+    acesso_ts = pd.DatetimeIndex(acesso)
+    nascita_ts = pd.DatetimeIndex(nascita)
+    eta = (
+        acesso_ts.year
+        - nascita_ts.year
+        - (
+            (acesso_ts.month < nascita_ts.month)
+            | ((acesso_ts.month == nascita_ts.month) & (acesso_ts.day < nascita_ts.day))
+        )
+    )
+
+    medici = _nomes_pessoas(90, np.random.default_rng(seed + 1))
+    triagisti = _nomes_pessoas(88, np.random.default_rng(seed + 2))
+
+    dimissione = _escolher(rng, DIMISSIONE_PROB, num_linhas)
+    ricovero = np.where(
+        dimissione == "Ricoverato",
+        np.array(REPARTI_RICOVERO, dtype=object)[
+            rng.integers(0, len(REPARTI_RICOVERO), num_linhas)
+        ],
+        None,
+    )
+
+    ticket = pd.array(800000 + rng.integers(0, 230000, num_linhas), dtype="Int64")
+    ticket[rng.random(num_linhas) < 0.025] = pd.NA
+
+    anos = acesso_ts.year.to_numpy()
+    sequencia = np.arange(num_linhas) - np.searchsorted(anos, anos)
+
+    return pd.DataFrame(
+        {
+            "Urgenza": _escolher(rng, URGENZA_PROB, num_linhas),
+            "Data Accesso": _formatar_datas(acesso),
+            "Data Fine Contatto": _formatar_datas(fim),
+            "Struttura": STRUTTURA,
+            "Paziente": nomes_pacientes[paciente],
+            "Modalità Dimissione": dimissione,
+            "Problema Principale": _escolher(rng, PROBLEMA_PROB, num_linhas),
+            "Numero Scheda PS": anos.astype(np.int64) * 1000000 + sequencia + 1,
+            "Medico Dimettente": medici[rng.integers(0, len(medici), num_linhas)],
+            "Struttura di Ricovero/Trasferimento": ricovero,
+            "Et&agrave;": eta,
+            "Fast Track": None,
+            "Operatore Triagista": triagisti[
+                rng.integers(0, len(triagisti), num_linhas)
+            ],
+            "Sessione Ticket": ticket,
+            "Data Nascita": _formatar_datas(nascita),
+            "_ano": anos,
+            "_semana": (acesso_ts.dayofyear.to_numpy() - 1) // 7 + 1,
+        },
+        columns=COLUNAS_CSV + ["_ano", "_semana"],
+    )
+
+
+def gerar_dados_sinteticos(num_linhas, diretorio, seed=42):
+    """
+    Gera arquivos CSV semanais sintéticos em diretorio/<ano>/<ano>.<semana>.csv
+
+    Args:
+        num_linhas: Número total de atendimentos
+        diretorio: Diretório de destino
+        seed: Semente do gerador aleatório
+
+    Returns:
+        Lista com os caminhos dos arquivos gerados
+    """
+    atendimentos = gerar_atendimentos(num_linhas, seed=seed)
+    arquivos = []
+
+    for (ano, semana), grupo in atendimentos.groupby(["_ano", "_semana"], sort=True):
+        diretorio_ano = os.path.join(diretorio, str(ano))
+        os.makedirs(diretorio_ano, exist_ok=True)
+        caminho = os.path.join(diretorio_ano, f"{ano}.{semana}.csv")
+
+        grupo[COLUNAS_CSV].to_csv(
+            caminho,
+            index=False,
+            encoding="latin-1",
+            lineterminator="\r\n",
+        )
+        arquivos.append(caminho)
+
+    return arquivos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos de PS")
+    parser.add_argument("linhas", type=int, help="Número de atendimentos")
+    parser.add_argument("diretorio", help="Diretório de destino")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    arquivos = gerar_dados_sinteticos(args.linhas, args.diretorio, args.seed)
+    print(f"{len(arquivos)} arquivos gerados em {args.diretorio}")
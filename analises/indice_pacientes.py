@@ -0,0 +1,174 @@
+"""
+Dicionário de pacientes e índice de atendimentos por paciente
+
+Cada nome distinto de 'Paziente' recebe, uma única vez na preparação dos
+dados, um ID int32 denso (coluna 'ID Paziente', na ordem alfabética dos
+nomes). Contagens e agrupamentos por paciente passam a ser feitos sobre
+inteiros (np.bincount) em vez de repetir o hash dos nomes.
+
+O índice guarda as linhas ordenadas por paciente e data de acesso no
+formato CSR: as visitas do paciente i são ordem[offsets[i]:offsets[i + 1]].
+Ele é persistido junto com o armazém de colunas (armazem_colunas.py).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def codificar_pacientes(pacientes):
+    """
+    Atribui um ID int32 denso a cada paciente distinto
+
+    Args:
+        pacientes: Series com os nomes dos pacientes
+
+    Returns:
+        tuple (IDs int32 por linha, -1 para ausentes; nomes na ordem dos IDs)
+    """
+    ids, nomes = pd.factorize(pacientes, sort=True)
+    return ids.astype(np.int32), nomes
+
+
+def ids_pacientes(df):
+    """
+    IDs dos pacientes de cada linha
+
+    Usa a coluna 'ID Paziente' criada por preparar_dataframe(); sem ela,
+    os IDs são calculados a partir de 'Paziente'.
+
+    Returns:
+        Array int32 alinhado às linhas de df
+    """
+    if "ID Paziente" in df.columns:
+        return df["ID Paziente"].to_numpy()
+    return codificar_pacientes(df["Paziente"])[0]
+
+
+def contar_pacientes(df):
+    """Número de pacientes distintos (equivalente a df['Paziente'].nunique())"""
+    ids = ids_pacientes(df)
+    return int(np.count_nonzero(np.bincount(ids[ids >= 0])))
+
+
+def pacientes_por_grupo(df, coluna):
+    """
+    Número de pacientes distintos em cada valor de uma coluna
+
+    Args:
+        df: DataFrame com 'Paziente' (ou 'ID Paziente') e a coluna
+        coluna: Coluna de agrupamento (ex.: 'Categoria Urgenza')
+
+    Returns:
+        Series {valor da coluna: pacientes distintos}
+    """
+    ids = ids_pacientes(df).astype(np.int64)
+    grupos, valores = pd.factorize(df[coluna], sort=True)
+    validos = (ids >= 0) & (grupos >= 0)
+
+    # Pares (grupo, paciente) distintos, contados por grupo
+    total_ids = int(ids.max()) + 1 if len(ids) else 1
+    pares = np.unique(grupos[validos] * total_ids + ids[validos])
+    contagens = np.bincount(pares // total_ids, minlength=len(valores))
+
+    return pd.Series(contagens, index=pd.Index(valores, name=coluna))
+
+
+def atendimentos_por_paciente(df):
+    """
+    Número de atendimentos de cada paciente (equivalente a groupby().size())
+
+    Returns:
+        Series {nome do paciente: atendimentos}, na ordem dos nomes
+    """
+    ids = ids_pacientes(df)
+    validos = ids >= 0
+    contagens = np.bincount(ids[validos])
+    presentes = np.flatnonzero(contagens)
+
+    # Nome de cada ID pela primeira linha em que ele aparece
+    linhas = np.flatnonzero(validos)
+    primeira = np.full(len(contagens), -1, dtype=np.int64)
+    primeira[ids[linhas][::-1]] = linhas[::-1]
+    nomes = df["Paziente"].to_numpy()[primeira[presentes]]
+
+    return pd.Series(contagens[presentes], index=pd.Index(nomes, name="Paziente"))
+
+
+class IndicePacientes:
+    """
+    Índice CSR dos atendimentos por paciente
+
+    Atributos:
+        ids: ID do paciente de cada linha (int32)
+        nomes: Nome de cada ID (ordem alfabética)
+        ordem: Posições das linhas ordenadas por (paciente, data de acesso)
+        offsets: Início das visitas de cada paciente em ordem (len = n + 1)
+    """
+
+    def __init__(self, ids, nomes, ordem, offsets):
+        self.ids = ids
+        self.nomes = nomes
+        self.ordem = ordem
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def id_paciente(self, nome):
+        """ID de um paciente pelo nome (None se não existir)"""
+        posicao = int(np.searchsorted(self.nomes, nome))
+        if posicao < len(self.nomes) and self.nomes[posicao] == nome:
+            return posicao
+        return None
+
+    def nome(self, id_paciente):
+        """Nome de um paciente pelo ID"""
+        return str(self.nomes[id_paciente])
+
+    def contagem(self, id_paciente):
+        """Número de atendimentos de um paciente"""
+        return int(self.offsets[id_paciente + 1] - self.offsets[id_paciente])
+
+    def contagens(self):
+        """Número de atendimentos de cada paciente (na ordem dos IDs)"""
+        return np.diff(self.offsets)
+
+    def visitas(self, id_paciente):
+        """Posições das linhas de um paciente, em ordem cronológica"""
+        return self.ordem[self.offsets[id_paciente] : self.offsets[id_paciente + 1]]
+
+
+def construir_indice(ids, nomes, datas=None):
+    """
+    Constrói o índice CSR a partir dos IDs de cada linha
+
+    Args:
+        ids: IDs int32 por linha (ver codificar_pacientes)
+        nomes: Nomes na ordem dos IDs
+        datas: 'Data Accesso' de cada linha (opcional, ordena as visitas)
+
+    Returns:
+        IndicePacientes
+    """
+    ids = np.asarray(ids)
+    if datas is not None:
+        tempos = np.asarray(datas).astype("datetime64[ns]").astype(np.int64)
+        ordem = np.lexsort((tempos, ids))
+    else:
+        ordem = np.argsort(ids, kind="stable")
+
+    # Linhas sem paciente (ID -1) ficam no início da ordenação
+    ordem = ordem[np.count_nonzero(ids < 0) :]
+
+    contagens = np.bincount(ids[ids >= 0], minlength=len(nomes))
+    offsets = np.zeros(len(nomes) + 1, dtype=np.int64)
+    np.cumsum(contagens, out=offsets[1:])
+
+    return IndicePacientes(ids, np.asarray(nomes), ordem.astype(np.int64), offsets)
+
+
+def indice_do_dataframe(df):
+    """Constrói o índice de um DataFrame (IDs próprios, densos em df)"""
+    ids, nomes = codificar_pacientes(df["Paziente"])
+    datas = df["Data Accesso"] if "Data Accesso" in df.columns else None
+    return construir_indice(ids, nomes, datas)
@@ -0,0 +1,227 @@
+"""
+Instrumentação leve do pipeline de análise
+
+Mede tempo de relógio, tempo de CPU, pico de memória (tracemalloc) e
+número de linhas de cada etapa decorada com @instrumentar ou envolvida
+em `with etapa(...)`. Desativada por padrão: nesse caso o decorador só
+testa uma flag e chama a função original.
+
+Ativação:
+    - programática: ativar(arquivo_trace="trace.jsonl")
+    - variável de ambiente: MARI_PERFIL=1 (ou MARI_PERFIL=trace.jsonl)
+"""
+
+import functools
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_estado = {
+    "ativo": False,
+    "memoria": True,
+    "arquivo_trace": None,
+    "registros": [],
+    "pilha": [],
+}
+
+
+def ativar(arquivo_trace=None, memoria=True):
+    """
+    Ativa a coleta de métricas
+
+    Args:
+        arquivo_trace: Caminho de um arquivo JSON Lines para o trace (opcional)
+        memoria: Se True, mede o pico de memória com tracemalloc
+    """
+    _estado["ativo"] = True
+    _estado["memoria"] = memoria
+    _estado["arquivo_trace"] = arquivo_trace
+    _estado["registros"] = []
+    _estado["pilha"] = []
+
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    if arquivo_trace:
+        # Trace novo a cada ativação
+        open(arquivo_trace, "w", encoding="utf-8").close()
+
+
+def desativar():
+    """Desativa a coleta de métricas (os registros são mantidos)"""
+    _estado["ativo"] = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def ativo():
+    """Indica se a instrumentação está ativa"""
+    return _estado["ativo"]
+
+
+def _contar_linhas(objeto):
+    """Retorna o número de linhas de DataFrames/Series (ou None)"""
+    if hasattr(objeto, "shape") and hasattr(objeto, "index"):
+        return len(objeto)
+    return None
+
+
+def _registrar(registro):
+    """Armazena um registro e o grava no trace, se configurado"""
+    _estado["registros"].append(registro)
+
+    if _estado["arquivo_trace"]:
+        with open(_estado["arquivo_trace"], "a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def etapa(nome, linhas=None):
+    """
+    Mede um bloco de código como uma etapa
+
+    O dicionário retornado pode receber 'linhas_saida' dentro do bloco.
+
+    Exemplo:
+        with etapa("crosstab", linhas=len(df)) as info:
+            tabela = pd.crosstab(...)
+            info["linhas_saida"] = len(tabela)
+    """
+    if not _estado["ativo"]:
+        yield {}
+        return
+
+    memoria = _estado["memoria"] and tracemalloc.is_tracing()
+    pilha = _estado["pilha"]
+    info = {"linhas_entrada": linhas, "linhas_saida": None}
+
+    if memoria:
+        atual, pico = tracemalloc.get_traced_memory()
+        # O pico acumulado até aqui pertence às etapas externas
+        for externa in pilha:
+            externa["pico"] = max(externa["pico"], pico)
+        tracemalloc.reset_peak()
+    else:
+        atual = 0
+
+    quadro = {"base": atual, "pico": atual}
+    pilha.append(quadro)
+    inicio_relogio = time.perf_counter()
+    inicio_cpu = time.process_time()
+
+    try:
+        yield info
+    finally:
+        duracao = time.perf_counter() - inicio_relogio
+        cpu = time.process_time() - inicio_cpu
+        pilha.pop()
+
+        pico_mb = None
+        if memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            quadro["pico"] = max(quadro["pico"], pico)
+            for externa in pilha:
+                externa["pico"] = max(externa["pico"], quadro["pico"])
+            pico_mb = (quadro["pico"] - quadro["base"]) / 1024**2
+
+        _registrar(
+            {
+                "etapa": nome,
+                "nivel": len(pilha),
+                "inicio": inicio_relogio,
+                "tempo_s": duracao,
+                "cpu_s": cpu,
+                "pico_memoria_mb": pico_mb,
+                "linhas_entrada": info.get("linhas_entrada"),
+                "linhas_saida": info.get("linhas_saida"),
+            }
+        )
+
+
+def instrumentar(funcao):
+    """
+    Decorador que mede cada chamada da função como uma etapa
+
+    As linhas de entrada são as do primeiro argumento DataFrame/Series e
+    as de saída, as do retorno (quando for DataFrame/Series).
+    """
+    nome = funcao.__qualname__
+
+    @functools.wraps(funcao)
+    def wrapper(*args, **kwargs):
+        if not _estado["ativo"]:
+            return funcao(*args, **kwargs)
+
+        linhas = next(
+            (n for n in map(_contar_linhas, args) if n is not None),
+            None,
+        )
+        with etapa(nome, linhas) as info:
+            resultado = funcao(*args, **kwargs)
+            info["linhas_saida"] = _contar_linhas(resultado)
+
+        return resultado
+
+    return wrapper
+
+
+def resumo():
+    """
+    Consolida os registros por etapa
+
+    Returns:
+        DataFrame com chamadas, tempos, pico de memória e linhas por etapa,
+        na ordem da primeira execução
+    """
+    import pandas as pd
+
+    colunas = [
+        "Chamadas",
+        "Tempo (s)",
+        "CPU (s)",
+        "Pico memória (MB)",
+        "Linhas entrada",
+        "Linhas saída",
+    ]
+    if not _estado["registros"]:
+        return pd.DataFrame(columns=colunas)
+
+    registros = pd.DataFrame(_estado["registros"])
+    agrupado = registros.groupby("etapa", sort=False)
+
+    tabela = pd.DataFrame(
+        {
+            "Chamadas": agrupado.size(),
+            "Tempo (s)": agrupado["tempo_s"].sum(),
+            "CPU (s)": agrupado["cpu_s"].sum(),
+            "Pico memória (MB)": agrupado["pico_memoria_mb"].max(),
+            "Linhas entrada": agrupado["linhas_entrada"].max(),
+            "Linhas saída": agrupado["linhas_saida"].max(),
+        }
+    )
+    tabela.index.name = "Etapa"
+
+    return tabela[colunas]
+
+
+def imprimir_resumo():
+    """Imprime a tabela de resumo da instrumentação"""
+    tabela = resumo()
+
+    print("\n" + "=" * 80)
+    print("RESUMO DE DESEMPENHO POR ETAPA")
+    print("=" * 80)
+    if tabela.empty:
+        print("Nenhuma etapa registrada (instrumentação desativada?)")
+    else:
+        print(tabela.round(3).to_string())
+
+    return tabela
+
+
+# Ativação por variável de ambiente
+if os.environ.get("MARI_PERFIL"):
+    _valor = os.environ["MARI_PERFIL"]
+    ativar(arquivo_trace=None if _valor == "1" else _valor)
@@ -0,0 +1,338 @@
+"""
+Intervalos de confiança bootstrap para percentuais de categorias
+
+Como um mesmo paciente tem vários atendimentos, os atendimentos não são
+independentes: o bootstrap reamostra pacientes (com todos os seus
+atendimentos), não linhas.
+
+Cada réplica equivale a dar a cada paciente um peso igual ao número de
+vezes que ele foi sorteado (pesos multinomiais que somam o número de
+pacientes). Com a matriz pacientes x categorias de contagens, as
+contagens de um lote inteiro de réplicas saem de um único produto de
+matrizes (pesos do lote x matriz), sem laço de df.sample():
+
+    pesos (réplicas x pacientes) @ matriz (pacientes x células)
+
+Os lotes têm sementes derivadas de SEMENTE_ALEATORIA (o resultado não
+depende do número de processos) e as réplicas ficam em cache em disco,
+por versão dos dados, para que outros níveis de confiança saiam sem
+reamostrar.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from armazem_colunas import ArmazemColunas, garantir_dataframe
+from config import (
+    CAMINHO_BOOTSTRAP,
+    LOTE_BOOTSTRAP,
+    REPLICAS_BOOTSTRAP,
+    SEMENTE_ALEATORIA,
+)
+from indice_pacientes import ids_pacientes
+from instrumentacao import instrumentar
+from utils import versao_dados
+
+# Matriz pacientes x células de cada processo do pool (ver _iniciar_processo)
+_matriz_processo = None
+
+
+def matriz_pacientes(df, colunas):
+    """
+    Contagem de atendimentos de cada paciente em cada célula
+
+    Args:
+        df: DataFrame ou ArmazemColunas com 'ID Paziente' (ou 'Paziente')
+        colunas: Uma coluna (percentuais simples) ou duas (tabela cruzada)
+
+    Returns:
+        tuple (array pacientes x células, Index ou MultiIndex das células)
+    """
+    df = garantir_dataframe(df, ["ID Paziente", *colunas])
+    df = df.dropna(subset=colunas)
+
+    codigos = []
+    niveis = []
+    for coluna in colunas:
+        valores = df[coluna]
+        if isinstance(valores.dtype, pd.CategoricalDtype):
+            codigos.append(valores.cat.codes.to_numpy())
+            niveis.append(valores.cat.categories)
+        else:
+            codigo, nivel = pd.factorize(valores, sort=True)
+            codigos.append(codigo)
+            niveis.append(nivel)
+
+    formato = tuple(len(nivel) for nivel in niveis)
+    n_celulas = int(np.prod(formato))
+    celulas = np.ravel_multi_index(codigos, formato)
+
+    # IDs compactados: só os pacientes presentes entram no sorteio
+    pacientes, ids = np.unique(ids_pacientes(df), return_inverse=True)
+    matriz = np.bincount(
+        ids.astype(np.int64) * n_celulas + celulas,
+        minlength=len(pacientes) * n_celulas,
+    ).reshape(len(pacientes), n_celulas)
+
+    if len(colunas) == 1:
+        rotulos = pd.Index(niveis[0], name=colunas[0])
+    else:
+        rotulos = pd.MultiIndex.from_product(niveis, names=colunas)
+
+    return matriz, rotulos
+
+
+def _replicas_lote(matriz, quantidade, semente):
+    """Contagens por célula de um lote de réplicas (pesos multinomiais)"""
+    rng = np.random.default_rng(semente)
+    n_pacientes = len(matriz)
+
+    # Sorteio com reposição de n_pacientes pacientes por réplica; a
+    # contagem de cada sorteado é o peso multinomial do paciente
+    sorteados = rng.integers(0, n_pacientes, (quantidade, n_pacientes))
+    sorteados += np.arange(quantidade)[:, None] * n_pacientes
+    pesos = np.bincount(sorteados.ravel(), minlength=quantidade * n_pacientes)
+
+    return pesos.reshape(quantidade, n_pacientes).astype(np.float64) @ matriz
+
+
+def _iniciar_processo(matriz):
+    """Guarda a matriz no processo (enviada uma vez, não a cada lote)"""
+    global _matriz_processo
+    _matriz_processo = matriz
+
+
+def _replicas_lote_processo(quantidade, semente):
+    """_replicas_lote() com a matriz guardada no processo"""
+    return _replicas_lote(_matriz_processo, quantidade, semente)
+
+
+@instrumentar
+def replicas_bootstrap(
+    matriz,
+    replicas=REPLICAS_BOOTSTRAP,
+    semente=SEMENTE_ALEATORIA,
+    processos=1,
+    lote=LOTE_BOOTSTRAP,
+):
+    """
+    Contagens por célula de cada réplica do bootstrap por paciente
+
+    Args:
+        matriz: Array pacientes x células (ver matriz_pacientes)
+        replicas: Número de réplicas
+        semente: Semente do gerador (mesma semente, mesmas réplicas)
+        processos: Processos que calculam os lotes em paralelo
+        lote: Réplicas por lote
+
+    Returns:
+        Array réplicas x células
+    """
+    tamanhos = [lote] * (replicas // lote)
+    if replicas % lote:
+        tamanhos.append(replicas % lote)
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    matriz = matriz.astype(np.float64)
+
+    if processos > 1 and len(tamanhos) > 1:
+        with ProcessPoolExecutor(
+            max_workers=processos,
+            initializer=_iniciar_processo,
+            initargs=(matriz,),
+        ) as executor:
+            lotes = list(executor.map(_replicas_lote_processo, tamanhos, sementes))
+    else:
+        lotes = [
+            _replicas_lote(matriz, tamanho, semente_lote)
+            for tamanho, semente_lote in zip(tamanhos, sementes)
+        ]
+
+    return np.concatenate(lotes) if lotes else np.empty((0, matriz.shape[1]))
+
+
+def percentuais_celulas(contagens, formato):
+    """
+    Percentuais das células (na última coluna, se houver duas)
+
+    Com duas colunas, os percentuais somam 100 em cada valor da primeira
+    coluna, como tabela_cruzada(normalizar='index') * 100.
+
+    Args:
+        contagens: Array (... x células)
+        formato: Número de valores de cada coluna
+
+    Returns:
+        Array com a mesma forma de contagens
+    """
+    tabelas = contagens.reshape(*contagens.shape[:-1], *formato)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percentuais = tabelas / tabelas.sum(axis=-1, keepdims=True) * 100
+    return percentuais.reshape(contagens.shape)
+
+
+def _caminho_cache(diretorio, versao, colunas, replicas, semente):
+    """Arquivo das réplicas de um conjunto de parâmetros"""
+    chave = repr((tuple(colunas), replicas, semente)).encode("utf-8")
+    resumo = hashlib.sha1(chave).hexdigest()[:12]
+    return os.path.join(diretorio, f"{versao}-{resumo}.npy")
+
+
+@instrumentar
+def amostras_bootstrap(
+    df,
+    colunas,
+    replicas=REPLICAS_BOOTSTRAP,
+    semente=SEMENTE_ALEATORIA,
+    processos=1,
+    versao=None,
+    cache=CAMINHO_BOOTSTRAP,
+):
+    """
+    Percentuais observados e percentuais de cada réplica do bootstrap
+
+    Não dependem do nível de confiança: os intervalos de qualquer nível
+    saem das mesmas réplicas (ver intervalos_amostras).
+
+    Args:
+        df: DataFrame ou ArmazemColunas
+        colunas: Uma coluna ou lista com duas (percentuais por linha)
+        replicas: Número de réplicas do bootstrap
+        semente: Semente do bootstrap
+        processos: Processos do bootstrap
+        versao: Versão dos dados (None: calculada, se possível; ver
+            versao_dados)
+        cache: Diretório do cache das réplicas (None: sem cache)
+
+    Returns:
+        tuple (Series 'Percentual (%)' indexada pelas células, array
+        réplicas x células)
+    """
+    colunas = [colunas] if isinstance(colunas, str) else list(colunas)
+    matriz, rotulos = matriz_pacientes(df, colunas)
+    formato = [
+        len(nivel_rotulo) for nivel_rotulo in getattr(rotulos, "levels", [rotulos])
+    ]
+
+    if versao is None:
+        if isinstance(df, ArmazemColunas):
+            versao = df.versao
+        elif {"Numero Scheda PS", "Data Accesso"}.issubset(df.columns):
+            versao = versao_dados(df)
+
+    # Sem versão dos dados (colunas da versão não carregadas), sem cache
+    caminho = None
+    if cache and versao is not None:
+        caminho = _caminho_cache(cache, versao, colunas, replicas, semente)
+
+    amostras = None
+    if caminho and os.path.exists(caminho):
+        amostras = np.load(caminho)
+        if amostras.shape != (replicas, len(rotulos)):
+            amostras = None
+
+    if amostras is None:
+        amostras = percentuais_celulas(
+            replicas_bootstrap(matriz, replicas, semente, processos), formato
+        )
+        if caminho:
+            os.makedirs(cache, exist_ok=True)
+            temporario = f"{caminho}.tmp-{os.getpid()}.npy"
+            np.save(temporario, amostras)
+            os.replace(temporario, caminho)
+
+    percentuais = pd.Series(
+        percentuais_celulas(matriz.sum(axis=0), formato),
+        index=rotulos,
+        name="Percentual (%)",
+    )
+    return percentuais, amostras
+
+
+def intervalos_amostras(percentuais, amostras, nivel=95):
+    """
+    Intervalos de confiança (percentil) a partir das réplicas
+
+    Args:
+        percentuais: Series de percentuais observados (ver amostras_bootstrap)
+        amostras: Array réplicas x células (ver amostras_bootstrap)
+        nivel: Nível de confiança em % (ex.: 95)
+
+    Returns:
+        DataFrame indexado pelas células com 'Percentual (%)',
+        'IC inferior (%)' e 'IC superior (%)'
+    """
+    if not 0 < nivel < 100:
+        raise ValueError(f"Nível de confiança inválido: {nivel}")
+
+    alfa = (100 - nivel) / 2
+    inferior, superior = np.nanpercentile(amostras, [alfa, 100 - alfa], axis=0)
+
+    return pd.DataFrame(
+        {
+            "Percentual (%)": percentuais.to_numpy(),
+            "IC inferior (%)": inferior,
+            "IC superior (%)": superior,
+        },
+        index=percentuais.index,
+    )
+
+
+@instrumentar
+def intervalos_percentuais(
+    df,
+    colunas,
+    nivel=95,
+    replicas=REPLICAS_BOOTSTRAP,
+    semente=SEMENTE_ALEATORIA,
+    processos=1,
+    versao=None,
+    cache=CAMINHO_BOOTSTRAP,
+):
+    """
+    Percentuais e intervalos de confiança bootstrap (percentil) por paciente
+
+    Args:
+        df: DataFrame ou ArmazemColunas
+        colunas: Uma coluna ou lista com duas (percentuais por linha)
+        nivel: Nível de confiança em % (ex.: 95)
+        replicas: Número de réplicas do bootstrap
+        semente: Semente do bootstrap
+        processos: Processos do bootstrap
+        versao: Versão dos dados (None: calculada, se possível; ver
+            versao_dados)
+        cache: Diretório do cache das réplicas (None: sem cache)
+
+    Returns:
+        DataFrame indexado pelas células com 'Percentual (%)',
+        'IC inferior (%)' e 'IC superior (%)'
+    """
+    if not 0 < nivel < 100:
+        raise ValueError(f"Nível de confiança inválido: {nivel}")
+
+    percentuais, amostras = amostras_bootstrap(
+        df, colunas, replicas, semente, processos, versao, cache
+    )
+    return intervalos_amostras(percentuais, amostras, nivel)
+
+
+if __name__ == "__main__":
+    from armazem_colunas import obter_armazem
+
+    armazem = obter_armazem()
+    for colunas in (
+        ["Categoria Urgenza"],
+        ["Modalità Dimissione"],
+        ["Categoria Urgenza", "Sottogruppo Pazienti"],
+    ):
+        print("=" * 80)
+        print(f"IC 95% BOOTSTRAP POR PACIENTE: {' x '.join(colunas).upper()}")
+        print("=" * 80)
+        print(
+            intervalos_percentuais(
+                armazem, colunas, processos=os.cpu_count() or 1
+            ).round(2)
+        )
+        print()
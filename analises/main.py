@@ -1,14 +1,40 @@
 """
-Script principal para executar todas as análises
+Script principal para executar as análises
+
+Uso:
+    python main.py                          # análise completa, gráficos na tela
+    python main.py --rapido                 # apenas estatísticas (sem gráficos)
+    python main.py --salvar ./output        # análise completa salvando gráficos
+    python main.py --anos 2023 --analises urgenza idade --rapido
+    python main.py --inicio 2023-03-01 --fim 2023-06-30 --analises temporal
+    python main.py --analises dimissione problemas --formato json --saida ./resultados
+    python main.py --workers 4 --cache-dir ./cache
+    python main.py --armazem --analises urgenza idade --rapido
+    python main.py --por-estrutura --processos 4 --formato json
+    python main.py --motor duckdb --rapido
+    python main.py --perfil [--trace trace.jsonl]
 """
 
+import argparse
 import os
-import sys
 from pathlib import Path
 
+import pandas as pd
+
 # Importações locais
-from config import CAMINHO_2022, CAMINHO_2023, CAMINHO_2024
-from utils import configurar_ambiente, carrega_dados, preparar_dataframe
+from armazem_colunas import garantir_dataframe, obter_armazem
+from catalogo import anos_disponiveis
+from config import ANALISES_ESTRUTURA, CAMINHO_ARMAZEM, COLUNA_ESTRUTURA
+from motores import MOTORES, definir_motor
+from utils import (
+    configurar_ambiente,
+    carrega_particoes,
+    preparar_dataframe,
+    colunas_necessarias,
+    formato_cache,
+    exportar_tabelas,
+    filtrar_periodo,
+)
 from analise_urgenza import (
     estatisticas_urgenza,
     grafico_barras_urgenza,
@@ -16,14 +42,54 @@ from analise_urgenza import (
     analise_urgenza_subgrupo,
     heatmap_urgenza_subgrupo,
     evolucao_temporal_urgenza,
+    perfil_chegadas,
+    tabela_chegadas,
+    heatmap_chegadas,
     analise_urgenza_idade,
     resumo_executivo_urgenza,
 )
+from analise_geral import (
+    analise_dimissione,
+    analise_problema_principal,
+    analise_pacientes_frequentes,
+    analise_temporal_geral,
+    estatisticas_idade,
+    validar_idade,
+)
+from series_temporais import serie_diaria_urgenza, tendencias_urgenza
+from analise_permanencia import analise_permanencia, grafico_ocupacao
+from analise_retornos import analise_retornos
+from analise_carga_trabalho import analise_carga_trabalho
+from testes_estatisticos import relatorio_associacao
+from previsao import relatorio_previsao
+from analise_estrutura import relatorio_estruturas
+from instrumentacao import (
+    ativar,
+    ativo as instrumentacao_ativa,
+    imprimir_resumo,
+    instrumentar,
+)
 
 
-def carregar_dados_completos():
+@instrumentar
+def carregar_dados_completos(
+    anos=None, inicio=None, fim=None, colunas=None, cache_dir=None, workers=1
+):
     """
-    Carrega dados de todos os anos e consolida
+    Carrega as partições selecionadas e consolida
+
+    As partições são descobertas pelo catálogo (catalogo.py); com período
+    definido, só são lidos os arquivos cujo intervalo de datas registrado
+    cruza o período (os arquivos da virada do ano contêm datas dos dois
+    anos, por isso a poda não usa o nome do diretório).
+
+    Args:
+        anos: Lista de anos (str) ou None para todos
+        inicio: Data inicial de 'Data Accesso' (inclusiva) ou None
+        fim: Data final de 'Data Accesso' (inclusiva) ou None
+        colunas: Projeção de colunas (None: todas exceto COLUNAS_REMOVER)
+        cache_dir: Diretório de cache dos arquivos já processados (opcional)
+        workers: Número de threads de leitura de arquivos
 
     Returns:
         DataFrame consolidado
@@ -31,34 +97,287 @@ def carregar_dados_completos():
     print("Carregando dados...")
     print("-" * 80)
 
-    ano_2022_raw = carrega_dados(CAMINHO_2022)
-    print(f"Dados 2022 carregados: {len(ano_2022_raw)} registros")
+    df_raw = carrega_particoes(
+        anos=anos,
+        inicio=inicio,
+        fim=fim,
+        colunas=colunas,
+        cache_dir=cache_dir,
+        workers=workers,
+    )
 
-    ano_2023_raw = carrega_dados(CAMINHO_2023)
-    print(f"Dados 2023 carregados: {len(ano_2023_raw)} registros")
+    print(f"Partições: {', '.join(anos or anos_disponiveis())}")
+    print(f"\nTotal consolidado: {len(df_raw)} registros")
+    print("Dados carregados com sucesso!\n")
 
-    ano_2024_raw = carrega_dados(CAMINHO_2024)
-    print(f"Dados 2024 carregados: {len(ano_2024_raw)} registros")
+    return df_raw
 
-    import pandas as pd
 
-    df_raw = pd.concat([ano_2022_raw, ano_2023_raw, ano_2024_raw], ignore_index=True)
+def _caminho_grafico(diretorio_graficos, nome):
+    """Caminho do arquivo do gráfico (None quando não for salvar)"""
+    return os.path.join(diretorio_graficos, nome) if diretorio_graficos else None
 
-    print(f"\nTotal consolidado: {len(df_raw)} registros")
-    print("Dados carregados com sucesso!\n")
 
-    return df_raw
+def _analise_urgenza(df, graficos=False, diretorio_graficos=None):
+    """Distribuição de Categoria Urgenza, cruzamento com subgrupos e resumo"""
+    salvar = diretorio_graficos is not None
+    stats_urgenza = estatisticas_urgenza(df)
 
+    if graficos:
+        print("\nGerando gráficos de barras...")
+        grafico_barras_urgenza(
+            stats_urgenza["counts"],
+            stats_urgenza["percentuais"],
+            salvar=salvar,
+            caminho_saida=_caminho_grafico(diretorio_graficos, "urgenza_barras.png"),
+        )
+
+        print("\nGerando gráfico de pizza...")
+        grafico_pizza_urgenza(
+            stats_urgenza["counts"],
+            salvar=salvar,
+            caminho_saida=_caminho_grafico(diretorio_graficos, "urgenza_pizza.png"),
+        )
 
-def executar_analise_completa(salvar_graficos=False, diretorio_saida="./output"):
+    analise_subgrupo = analise_urgenza_subgrupo(df)
+
+    if graficos:
+        print("\nGerando heatmap Urgenza x Subgrupo...")
+        heatmap_urgenza_subgrupo(
+            df,
+            salvar=salvar,
+            caminho_saida=_caminho_grafico(
+                diretorio_graficos, "urgenza_subgrupo_heatmap.png"
+            ),
+        )
+
+    resumo_executivo_urgenza(df, stats_urgenza["counts"], stats_urgenza["percentuais"])
+
+    return {
+        "resumo": stats_urgenza["resumo"],
+        "subgrupo": analise_subgrupo["tabela"],
+        "subgrupo_percentuais": analise_subgrupo["percentuais"],
+    }
+
+
+def _analise_dimissione(df, graficos=False, diretorio_graficos=None):
+    """Distribuição de Modalità Dimissione"""
+    return {"resumo": analise_dimissione(df)["resumo"]}
+
+
+def _analise_problemas(df, graficos=False, diretorio_graficos=None):
+    """Problemas principais mais frequentes"""
+    resultado = analise_problema_principal(df)
+    return {
+        "top_problemas": resultado["top_problemas"],
+        "contagens": resultado["counts"],
+    }
+
+
+def _analise_frequentes(df, graficos=False, diretorio_graficos=None):
+    """Pacientes com muitos atendimentos"""
+    return {"pacientes": analise_pacientes_frequentes(df)}
+
+
+def _analise_temporal(df, graficos=False, diretorio_graficos=None):
+    """Distribuição por dia/mês, tendências semanais e evolução mensal"""
+    geral = analise_temporal_geral(df)
+    tendencias = tendencias_urgenza(
+        serie_diaria_urgenza(df), granularidade="semana", janela=4
+    )
+
+    if graficos:
+        print("\nGerando análise temporal...")
+        evolucao_temporal_urgenza(
+            df,
+            salvar=diretorio_graficos is not None,
+            caminho_saida=_caminho_grafico(diretorio_graficos, "urgenza_temporal.png"),
+        )
+
+    return {
+        "por_dia": geral["por_dia"],
+        "por_mes": geral["por_mes"],
+        "serie_semanal": tendencias["serie"],
+        "media_movel": tendencias["media_movel"],
+        "variacao_anual_percentual": tendencias["variacao_percentual"],
+    }
+
+
+def _analise_previsao(df, graficos=False, diretorio_graficos=None):
+    """Backtest e previsão de chegadas diárias por Categoria Urgenza"""
+    return relatorio_previsao(df)
+
+
+def _analise_chegadas(df, graficos=False, diretorio_graficos=None):
+    """Chegadas por dia da semana e hora do dia"""
+    perfil = perfil_chegadas(df)
+
+    if graficos:
+        print("\nGerando heatmap de chegadas...")
+        heatmap_chegadas(
+            perfil,
+            salvar=diretorio_graficos is not None,
+            caminho_saida=_caminho_grafico(diretorio_graficos, "chegadas_heatmap.png"),
+        )
+
+    return {"chegadas": tabela_chegadas(perfil)}
+
+
+def _analise_idade(df, graficos=False, diretorio_graficos=None):
+    """Idade dos pacientes e Categoria Urgenza por faixa etária"""
+    urgenza_idade = analise_urgenza_idade(df)
+    idade = estatisticas_idade(df)
+    tabelas = {
+        "urgenza_faixa": urgenza_idade["tabela"],
+        "urgenza_faixa_percentuais": urgenza_idade["percentuais"],
+        "estatisticas": idade["stats"],
+        "faixas": idade["faixas"],
+    }
+
+    # Comparação da idade no atendimento com a coluna 'Età' dos arquivos
+    if {"Età", "Età Accesso"}.issubset(df.columns):
+        validacao = validar_idade(df)
+        tabelas["validacao_diferencas"] = validacao["diferencas"]
+        tabelas["validacao_por_ano"] = validacao["por_ano"]
+
+    return tabelas
+
+
+def _analise_associacao(df, graficos=False, diretorio_graficos=None):
+    """Qui-quadrado, V de Cramér e teste de permutação de Categoria Urgenza"""
+    return relatorio_associacao(df)
+
+
+def _analise_permanencia(df, graficos=False, diretorio_graficos=None):
+    """Duração do contato e ocupação"""
+    permanencia = analise_permanencia(df)
+
+    if graficos:
+        print("\nGerando gráfico de ocupação...")
+        grafico_ocupacao(
+            permanencia["ocupacao_urgenza"],
+            salvar=diretorio_graficos is not None,
+            caminho_saida=_caminho_grafico(diretorio_graficos, "ocupacao_urgenza.png"),
+        )
+
+    return {
+        "por_urgenza": permanencia["por_urgenza"],
+        "por_subgrupo": permanencia["por_subgrupo"],
+        "ocupacao_urgenza": permanencia["ocupacao_urgenza"],
+    }
+
+
+def _analise_retornos(df, graficos=False, diretorio_graficos=None):
+    """Retornos em 72h e 30 dias"""
+    retornos = analise_retornos(df)
+    return {chave: tabela for chave, tabela in retornos.items() if chave != "retornos"}
+
+
+def _analise_carga(df, graficos=False, diretorio_graficos=None):
+    """Carga de trabalho de médicos e triagistas"""
+    carga = analise_carga_trabalho(df)
+    return {
+        f"{papel}_{chave}": tabela
+        for papel, tabelas in carga.items()
+        for chave, tabela in tabelas.items()
+    }
+
+
+# Análises selecionáveis pela linha de comando (na ordem de execução)
+ANALISES = {
+    "urgenza": _analise_urgenza,
+    "dimissione": _analise_dimissione,
+    "problemas": _analise_problemas,
+    "frequentes": _analise_frequentes,
+    "temporal": _analise_temporal,
+    "previsao": _analise_previsao,
+    "chegadas": _analise_chegadas,
+    "idade": _analise_idade,
+    "associacao": _analise_associacao,
+    "permanencia": _analise_permanencia,
+    "retornos": _analise_retornos,
+    "carga": _analise_carga,
+}
+
+# Análises executadas quando nenhuma é selecionada
+ANALISES_COMPLETA = [
+    "urgenza",
+    "temporal",
+    "chegadas",
+    "idade",
+    "associacao",
+    "permanencia",
+    "retornos",
+    "carga",
+]
+ANALISES_RAPIDA = ["urgenza", "idade", "associacao", "permanencia", "retornos", "carga"]
+
+# Análises que recebem o armazém de colunas sem materializá-lo por inteiro
+ANALISES_ARMAZEM = [
+    "urgenza",
+    "dimissione",
+    "problemas",
+    "frequentes",
+    "previsao",
+    "chegadas",
+    "idade",
+    "associacao",
+]
+
+
+def executar_analises(df, analises, graficos=False, diretorio_graficos=None):
     """
-    Executa todas as análises do projeto
+    Executa as análises selecionadas sobre o DataFrame preparado
 
     Args:
-        salvar_graficos: Se True, salva os gráficos gerados
-        diretorio_saida: Diretório para salvar os gráficos
+        df: DataFrame preparado ou ArmazemColunas
+        analises: Nomes das análises (chaves de ANALISES)
+        graficos: Se True, gera os gráficos
+        diretorio_graficos: Diretório para salvar os gráficos (None: só exibe)
+
+    Returns:
+        dict {analise: {nome da tabela: DataFrame ou Series}}
+    """
+    resultados = {}
+    for nome in ANALISES:
+        if nome in analises:
+            dados = df if nome in ANALISES_ARMAZEM else garantir_dataframe(df)
+            resultados[nome] = ANALISES[nome](dados, graficos, diretorio_graficos)
+
+    return resultados
+
+
+def executar_selecao(
+    analises,
+    graficos=False,
+    diretorio_graficos=None,
+    anos=None,
+    inicio=None,
+    fim=None,
+    cache_dir=None,
+    workers=1,
+    armazem=None,
+):
+    """
+    Carrega somente os dados pedidos e executa as análises selecionadas
+
+    Com armazém, o conjunto preparado é aberto do disco (memory-map) em
+    vez de lido dos CSVs; ele é reconstruído se os dados mudaram.
+
+    Args:
+        analises: Nomes das análises (chaves de ANALISES)
+        graficos: Se True, gera os gráficos
+        diretorio_graficos: Diretório para salvar os gráficos (None: só exibe)
+        anos: Lista de anos (str) ou None para todos
+        inicio: Data inicial de 'Data Accesso' ou None
+        fim: Data final de 'Data Accesso' ou None
+        cache_dir: Diretório de cache dos arquivos já processados (opcional)
+        workers: Número de threads de leitura de arquivos
+        armazem: Diretório do armazém de colunas (None: lê os CSVs)
+
+    Returns:
+        tuple (DataFrame preparado ou ArmazemColunas, dict de resultados)
     """
-    # Configurar ambiente
     print("=" * 80)
     print("INICIANDO ANÁLISE DE DADOS MARI DOUTORADO")
     print("=" * 80)
@@ -67,86 +386,102 @@ def executar_analise_completa(salvar_graficos=False, diretorio_saida="./output")
     configurar_ambiente()
 
     # Criar diretório de saída se necessário
-    if salvar_graficos:
-        Path(diretorio_saida).mkdir(parents=True, exist_ok=True)
-        print(f"Gráficos serão salvos em: {diretorio_saida}\n")
+    if graficos and diretorio_graficos:
+        Path(diretorio_graficos).mkdir(parents=True, exist_ok=True)
+        print(f"Gráficos serão salvos em: {diretorio_graficos}\n")
+
+    if armazem:
+        print(f"Abrindo armazém de colunas: {armazem}")
+        print("-" * 80)
+        df = obter_armazem(armazem, workers=workers)
+        if inicio is not None or fim is not None:
+            df = filtrar_periodo(df.para_dataframe(), inicio, fim)
+        print(f"Dados preparados: {len(df)} registros\n")
+    else:
+        # Carregar somente as colunas das análises selecionadas
+        colunas = colunas_necessarias(analises)
+        df_raw = carregar_dados_completos(
+            anos, inicio, fim, colunas, cache_dir, workers
+        )
 
-    # Carregar dados
-    df_raw = carregar_dados_completos()
+        # Preparar dados
+        print("Preparando dados...")
+        print("-" * 80)
+        df = preparar_dataframe(df_raw.copy())
+        print(f"Dados preparados: {len(df)} registros após limpeza")
+        print(f"Colunas: {', '.join(df.columns)}\n")
 
-    # Preparar dados
-    print("Preparando dados...")
-    print("-" * 80)
-    df = preparar_dataframe(df_raw.copy())
-    print(f"Dados preparados: {len(df)} registros após limpeza")
-    print(f"Colunas: {', '.join(df.columns)}\n")
+    resultados = executar_analises(df, analises, graficos, diretorio_graficos)
 
-    # =========================================================================
-    # ANÁLISE DE CATEGORIA URGENZA
-    # =========================================================================
     print("\n" + "=" * 80)
-    print("ANÁLISE DE CATEGORIA URGENZA")
-    print("=" * 80 + "\n")
+    print("ANÁLISE CONCLUÍDA COM SUCESSO!")
+    print("=" * 80)
 
-    # Estatísticas descritivas
-    stats_urgenza = estatisticas_urgenza(df)
+    return df, resultados
 
-    # Gráficos de barras
-    print("\nGerando gráficos de barras...")
-    caminho_barras = (
-        os.path.join(diretorio_saida, "urgenza_barras.png") if salvar_graficos else None
-    )
-    grafico_barras_urgenza(
-        stats_urgenza["counts"],
-        stats_urgenza["percentuais"],
-        salvar=salvar_graficos,
-        caminho_saida=caminho_barras,
-    )
 
-    # Gráfico de pizza
-    print("\nGerando gráfico de pizza...")
-    caminho_pizza = (
-        os.path.join(diretorio_saida, "urgenza_pizza.png") if salvar_graficos else None
-    )
-    grafico_pizza_urgenza(
-        stats_urgenza["counts"], salvar=salvar_graficos, caminho_saida=caminho_pizza
-    )
+def executar_por_estrutura(
+    analises=ANALISES_ESTRUTURA,
+    processos=1,
+    anos=None,
+    inicio=None,
+    fim=None,
+    cache_dir=None,
+    workers=1,
+):
+    """
+    Carrega os dados com 'Struttura' e executa as análises em cada estrutura
 
-    # Análise cruzada com subgrupos
-    analise_subgrupo = analise_urgenza_subgrupo(df)
+    Args:
+        analises: Nomes das análises (ver analise_estrutura.ANALISES)
+        processos: Processos do pool (as estruturas são analisadas em paralelo)
+        anos: Lista de anos (str) ou None para todos
+        inicio: Data inicial de 'Data Accesso' ou None
+        fim: Data final de 'Data Accesso' ou None
+        cache_dir: Diretório de cache dos arquivos já processados (opcional)
+        workers: Número de threads de leitura de arquivos
 
-    # Heatmap subgrupos
-    print("\nGerando heatmap Urgenza x Subgrupo...")
-    caminho_heatmap_sub = (
-        os.path.join(diretorio_saida, "urgenza_subgrupo_heatmap.png")
-        if salvar_graficos
-        else None
-    )
-    heatmap_urgenza_subgrupo(
-        df, salvar=salvar_graficos, caminho_saida=caminho_heatmap_sub
-    )
+    Returns:
+        tuple (DataFrame preparado, dict {'estrutura': tabelas comparativas})
+    """
+    print("=" * 80)
+    print("INICIANDO ANÁLISE POR ESTRUTURA")
+    print("=" * 80)
+    print()
 
-    # Evolução temporal
-    print("\nGerando análise temporal...")
-    caminho_temporal = (
-        os.path.join(diretorio_saida, "urgenza_temporal.png")
-        if salvar_graficos
-        else None
-    )
-    evolucao_temporal_urgenza(
-        df, salvar=salvar_graficos, caminho_saida=caminho_temporal
-    )
+    configurar_ambiente()
 
-    # Análise por idade
-    analise_idade = analise_urgenza_idade(df)
+    colunas = [*colunas_necessarias(analises), COLUNA_ESTRUTURA]
+    df_raw = carregar_dados_completos(anos, inicio, fim, colunas, cache_dir, workers)
 
-    # Resumo executivo
-    resumo_executivo_urgenza(df, stats_urgenza["counts"], stats_urgenza["percentuais"])
+    print("Preparando dados...")
+    print("-" * 80)
+    df = preparar_dataframe(df_raw.copy(), estrutura=True)
+    print(f"Dados preparados: {len(df)} registros após limpeza")
+    print(f"Processos: {processos}\n")
+
+    resultados = {"estrutura": relatorio_estruturas(df, analises, processos)}
 
     print("\n" + "=" * 80)
     print("ANÁLISE CONCLUÍDA COM SUCESSO!")
     print("=" * 80)
 
+    return df, resultados
+
+
+def executar_analise_completa(salvar_graficos=False, diretorio_saida="./output"):
+    """
+    Executa todas as análises do projeto
+
+    Args:
+        salvar_graficos: Se True, salva os gráficos gerados
+        diretorio_saida: Diretório para salvar os gráficos
+    """
+    df, _ = executar_selecao(
+        ANALISES_COMPLETA,
+        graficos=True,
+        diretorio_graficos=diretorio_saida if salvar_graficos else None,
+    )
     return df
 
 
@@ -154,32 +489,176 @@ def executar_analise_rapida():
     """
     Executa apenas análises estatísticas sem gráficos (mais rápido)
     """
-    configurar_ambiente()
+    df, _ = executar_selecao(ANALISES_RAPIDA)
+    return df
 
-    # Carregar e preparar dados
-    df_raw = carregar_dados_completos()
-    df = preparar_dataframe(df_raw.copy())
 
-    # Apenas estatísticas
-    stats_urgenza = estatisticas_urgenza(df)
-    analise_urgenza_subgrupo(df)
-    analise_urgenza_idade(df)
-    resumo_executivo_urgenza(df, stats_urgenza["counts"], stats_urgenza["percentuais"])
+def _data(valor):
+    """Converte um argumento de data da linha de comando"""
+    try:
+        return pd.Timestamp(valor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida: {valor}")
 
-    return df
+
+def criar_parser():
+    """Cria o parser de argumentos da linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Análises dos atendimentos do Pronto Soccorso"
+    )
+
+    dados = parser.add_argument_group("dados")
+    dados.add_argument(
+        "--anos", nargs="+", choices=anos_disponiveis(), help="Anos a carregar"
+    )
+    dados.add_argument("--inicio", type=_data, help="Data inicial (AAAA-MM-DD)")
+    dados.add_argument("--fim", type=_data, help="Data final (AAAA-MM-DD)")
+    dados.add_argument(
+        "--workers", type=int, default=1, help="Threads de leitura dos arquivos"
+    )
+    dados.add_argument(
+        "--cache-dir", help="Diretório de cache dos arquivos CSV já processados"
+    )
+    dados.add_argument(
+        "--armazem",
+        nargs="?",
+        const=CAMINHO_ARMAZEM,
+        metavar="DIR",
+        help=f"Usa o armazém de colunas memory-mapped (padrão: {CAMINHO_ARMAZEM})",
+    )
+
+    analises = parser.add_argument_group("análises")
+    analises.add_argument(
+        "--analises",
+        nargs="+",
+        choices=list(ANALISES),
+        metavar="ANALISE",
+        help=f"Análises a executar: {', '.join(ANALISES)}",
+    )
+    analises.add_argument(
+        "--motor",
+        choices=list(MOTORES),
+        help="Motor de cálculo das contagens (padrão: config.MOTOR_CALCULO)",
+    )
+    analises.add_argument(
+        "--por-estrutura",
+        action="store_true",
+        help=(
+            "Executa as análises em cada Struttura e compara as estruturas "
+            f"(análises: {', '.join(ANALISES_ESTRUTURA)})"
+        ),
+    )
+    analises.add_argument(
+        "--processos",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processos da análise por estrutura (padrão: núcleos da máquina)",
+    )
+    modo = analises.add_mutually_exclusive_group()
+    modo.add_argument(
+        "--rapido", action="store_true", help="Apenas estatísticas, sem gráficos"
+    )
+    modo.add_argument(
+        "--salvar",
+        nargs="?",
+        const="./output",
+        metavar="DIR",
+        help="Salva os gráficos em DIR (padrão: ./output)",
+    )
+
+    saida = parser.add_argument_group("saída")
+    saida.add_argument(
+        "--formato",
+        choices=["json", "parquet"],
+        help="Grava as tabelas calculadas neste formato",
+    )
+    saida.add_argument("--saida", help="Diretório das tabelas (padrão: ./resultados)")
+
+    perfil = parser.add_argument_group("desempenho")
+    perfil.add_argument(
+        "--perfil", action="store_true", help="Mede tempo e memória de cada etapa"
+    )
+    perfil.add_argument("--trace", metavar="ARQUIVO", help="Trace JSON Lines")
+
+    return parser
 
 
 if __name__ == "__main__":
-    # Verificar argumentos da linha de comando
-    if len(sys.argv) > 1 and sys.argv[1] == "--rapido":
+    parser = criar_parser()
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers deve ser maior ou igual a 1")
+    if args.inicio is not None and args.fim is not None and args.inicio > args.fim:
+        parser.error("--inicio deve ser anterior a --fim")
+    if args.formato == "parquet" and formato_cache() != "parquet":
+        parser.error("--formato parquet requer o pacote pyarrow")
+    if args.trace and not args.perfil:
+        parser.error("--trace requer --perfil")
+    if args.armazem and (args.anos or args.cache_dir):
+        parser.error("--armazem não pode ser combinado com --anos ou --cache-dir")
+    if args.processos < 1:
+        parser.error("--processos deve ser maior ou igual a 1")
+    if args.por_estrutura and args.armazem:
+        parser.error("--por-estrutura não pode ser combinado com --armazem")
+    if args.por_estrutura and args.analises:
+        fora = [nome for nome in args.analises if nome not in ANALISES_ESTRUTURA]
+        if fora:
+            parser.error(f"análises sem versão por estrutura: {', '.join(fora)}")
+    if args.motor:
+        try:
+            definir_motor(args.motor)
+        except ValueError as e:
+            parser.error(str(e))
+
+    # Instrumentação opcional: --perfil [--trace arquivo.jsonl]
+    if args.perfil:
+        ativar(arquivo_trace=args.trace)
+
+    if args.por_estrutura:
+        analises = args.analises or ANALISES_ESTRUTURA
+    else:
+        analises = args.analises or (
+            ANALISES_RAPIDA if args.rapido else ANALISES_COMPLETA
+        )
+
+    if args.rapido:
         print("Executando análise rápida (sem gráficos)...\n")
-        df = executar_analise_rapida()
-    elif len(sys.argv) > 1 and sys.argv[1] == "--salvar":
-        print("Executando análise completa e salvando gráficos...\n")
-        diretorio = sys.argv[2] if len(sys.argv) > 2 else "./output"
-        df = executar_analise_completa(salvar_graficos=True, diretorio_saida=diretorio)
+    elif args.salvar:
+        print("Executando análise e salvando gráficos...\n")
+    else:
+        print("Executando análise (gráficos apenas na tela)...\n")
+
+    if args.por_estrutura:
+        df, resultados = executar_por_estrutura(
+            analises,
+            processos=args.processos,
+            anos=args.anos,
+            inicio=args.inicio,
+            fim=args.fim,
+            cache_dir=args.cache_dir,
+            workers=args.workers,
+        )
     else:
-        print("Executando análise completa (gráficos apenas na tela)...\n")
-        df = executar_analise_completa(salvar_graficos=False)
+        df, resultados = executar_selecao(
+            analises,
+            graficos=not args.rapido,
+            diretorio_graficos=args.salvar,
+            anos=args.anos,
+            inicio=args.inicio,
+            fim=args.fim,
+            cache_dir=args.cache_dir,
+            workers=args.workers,
+            armazem=args.armazem,
+        )
+
+    if args.formato or args.saida:
+        arquivos = exportar_tabelas(
+            resultados, args.saida or "./resultados", args.formato or "json"
+        )
+        print(f"\n{len(arquivos)} arquivo(s) de resultados gravado(s)")
+
+    if instrumentacao_ativa():
+        imprimir_resumo()
 
     print("\nDataFrame final disponível na variável 'df'")
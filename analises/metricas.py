@@ -0,0 +1,155 @@
+"""
+Métricas da API no formato de exposição de texto do Prometheus
+
+Mantém contadores de requisições, histogramas de latência por rota,
+acertos/falhas dos caches e informações do conjunto de dados carregado.
+Nada aqui acessa os dados: os valores são registrados pela API no
+momento da carga e das requisições.
+"""
+
+import threading
+
+# Limites superiores dos buckets de latência (segundos)
+BUCKETS_LATENCIA = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+_trava = threading.Lock()
+_requisicoes = {}  # (rota, metodo, status) -> contagem
+_latencias = {}  # rota -> {"buckets": [...], "soma": float, "contagem": int}
+_caches = {}  # (cache, resultado) -> contagem
+_dados = {
+    "carregados": 0,
+    "registros": 0,
+    "memoria_bytes": 0,
+    "versao": "",
+    "duracao_carga_s": 0.0,
+    "cargas": 0,
+}
+
+
+def registrar_requisicao(rota, metodo, status, duracao):
+    """Registra uma requisição concluída e sua latência"""
+    with _trava:
+        chave = (rota, metodo, str(status))
+        _requisicoes[chave] = _requisicoes.get(chave, 0) + 1
+
+        latencia = _latencias.setdefault(
+            rota,
+            {"buckets": [0] * len(BUCKETS_LATENCIA), "soma": 0.0, "contagem": 0},
+        )
+        for posicao, limite in enumerate(BUCKETS_LATENCIA):
+            if duracao <= limite:
+                latencia["buckets"][posicao] += 1
+        latencia["soma"] += duracao
+        latencia["contagem"] += 1
+
+
+def registrar_cache(cache, acerto):
+    """Registra um acesso (acerto ou falha) a um cache"""
+    with _trava:
+        chave = (cache, "hit" if acerto else "miss")
+        _caches[chave] = _caches.get(chave, 0) + 1
+
+
+def registrar_carga(registros, memoria_bytes, versao, duracao):
+    """Registra uma carga completa do conjunto de dados"""
+    with _trava:
+        _dados.update(
+            {
+                "carregados": 1,
+                "registros": registros,
+                "memoria_bytes": memoria_bytes,
+                "versao": versao,
+                "duracao_carga_s": duracao,
+                "cargas": _dados["cargas"] + 1,
+            }
+        )
+
+
+def registrar_descarga():
+    """Registra que o conjunto de dados foi removido da memória"""
+    with _trava:
+        _dados["carregados"] = 0
+
+
+def _rotulos(**rotulos):
+    """Formata rótulos no padrão {chave="valor",...}"""
+    pares = []
+    for chave, valor in rotulos.items():
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"')
+        pares.append(f'{chave}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def exposicao(entradas_cache_resultados=0):
+    """
+    Gera o texto de exposição de todas as métricas
+
+    Args:
+        entradas_cache_resultados: Número de entradas no cache de resultados
+
+    Returns:
+        str no formato de texto do Prometheus (versão 0.0.4)
+    """
+    linhas = []
+
+    with _trava:
+        linhas += [
+            "# HELP mari_requisicoes_total Requisições atendidas por rota.",
+            "# TYPE mari_requisicoes_total counter",
+        ]
+        for (rota, metodo, status), contagem in sorted(_requisicoes.items()):
+            rotulos = _rotulos(rota=rota, metodo=metodo, status=status)
+            linhas.append(f"mari_requisicoes_total{rotulos} {contagem}")
+
+        linhas += [
+            "# HELP mari_latencia_segundos Latência das requisições por rota.",
+            "# TYPE mari_latencia_segundos histogram",
+        ]
+        for rota, latencia in sorted(_latencias.items()):
+            for limite, contagem in zip(BUCKETS_LATENCIA, latencia["buckets"]):
+                rotulos = _rotulos(rota=rota, le=limite)
+                linhas.append(f"mari_latencia_segundos_bucket{rotulos} {contagem}")
+            rotulos = _rotulos(rota=rota, le="+Inf")
+            linhas.append(
+                f"mari_latencia_segundos_bucket{rotulos} {latencia['contagem']}"
+            )
+            rotulos = _rotulos(rota=rota)
+            linhas.append(f"mari_latencia_segundos_sum{rotulos} {latencia['soma']}")
+            linhas.append(
+                f"mari_latencia_segundos_count{rotulos} {latencia['contagem']}"
+            )
+
+        linhas += [
+            "# HELP mari_cache_acessos_total Acessos aos caches por resultado.",
+            "# TYPE mari_cache_acessos_total counter",
+        ]
+        for (cache, resultado), contagem in sorted(_caches.items()):
+            rotulos = _rotulos(cache=cache, resultado=resultado)
+            linhas.append(f"mari_cache_acessos_total{rotulos} {contagem}")
+
+        linhas += [
+            "# HELP mari_cache_resultados_entradas Entradas no cache de resultados.",
+            "# TYPE mari_cache_resultados_entradas gauge",
+            f"mari_cache_resultados_entradas {entradas_cache_resultados}",
+            "# HELP mari_dados_carregados 1 se o conjunto de dados está em memória.",
+            "# TYPE mari_dados_carregados gauge",
+            f"mari_dados_carregados {_dados['carregados']}",
+            "# HELP mari_dados_registros Registros do conjunto de dados em memória.",
+            "# TYPE mari_dados_registros gauge",
+            f"mari_dados_registros {_dados['registros']}",
+            "# HELP mari_dados_memoria_bytes Memória ocupada pelo DataFrame em cache.",
+            "# TYPE mari_dados_memoria_bytes gauge",
+            f"mari_dados_memoria_bytes {_dados['memoria_bytes']}",
+            "# HELP mari_dados_info Versão do conjunto de dados carregado.",
+            "# TYPE mari_dados_info gauge",
+            f"mari_dados_info{_rotulos(versao=_dados['versao'])} "
+            f"{_dados['carregados']}",
+            "# HELP mari_carga_duracao_segundos Duração da última carga dos dados.",
+            "# TYPE mari_carga_duracao_segundos gauge",
+            f"mari_carga_duracao_segundos {_dados['duracao_carga_s']}",
+            "# HELP mari_cargas_total Cargas completas do conjunto de dados.",
+            "# TYPE mari_cargas_total counter",
+            f"mari_cargas_total {_dados['cargas']}",
+        ]
+
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,412 @@
+"""
+Motores de cálculo das análises
+
+As análises de analise_urgenza e analise_geral reduzem os dados a
+contagens por grupo (frequências, tabelas cruzadas, pacientes distintos,
+histogramas de idade). Essas contagens são delegadas a um motor:
+
+    - pandas (padrão): em memória, sobre o DataFrame ou o armazém de colunas
+    - duckdb (opcional): SQL embarcado, vetorizado e multithread
+    - polars (opcional): lazy frames multithread
+
+O motor só devolve as contagens brutas; ordenação, percentuais, tabelas
+cruzadas e estatísticas descritivas são montados aqui, em um único
+lugar, para que o resultado seja idêntico em qualquer motor.
+
+Seleção: config.MOTOR_CALCULO, variável de ambiente MARI_MOTOR ou
+definir_motor("duckdb").
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+from armazem_colunas import garantir_dataframe
+from config import MOTOR_CALCULO
+from indice_pacientes import (
+    atendimentos_por_paciente,
+    contar_pacientes,
+    pacientes_por_grupo,
+)
+
+_estado = {"motor": None}
+
+
+def _sem_ausentes(df, colunas):
+    """Linhas sem valores ausentes nas colunas"""
+    return df.dropna(subset=colunas) if df[colunas].isna().any().any() else df
+
+
+class MotorPandas:
+    """Contagens com pandas/NumPy (agrupamentos de pacientes sobre IDs inteiros)"""
+
+    nome = "pandas"
+
+    def contar(self, dados, colunas):
+        """
+        Conta as linhas de cada combinação de valores das colunas
+
+        Returns:
+            DataFrame com as colunas e 'n' (linhas com ausentes são ignoradas)
+        """
+        if colunas == ["Paziente"]:
+            df = garantir_dataframe(dados, ["Paziente", "ID Paziente"])
+            contagens = atendimentos_por_paciente(df)
+            return contagens.rename("n").reset_index()
+
+        df = _sem_ausentes(garantir_dataframe(dados, colunas), colunas)
+        return (
+            df.groupby(colunas, observed=True, sort=False)
+            .size()
+            .rename("n")
+            .reset_index()
+        )
+
+    def contar_distintos(self, dados, grupo, coluna):
+        """
+        Conta os valores distintos de coluna em cada grupo
+
+        Returns:
+            DataFrame com grupo e 'n' (grupo None: uma linha com o total)
+        """
+        if coluna == "Paziente":
+            df = garantir_dataframe(
+                dados, [c for c in ("Paziente", "ID Paziente", grupo) if c]
+            )
+            if grupo is None:
+                return pd.DataFrame({"n": [contar_pacientes(df)]})
+            return pacientes_por_grupo(df, grupo).rename("n").reset_index()
+
+        colunas = [coluna] if grupo is None else [grupo, coluna]
+        df = _sem_ausentes(garantir_dataframe(dados, colunas), colunas)
+        if grupo is None:
+            return pd.DataFrame({"n": [df[coluna].nunique()]})
+        return (
+            df.groupby(grupo, observed=True)[coluna].nunique().rename("n").reset_index()
+        )
+
+
+def _identificador(coluna):
+    """Nome de coluna entre aspas para SQL"""
+    return '"' + coluna.replace('"', '""') + '"'
+
+
+def _para_consulta(dados, colunas):
+    """
+    Colunas necessárias como DataFrame com texto em dtype object
+
+    Motores externos leem arrays NumPy; o dtype 'str' do pandas é
+    convertido para object.
+    """
+    df = garantir_dataframe(dados, colunas)[colunas]
+    texto = {
+        coluna: object
+        for coluna in colunas
+        if pd.api.types.is_string_dtype(df[coluna])
+        or isinstance(df[coluna].dtype, pd.CategoricalDtype)
+    }
+    return df.astype(texto) if texto else df
+
+
+def _filtro_sql(df, colunas):
+    """Condição SQL que descarta linhas com ausentes (NULL ou NaN) nas colunas"""
+    condicoes = []
+    for coluna in colunas:
+        nome = _identificador(coluna)
+        condicoes.append(f"{nome} IS NOT NULL")
+        if pd.api.types.is_float_dtype(df[coluna]):
+            condicoes.append(f"NOT isnan({nome})")
+    return " AND ".join(condicoes)
+
+
+class MotorDuckDB:
+    """Contagens com DuckDB embarcado (consulta SQL sobre as colunas projetadas)"""
+
+    nome = "duckdb"
+
+    def __init__(self):
+        import duckdb
+
+        self._duckdb = duckdb
+
+    def _executar(self, df, sql):
+        conexao = self._duckdb.connect()
+        try:
+            conexao.register("dados", df)
+            linhas = conexao.execute(sql).fetchall()
+            nomes = [descricao[0] for descricao in conexao.description]
+        finally:
+            conexao.close()
+        return pd.DataFrame.from_records(linhas, columns=nomes)
+
+    def contar(self, dados, colunas):
+        df = _para_consulta(dados, colunas)
+        chaves = ", ".join(_identificador(coluna) for coluna in colunas)
+        return self._executar(
+            df,
+            f"SELECT {chaves}, COUNT(*) AS n FROM dados "
+            f"WHERE {_filtro_sql(df, colunas)} GROUP BY {chaves}",
+        )
+
+    def contar_distintos(self, dados, grupo, coluna):
+        colunas = [coluna] if grupo is None else [grupo, coluna]
+        df = _para_consulta(dados, colunas)
+        filtro = _filtro_sql(df, colunas)
+        distintos = f"COUNT(DISTINCT {_identificador(coluna)}) AS n"
+
+        if grupo is None:
+            return self._executar(df, f"SELECT {distintos} FROM dados WHERE {filtro}")
+        chave = _identificador(grupo)
+        return self._executar(
+            df,
+            f"SELECT {chave}, {distintos} FROM dados WHERE {filtro} GROUP BY {chave}",
+        )
+
+
+class MotorPolars:
+    """Contagens com Polars (lazy frame sobre as colunas projetadas)"""
+
+    nome = "polars"
+
+    def __init__(self):
+        import polars
+
+        self._pl = polars
+
+    @staticmethod
+    def _valores(serie):
+        """Array da coluna com ausentes como None em texto (nan_to_null só
+        vale para arrays de ponto flutuante)"""
+        valores = serie.to_numpy()
+        if valores.dtype == object:
+            valores = np.where(pd.isna(valores), None, valores)
+        return valores
+
+    def _quadro(self, dados, colunas):
+        df = _para_consulta(dados, colunas)
+        quadro = self._pl.DataFrame(
+            {coluna: self._valores(df[coluna]) for coluna in colunas},
+            nan_to_null=True,
+        )
+        return quadro.lazy().drop_nulls(colunas)
+
+    @staticmethod
+    def _para_pandas(resultado):
+        return pd.DataFrame(resultado.to_dict(as_series=False))
+
+    def contar(self, dados, colunas):
+        pl = self._pl
+        consulta = (
+            self._quadro(dados, colunas).group_by(colunas).agg(pl.len().alias("n"))
+        )
+        return self._para_pandas(consulta.collect())
+
+    def contar_distintos(self, dados, grupo, coluna):
+        pl = self._pl
+        colunas = [coluna] if grupo is None else [grupo, coluna]
+        quadro = self._quadro(dados, colunas)
+        distintos = pl.col(coluna).n_unique().alias("n")
+
+        if grupo is None:
+            return self._para_pandas(quadro.select(distintos).collect())
+        return self._para_pandas(quadro.group_by(grupo).agg(distintos).collect())
+
+
+# Motores conhecidos: nome -> (classe, pacote necessário)
+MOTORES = {
+    "pandas": (MotorPandas, None),
+    "duckdb": (MotorDuckDB, "duckdb"),
+    "polars": (MotorPolars, "polars"),
+}
+
+
+def motores_disponiveis():
+    """Motores cujos pacotes estão instalados"""
+    return [
+        nome
+        for nome, (_, pacote) in MOTORES.items()
+        if pacote is None or importlib.util.find_spec(pacote) is not None
+    ]
+
+
+def definir_motor(nome):
+    """
+    Seleciona o motor de cálculo das análises
+
+    Raises:
+        ValueError: motor desconhecido ou pacote não instalado
+    """
+    if nome not in MOTORES:
+        raise ValueError(f"Motor desconhecido: {nome} (opções: {', '.join(MOTORES)})")
+    if nome not in motores_disponiveis():
+        raise ValueError(f"O motor {nome} requer o pacote {MOTORES[nome][1]}")
+
+    _estado["motor"] = MOTORES[nome][0]()
+    return _estado["motor"]
+
+
+def obter_motor():
+    """Motor em uso (na primeira chamada: MARI_MOTOR ou config.MOTOR_CALCULO)"""
+    if _estado["motor"] is None:
+        definir_motor(os.environ.get("MARI_MOTOR", MOTOR_CALCULO))
+    return _estado["motor"]
+
+
+def _indice(valores, nome, dtype=None):
+    """
+    Índice dos valores de um grupo (igual para qualquer motor)
+
+    Colunas categóricas mantêm as categorias e a ordem; nas demais o dtype
+    é inferido dos valores.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pd.CategoricalIndex(list(valores), dtype=dtype, name=nome)
+    return pd.Index(list(valores), name=nome)
+
+
+def _dtype(dados, coluna):
+    """dtype original de uma coluna do DataFrame ou do armazém"""
+    return garantir_dataframe(dados, [coluna])[coluna].dtype
+
+
+def _completar(indice):
+    """Categorias de um índice categórico (inclusive as sem ocorrências)"""
+    if isinstance(indice, pd.CategoricalIndex):
+        return pd.CategoricalIndex(
+            indice.categories, dtype=indice.dtype, name=indice.name
+        )
+    return None
+
+
+def contagem(dados, coluna):
+    """
+    Frequência de cada valor (como value_counts)
+
+    Ordenada por frequência decrescente; empates em ordem dos valores.
+    Colunas categóricas incluem as categorias sem ocorrências.
+
+    Returns:
+        Series 'count' indexada pelos valores de coluna
+    """
+    contagens = obter_motor().contar(dados, [coluna])
+    serie = pd.Series(
+        contagens["n"].to_numpy(dtype=np.int64),
+        index=_indice(contagens[coluna], coluna, _dtype(dados, coluna)),
+        name="count",
+    )
+    categorias = _completar(serie.index)
+    if categorias is not None:
+        serie = serie.reindex(categorias, fill_value=0)
+    return serie.sort_index().sort_values(ascending=False, kind="stable")
+
+
+def percentuais(contagens):
+    """Percentual de cada valor a partir das contagens"""
+    return (contagens / contagens.sum() * 100).rename("proportion")
+
+
+def tabela_cruzada(dados, linhas, colunas, normalizar=None, margens=False):
+    """
+    Tabela de contingência (como pd.crosstab)
+
+    Args:
+        dados: DataFrame ou ArmazemColunas
+        linhas: Coluna das linhas
+        colunas: Coluna das colunas
+        normalizar: None ou 'index' (percentual de cada linha, 0-1)
+        margens: Se True, acrescenta a linha e a coluna 'Total'
+
+    Returns:
+        DataFrame com as contagens (ou proporções)
+    """
+    contagens = obter_motor().contar(dados, [linhas, colunas])
+    indice = pd.MultiIndex.from_arrays(
+        [
+            _indice(contagens[linhas], linhas, _dtype(dados, linhas)),
+            _indice(contagens[colunas], colunas, _dtype(dados, colunas)),
+        ]
+    )
+    tabela = pd.Series(contagens["n"].to_numpy(dtype=np.int64), index=indice).unstack(
+        colunas, fill_value=0
+    )
+
+    # Categorias sem ocorrências entram com zero, como no pd.crosstab
+    for eixo in (0, 1):
+        categorias = _completar(tabela.axes[eixo])
+        if categorias is not None:
+            tabela = tabela.reindex(categorias, axis=eixo, fill_value=0)
+    tabela = tabela.sort_index().sort_index(axis=1)
+
+    if normalizar == "index":
+        return tabela.div(tabela.sum(axis=1), axis=0)
+
+    if margens:
+        tabela["Total"] = tabela.sum(axis=1)
+        tabela.loc["Total"] = tabela.sum(axis=0)
+
+    return tabela
+
+
+def pacientes_distintos(dados, grupo=None):
+    """
+    Pacientes distintos no total ou por grupo
+
+    Returns:
+        int (grupo None) ou Series {valor do grupo: pacientes}
+    """
+    distintos = obter_motor().contar_distintos(dados, grupo, "Paziente")
+    if grupo is None:
+        return int(distintos["n"].iloc[0])
+
+    return pd.Series(
+        distintos["n"].to_numpy(dtype=np.int64),
+        index=_indice(distintos[grupo], grupo),
+    ).sort_index()
+
+
+def descrever(dados, coluna):
+    """
+    Estatísticas descritivas (como Series.describe) a partir do histograma
+
+    Os quantis usam interpolação linear, como no pandas; média e desvio
+    são calculados sobre os valores distintos ponderados pela frequência.
+
+    Returns:
+        Series com count, mean, std, min, 25%, 50%, 75% e max
+    """
+    contagens = obter_motor().contar(dados, [coluna])
+    ordem = np.argsort(contagens[coluna].to_numpy(dtype=np.float64), kind="stable")
+    valores = contagens[coluna].to_numpy(dtype=np.float64)[ordem]
+    pesos = contagens["n"].to_numpy(dtype=np.int64)[ordem]
+
+    total = int(pesos.sum())
+    media = float(np.dot(valores, pesos) / total) if total else np.nan
+    desvio = (
+        float(np.sqrt(np.dot((valores - media) ** 2, pesos) / (total - 1)))
+        if total > 1
+        else np.nan
+    )
+
+    # Quantil linear: posição q * (n - 1) na sequência ordenada
+    acumulado = np.cumsum(pesos)
+
+    def quantil(q):
+        posicao = q * (total - 1)
+        abaixo = valores[np.searchsorted(acumulado, np.floor(posicao), side="right")]
+        acima = valores[np.searchsorted(acumulado, np.ceil(posicao), side="right")]
+        return float(abaixo + (acima - abaixo) * (posicao - np.floor(posicao)))
+
+    estatisticas = {"count": float(total), "mean": media, "std": desvio}
+    if total:
+        estatisticas.update(
+            {
+                "min": float(valores[0]),
+                "25%": quantil(0.25),
+                "50%": quantil(0.5),
+                "75%": quantil(0.75),
+                "max": float(valores[-1]),
+            }
+        )
+
+    return pd.Series(estatisticas, name=coluna)
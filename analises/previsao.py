@@ -0,0 +1,395 @@
+"""
+Previsão de chegadas diárias por Categoria Urgenza
+
+Para cada categoria é ajustada, por mínimos quadrados sobre a série
+diária (serie_diaria_urgenza), uma regressão com:
+
+    - intercepto e tendência linear (em anos)
+    - sazonalidade anual: HARMONICOS_ANUAIS pares seno/cosseno
+    - sazonalidade semanal: um indicador por dia da semana
+
+Os dias recentes pesam mais (meia-vida MEIA_VIDA_TREINO): os critérios de
+triagem mudaram em meados de 2023 e um ajuste com pesos iguais mistura os
+dois regimes.
+
+Os intervalos de previsão usam o desvio padrão dos resíduos do ajuste
+(aproximação normal). Os ajustes das categorias são independentes e podem
+rodar em processos paralelos. Os parâmetros ajustados são gravados em
+disco por versão dos dados: previsões para outros horizontes saem dos
+parâmetros, sem reajustar.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from armazem_colunas import ArmazemColunas, garantir_dataframe
+from config import (
+    BACKTEST_ORIGENS,
+    CAMINHO_PREVISAO,
+    HARMONICOS_ANUAIS,
+    HORIZONTE_PREVISAO,
+    MEIA_VIDA_TREINO,
+)
+from instrumentacao import instrumentar
+from series_temporais import serie_diaria_urgenza, serie_urgenza
+from utils import versao_dados
+
+# Versão do formato dos parâmetros gravados (outras versões são reajustadas)
+FORMATO = 1
+
+DIAS_ANO = 365.25
+
+
+def _dias(datas):
+    """Dias desde 01/01/1970 (array int64)"""
+    return pd.DatetimeIndex(datas).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def matriz_modelo(dias, origem, harmonicos=HARMONICOS_ANUAIS):
+    """
+    Matriz de regressores do modelo
+
+    Args:
+        dias: Array de dias desde 01/01/1970
+        origem: Dia (desde 01/01/1970) de início do treino (tendência zero)
+        harmonicos: Pares seno/cosseno da sazonalidade anual
+
+    Returns:
+        Array (dias x regressores): intercepto, tendência, harmônicos
+        anuais e indicadores de terça a domingo (segunda é a referência)
+    """
+    dias = np.asarray(dias, dtype=np.int64)
+    colunas = [np.ones(len(dias)), (dias - origem) / DIAS_ANO]
+
+    fase = 2 * np.pi * dias / DIAS_ANO
+    for k in range(1, harmonicos + 1):
+        colunas.extend([np.sin(k * fase), np.cos(k * fase)])
+
+    dia_semana = (dias + 3) % 7  # 01/01/1970 foi uma quinta-feira
+    colunas.extend(dia_semana == d for d in range(1, 7))
+
+    return np.column_stack(colunas).astype(np.float64)
+
+
+def ajustar_categoria(
+    dias, valores, harmonicos=HARMONICOS_ANUAIS, meia_vida=MEIA_VIDA_TREINO
+):
+    """
+    Ajusta o modelo de uma categoria por mínimos quadrados ponderados
+
+    O peso de cada dia cai à metade a cada `meia_vida` dias antes do fim
+    do treino, para que mudanças de nível (ex.: mudança dos critérios de
+    triagem) não sejam diluídas por todo o histórico. A sazonalidade
+    anual só entra com pelo menos dois anos de treino (com menos, os
+    harmônicos se confundem com a tendência).
+
+    Args:
+        dias: Array de dias desde 01/01/1970
+        valores: Contagens diárias
+        harmonicos: Pares seno/cosseno da sazonalidade anual
+        meia_vida: Meia-vida dos pesos em dias (None: pesos iguais)
+
+    Returns:
+        dict com coeficientes, sigma (desvio ponderado dos resíduos),
+        origem, n e harmonicos usados
+    """
+    origem = int(dias[0])
+    if dias[-1] - origem + 1 < 2 * DIAS_ANO:
+        harmonicos = 0
+    matriz = matriz_modelo(dias, origem, harmonicos)
+    pesos = np.ones(len(dias))
+    if meia_vida:
+        pesos = 0.5 ** ((dias[-1] - dias) / meia_vida)
+
+    raiz = np.sqrt(pesos)
+    ajuste = np.linalg.lstsq(matriz * raiz[:, None], valores * raiz, rcond=None)
+    coeficientes = ajuste[0]
+    residuos = valores - matriz @ coeficientes
+
+    return {
+        "coeficientes": coeficientes.tolist(),
+        "sigma": float(np.sqrt((pesos * residuos**2).sum() / pesos.sum())),
+        "origem": origem,
+        "n": int(len(valores)),
+        "harmonicos": harmonicos,
+    }
+
+
+@instrumentar
+def ajustar_modelos(
+    serie_diaria,
+    harmonicos=HARMONICOS_ANUAIS,
+    meia_vida=MEIA_VIDA_TREINO,
+    processos=1,
+):
+    """
+    Ajusta um modelo por categoria
+
+    Args:
+        serie_diaria: Resultado de serie_diaria_urgenza()
+        harmonicos: Pares seno/cosseno da sazonalidade anual
+        meia_vida: Meia-vida dos pesos do treino em dias
+        processos: Processos para ajustar as categorias em paralelo
+
+    Returns:
+        dict com harmonicos, meia_vida, inicio e fim do treino,
+        tempo_ajuste e modelos {categoria: parâmetros de ajustar_categoria()}
+    """
+    inicio = time.perf_counter()
+    dias = _dias(serie_diaria.index)
+    categorias = list(serie_diaria.columns)
+    valores = [serie_diaria[categoria].to_numpy(np.float64) for categoria in categorias]
+    argumentos = (
+        [dias] * len(categorias),
+        valores,
+        [harmonicos] * len(categorias),
+        [meia_vida] * len(categorias),
+    )
+
+    if processos > 1 and len(categorias) > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            ajustes = list(executor.map(ajustar_categoria, *argumentos))
+    else:
+        ajustes = list(map(ajustar_categoria, *argumentos))
+
+    return {
+        "formato": FORMATO,
+        "harmonicos": harmonicos,
+        "meia_vida": meia_vida,
+        "inicio": serie_diaria.index[0].strftime("%Y-%m-%d"),
+        "fim": serie_diaria.index[-1].strftime("%Y-%m-%d"),
+        "tempo_ajuste": time.perf_counter() - inicio,
+        "modelos": dict(zip(categorias, ajustes)),
+    }
+
+
+def obter_modelos(
+    serie_diaria,
+    versao=None,
+    harmonicos=HARMONICOS_ANUAIS,
+    meia_vida=MEIA_VIDA_TREINO,
+    processos=1,
+    caminho=CAMINHO_PREVISAO,
+):
+    """
+    Modelos ajustados, lidos do cache em disco quando possível
+
+    Args:
+        serie_diaria: Resultado de serie_diaria_urgenza()
+        versao: Versão dos dados (None: sem cache; ver versao_dados)
+        harmonicos: Pares seno/cosseno da sazonalidade anual
+        meia_vida: Meia-vida dos pesos do treino em dias
+        processos: Processos para ajustar as categorias em paralelo
+        caminho: Diretório do cache dos parâmetros
+
+    Returns:
+        dict retornado por ajustar_modelos()
+    """
+    arquivo = os.path.join(caminho, f"{versao}.json") if versao else None
+
+    if arquivo and os.path.exists(arquivo):
+        try:
+            with open(arquivo, encoding="utf-8") as entrada:
+                modelos = json.load(entrada)
+            if (
+                modelos.get("formato") == FORMATO
+                and modelos.get("harmonicos") == harmonicos
+                and modelos.get("meia_vida") == meia_vida
+            ):
+                return modelos
+        except (OSError, ValueError):
+            pass
+
+    modelos = ajustar_modelos(serie_diaria, harmonicos, meia_vida, processos)
+
+    if arquivo:
+        os.makedirs(caminho, exist_ok=True)
+        temporario = f"{arquivo}.tmp-{os.getpid()}"
+        with open(temporario, "w", encoding="utf-8") as saida:
+            json.dump(modelos, saida, indent=2, ensure_ascii=False)
+        os.replace(temporario, arquivo)
+
+    return modelos
+
+
+def prever(modelos, dias=HORIZONTE_PREVISAO, inicio=None, nivel=95):
+    """
+    Previsão diária de cada categoria
+
+    Args:
+        modelos: Resultado de ajustar_modelos() ou obter_modelos()
+        dias: Número de dias previstos
+        inicio: Primeiro dia previsto (None: dia seguinte ao fim do treino)
+        nivel: Nível (%) do intervalo de previsão
+
+    Returns:
+        dict {'previsto', 'inferior', 'superior'}: DataFrames com
+        DatetimeIndex diário e uma coluna por categoria (valores >= 0)
+    """
+    if inicio is None:
+        inicio = pd.Timestamp(modelos["fim"]) + pd.Timedelta(days=1)
+    datas = pd.date_range(pd.Timestamp(inicio), periods=dias, freq="D", name="Data")
+    dias_previstos = _dias(datas)
+    z = NormalDist().inv_cdf(0.5 + nivel / 200)
+
+    previsto, inferior, superior = {}, {}, {}
+    for categoria, parametros in modelos["modelos"].items():
+        matriz = matriz_modelo(
+            dias_previstos, parametros["origem"], parametros["harmonicos"]
+        )
+        valores = matriz @ np.asarray(parametros["coeficientes"])
+        previsto[categoria] = np.clip(valores, 0, None)
+        inferior[categoria] = np.clip(valores - z * parametros["sigma"], 0, None)
+        superior[categoria] = np.clip(valores + z * parametros["sigma"], 0, None)
+
+    def tabela(valores):
+        resultado = pd.DataFrame(valores, index=datas)
+        resultado.columns.name = "Categoria Urgenza"
+        return resultado
+
+    return {
+        "previsto": tabela(previsto),
+        "inferior": tabela(inferior),
+        "superior": tabela(superior),
+    }
+
+
+@instrumentar
+def backtest(
+    serie_diaria,
+    horizonte=HORIZONTE_PREVISAO,
+    origens=BACKTEST_ORIGENS,
+    harmonicos=HARMONICOS_ANUAIS,
+    meia_vida=MEIA_VIDA_TREINO,
+):
+    """
+    Avalia o modelo em janelas finais da série (origem móvel)
+
+    Para cada origem, ajusta com os dias anteriores e prevê os próximos
+    `horizonte` dias. A referência é a previsão ingênua sazonal (mesmo dia
+    da semana anterior à origem).
+
+    Args:
+        serie_diaria: Resultado de serie_diaria_urgenza()
+        horizonte: Dias previstos a partir de cada origem
+        origens: Número de origens (janelas consecutivas no fim da série)
+        harmonicos: Pares seno/cosseno da sazonalidade anual
+        meia_vida: Meia-vida dos pesos do treino em dias
+
+    Returns:
+        DataFrame por categoria com MAE e WAPE (%) do modelo e da
+        referência; atributo 'tempo_ajuste' com o tempo médio de ajuste
+    """
+    observados = []
+    erros_modelo = []
+    erros_ingenuo = []
+    tempos = []
+
+    for indice in range(origens, 0, -1):
+        corte = len(serie_diaria) - indice * horizonte
+        if corte < 14:
+            continue
+        treino = serie_diaria.iloc[:corte]
+        teste = serie_diaria.iloc[corte : corte + horizonte]
+
+        modelos = ajustar_modelos(treino, harmonicos, meia_vida)
+        tempos.append(modelos["tempo_ajuste"])
+        previsto = prever(modelos, len(teste))["previsto"]
+
+        # Referência: repete a última semana do treino
+        semana = treino.iloc[-7:].to_numpy()
+        ingenuo = np.resize(semana, (len(teste), semana.shape[1]))
+
+        observados.append(teste.to_numpy())
+        erros_modelo.append(teste.to_numpy() - previsto.to_numpy())
+        erros_ingenuo.append(teste.to_numpy() - ingenuo)
+
+    if not tempos:
+        raise ValueError("Série curta demais para o backtest")
+
+    erros_modelo = np.abs(np.vstack(erros_modelo))
+    erros_ingenuo = np.abs(np.vstack(erros_ingenuo))
+    observado = np.vstack(observados).sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resultado = pd.DataFrame(
+            {
+                "MAE": erros_modelo.mean(axis=0),
+                "WAPE (%)": erros_modelo.sum(axis=0) / observado * 100,
+                "MAE ingênuo": erros_ingenuo.mean(axis=0),
+                "WAPE ingênuo (%)": erros_ingenuo.sum(axis=0) / observado * 100,
+            },
+            index=pd.Index(serie_diaria.columns, name="Categoria Urgenza"),
+        )
+    resultado.attrs["tempo_ajuste"] = float(np.mean(tempos))
+    resultado.attrs["origens"] = len(tempos)
+    return resultado
+
+
+@instrumentar
+def relatorio_previsao(df, horizonte=HORIZONTE_PREVISAO, processos=1):
+    """
+    Backtest e previsão das próximas semanas por Categoria Urgenza
+
+    Os parâmetros ficam em cache por versão dos dados (do armazém ou
+    calculada por versao_dados quando o DataFrame tem as colunas dela).
+
+    Args:
+        df: DataFrame ou ArmazemColunas com 'Data Accesso' e 'Categoria Urgenza'
+        horizonte: Dias previstos
+        processos: Processos para ajustar as categorias em paralelo
+
+    Returns:
+        dict com backtest (ausente se a série for curta demais para ele),
+        previsto, inferior e superior
+    """
+    versao = None
+    if isinstance(df, ArmazemColunas):
+        versao = df.versao
+    elif {"Numero Scheda PS", "Data Accesso"}.issubset(df.columns):
+        versao = versao_dados(df)
+    df = garantir_dataframe(df, ["Data Accesso", "Categoria Urgenza"])
+
+    serie_diaria = serie_diaria_urgenza(df)
+    try:
+        avaliacao = backtest(serie_diaria, horizonte)
+    except ValueError:
+        avaliacao = None
+    modelos = obter_modelos(serie_diaria, versao, processos=processos)
+    previsao = prever(modelos, horizonte)
+
+    print("\n" + "=" * 80)
+    print("PREVISÃO DE CHEGADAS POR CATEGORIA URGENZA")
+    print("=" * 80)
+    if avaliacao is None:
+        print(
+            f"\n1. BACKTEST: não realizado ({len(serie_diaria)} dias de dados, "
+            f"insuficientes para janelas de {horizonte} dias)"
+        )
+    else:
+        print(
+            f"\n1. BACKTEST ({avaliacao.attrs['origens']} janelas de {horizonte} "
+            f"dias, ajuste médio de {avaliacao.attrs['tempo_ajuste'] * 1000:.1f} ms)"
+        )
+        print("-" * 80)
+        print(avaliacao.round(2))
+
+    semanal = serie_urgenza(previsao["previsto"], "semana")
+    print(f"\n2. PREVISÃO SEMANAL A PARTIR DE {previsao['previsto'].index[0]:%d/%m/%Y}")
+    print("-" * 80)
+    print(semanal.round(0).astype(int))
+
+    if avaliacao is None:
+        return previsao
+    return {"backtest": avaliacao, **previsao}
+
+
+if __name__ == "__main__":
+    from armazem_colunas import obter_armazem
+
+    relatorio_previsao(obter_armazem(), processos=os.cpu_count() or 1)
@@ -0,0 +1,482 @@
+"""
+Perfil de qualidade dos arquivos de dados brutos
+
+Para cada CSV semanal a máscara de ausentes é calculada uma única vez e
+compactada em uma matriz de bits: cada linha vira um inteiro cujo bit i
+indica ausência na coluna i. O perfil guarda o histograma desses padrões
+(poucos padrões distintos por arquivo), do qual saem, sem voltar aos
+dados:
+
+    - ausentes por coluna
+    - linhas descartadas pelo dropna() de preparar_dataframe() (padrões
+      com alguma coluna mantida ausente) e a causa de cada descarte
+    - ausentes por arquivo e por semana de 'Data Accesso'
+
+Também são contadas violações de regras de consistência:
+
+    - fim_antes_inicio: 'Data Fine Contatto' anterior a 'Data Accesso'
+    - idade_inconsistente: 'Età' diferente da idade calculada a partir de
+      'Data Nascita' em mais de TOLERANCIA_IDADE anos
+    - urgenza_desconhecida: código de 'Urgenza' fora de MAPEAMENTO_URGENZA
+
+Os perfis ficam em disco por arquivo, com o checksum do catálogo: só
+arquivos novos ou alterados são lidos novamente.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from catalogo import atualizar_catalogo
+from config import (
+    CAMINHO_BASE,
+    CAMINHO_QUALIDADE,
+    COLUNAS_REMOVER,
+    MAPEAMENTO_URGENZA,
+    TOLERANCIA_IDADE,
+)
+from utils import idade_em_anos, ler_arquivo_bruto
+
+# Rótulo das linhas sem 'Data Accesso' no perfil semanal
+SEM_DATA = "sem data"
+
+REGRAS = {
+    "fim_antes_inicio": "'Data Fine Contatto' anterior a 'Data Accesso'",
+    "idade_inconsistente": "'Età' incompatível com 'Data Nascita'",
+    "urgenza_desconhecida": "Código de 'Urgenza' desconhecido",
+}
+
+
+def mascara_ausentes(df):
+    """
+    Máscara de ausentes compactada em bits
+
+    Args:
+        df: DataFrame (no máximo 64 colunas)
+
+    Returns:
+        Array uint64 com um inteiro por linha (bit i: coluna i ausente)
+    """
+    if len(df.columns) > 64:
+        raise ValueError("A máscara de bits suporta no máximo 64 colunas")
+
+    ausentes = df.isna().to_numpy()
+    pesos = np.left_shift(np.uint64(1), np.arange(len(df.columns), dtype=np.uint64))
+    # Potências de 2 distintas: a soma de cada linha é o OU dos bits
+    return (ausentes * pesos).sum(axis=1, dtype=np.uint64)
+
+
+def contar_ausentes(df):
+    """
+    Ausentes por coluna a partir de uma única passagem de isna()
+
+    Returns:
+        Series {coluna: valores ausentes}
+    """
+    return pd.Series(df.isna().to_numpy().sum(axis=0), index=df.columns)
+
+
+def violacoes_regras(df):
+    """
+    Linhas que violam cada regra de consistência
+
+    Regras cujas colunas não estão em df são ignoradas.
+
+    Returns:
+        dict {regra: array booleano por linha}
+    """
+    violacoes = {}
+
+    if {"Data Accesso", "Data Fine Contatto"} <= set(df.columns):
+        violacoes["fim_antes_inicio"] = (
+            df["Data Fine Contatto"] < df["Data Accesso"]
+        ).to_numpy()
+
+    if {"Età", "Data Nascita", "Data Accesso"} <= set(df.columns):
+        idade = idade_em_anos(df["Data Nascita"], df["Data Accesso"])
+        diferenca = (pd.to_numeric(df["Età"], errors="coerce") - idade).abs()
+        violacoes["idade_inconsistente"] = (diferenca > TOLERANCIA_IDADE).to_numpy()
+
+    if "Urgenza" in df.columns:
+        violacoes["urgenza_desconhecida"] = (
+            df["Urgenza"].notna() & ~df["Urgenza"].isin(list(MAPEAMENTO_URGENZA))
+        ).to_numpy()
+
+    return violacoes
+
+
+def _histograma(chaves):
+    """dict {str(padrão): linhas} dos padrões de bits"""
+    padroes, contagens = np.unique(chaves, return_counts=True)
+    return {str(padrao): int(contagem) for padrao, contagem in zip(padroes, contagens)}
+
+
+def perfil_arquivo(df):
+    """
+    Perfil de qualidade de um arquivo bruto
+
+    Args:
+        df: Conteúdo completo do arquivo (ver ler_arquivo_bruto)
+
+    Returns:
+        dict com linhas, colunas, padrões de ausentes (total e por semana)
+        e violações de cada regra
+    """
+    bits = mascara_ausentes(df)
+
+    if "Data Accesso" in df.columns:
+        semanas = (
+            df["Data Accesso"]
+            .dt.to_period("W")
+            .dt.start_time.dt.strftime("%Y-%m-%d")
+            .fillna(SEM_DATA)
+            .to_numpy()
+        )
+    else:
+        semanas = np.full(len(df), SEM_DATA, dtype=object)
+
+    por_semana = {}
+    for semana in np.unique(semanas):
+        linhas = semanas == semana
+        por_semana[str(semana)] = {
+            "linhas": int(linhas.sum()),
+            "padroes": _histograma(bits[linhas]),
+        }
+
+    return {
+        "linhas": len(df),
+        "colunas": list(df.columns),
+        "padroes": _histograma(bits),
+        "semanas": por_semana,
+        "regras": {
+            regra: int(violacao.sum())
+            for regra, violacao in violacoes_regras(df).items()
+        },
+    }
+
+
+def carregar_qualidade(caminho=CAMINHO_QUALIDADE):
+    """Perfis gravados em disco ({} se não existir ou estiver corrompido)"""
+    if not os.path.exists(caminho):
+        return {}
+
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def salvar_qualidade(qualidade, caminho=CAMINHO_QUALIDADE):
+    """Grava os perfis de forma atômica"""
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(qualidade, arquivo, ensure_ascii=False, sort_keys=True)
+    os.replace(temporario, caminho)
+
+
+def _perfilar(caminho_arquivo):
+    """Lê um arquivo bruto e calcula seu perfil"""
+    return perfil_arquivo(ler_arquivo_bruto(caminho_arquivo))
+
+
+def atualizar_qualidade(base=CAMINHO_BASE, workers=1, caminho=CAMINHO_QUALIDADE):
+    """
+    Atualiza os perfis de qualidade dos arquivos das partições
+
+    Só arquivos novos ou alterados (checksum diferente no catálogo) são
+    lidos; perfis de arquivos removidos de base são descartados.
+
+    Args:
+        base: Diretório das partições
+        workers: Número de threads de leitura dos arquivos novos
+        caminho: Arquivo dos perfis
+
+    Returns:
+        dict {caminho do arquivo: perfil com ano, semana e checksum}
+    """
+    catalogo = atualizar_catalogo(base, workers)
+    raiz = os.path.join(os.path.realpath(base), "")
+    arquivos = {
+        chave: entrada for chave, entrada in catalogo.items() if chave.startswith(raiz)
+    }
+
+    qualidade = carregar_qualidade(caminho)
+    novos = [
+        chave
+        for chave, entrada in arquivos.items()
+        if qualidade.get(chave, {}).get("checksum") != entrada["checksum"]
+    ]
+    if workers > 1 and len(novos) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            perfis = list(executor.map(_perfilar, novos))
+    else:
+        perfis = [_perfilar(chave) for chave in novos]
+
+    for chave, perfil in zip(novos, perfis):
+        entrada = arquivos[chave]
+        perfil.update(
+            {
+                "ano": entrada["ano"],
+                "semana": entrada["semana"],
+                "checksum": entrada["checksum"],
+            }
+        )
+        qualidade[chave] = perfil
+
+    removidos = [
+        chave for chave in qualidade if chave.startswith(raiz) and chave not in arquivos
+    ]
+    for chave in removidos:
+        del qualidade[chave]
+
+    if novos or removidos:
+        salvar_qualidade(qualidade, caminho)
+
+    return {chave: qualidade[chave] for chave in arquivos}
+
+
+def _padroes(perfil, padroes):
+    """
+    Padrões de um perfil como matriz booleana (linhas x colunas do perfil)
+
+    Returns:
+        tuple (matriz de ausentes por padrão, linhas de cada padrão)
+    """
+    bits = np.array([int(padrao) for padrao in padroes], dtype=np.uint64)
+    contagens = np.array(list(padroes.values()), dtype=np.int64)
+    posicoes = np.arange(len(perfil["colunas"]), dtype=np.uint64)
+    matriz = (bits[:, None] >> posicoes[None, :]) & np.uint64(1)
+    return matriz.astype(bool), contagens
+
+
+def _descartes(perfil, padroes):
+    """
+    Linhas descartadas pelo dropna() de preparar_dataframe()
+
+    Returns:
+        tuple (linhas descartadas, Series de descartes por coluna,
+        Series de descartes em que a coluna é a única causa)
+    """
+    colunas = perfil["colunas"]
+    mantidas = np.array([coluna not in COLUNAS_REMOVER for coluna in colunas])
+    if not padroes:
+        vazio = pd.Series(0, index=[c for c, m in zip(colunas, mantidas) if m])
+        return 0, vazio, vazio
+
+    matriz, contagens = _padroes(perfil, padroes)
+    matriz = matriz[:, mantidas]
+    descartado = matriz.any(axis=1)
+    unica = matriz.sum(axis=1) == 1
+    nomes = [coluna for coluna, mantida in zip(colunas, mantidas) if mantida]
+
+    return (
+        int(contagens[descartado].sum()),
+        pd.Series(contagens @ matriz, index=nomes),
+        pd.Series(contagens[unica] @ matriz[unica], index=nomes),
+    )
+
+
+def ausentes_por_coluna(qualidade):
+    """
+    Ausentes por coluna somando todos os arquivos
+
+    Returns:
+        DataFrame com ausentes, percentual, se a coluna é removida antes do
+        dropna() e linhas descartadas só por causa dela
+    """
+    total = sum(perfil["linhas"] for perfil in qualidade.values())
+    ausentes = pd.Series(dtype=np.int64)
+    unica = pd.Series(dtype=np.int64)
+
+    for perfil in qualidade.values():
+        if perfil["padroes"]:
+            matriz, contagens = _padroes(perfil, perfil["padroes"])
+            ausentes = ausentes.add(
+                pd.Series(contagens @ matriz, index=perfil["colunas"]), fill_value=0
+            )
+        else:
+            ausentes = ausentes.add(pd.Series(0, index=perfil["colunas"]), fill_value=0)
+        unica = unica.add(_descartes(perfil, perfil["padroes"])[2], fill_value=0)
+
+    tabela = pd.DataFrame({"Ausentes": ausentes.astype(np.int64)})
+    tabela["Percentual (%)"] = (
+        (tabela["Ausentes"] / total * 100).round(2) if total else 0.0
+    )
+    tabela["Removida"] = tabela.index.isin(COLUNAS_REMOVER)
+    tabela["Descartes (única causa)"] = (
+        unica.reindex(tabela.index).fillna(0).astype(np.int64)
+    )
+    tabela.index.name = "Coluna"
+
+    return tabela.sort_values("Ausentes", ascending=False, kind="stable")
+
+
+def resumo_descartes(qualidade):
+    """
+    Quantas linhas o dropna() de preparar_dataframe() descarta e por quê
+
+    Returns:
+        dict com linhas, descartadas, percentual e descartes por coluna
+        (linhas com a coluna ausente entre as descartadas)
+    """
+    linhas = 0
+    descartadas = 0
+    por_coluna = pd.Series(dtype=np.int64)
+
+    for perfil in qualidade.values():
+        linhas += perfil["linhas"]
+        total, colunas, _ = _descartes(perfil, perfil["padroes"])
+        descartadas += total
+        por_coluna = por_coluna.add(colunas, fill_value=0)
+
+    por_coluna = por_coluna[por_coluna > 0].astype(np.int64)
+    return {
+        "linhas": linhas,
+        "descartadas": descartadas,
+        "percentual": round(descartadas / linhas * 100, 2) if linhas else 0.0,
+        "por_coluna": por_coluna.sort_values(ascending=False).to_dict(),
+    }
+
+
+def ausentes_por_arquivo(qualidade):
+    """
+    Linhas e descartes de cada arquivo
+
+    Returns:
+        DataFrame indexado pelo nome do arquivo (ano, número no ano,
+        linhas, descartadas e percentual)
+    """
+    registros = []
+    for chave, perfil in qualidade.items():
+        descartadas = _descartes(perfil, perfil["padroes"])[0]
+        registros.append(
+            {
+                "Arquivo": os.path.basename(chave),
+                "Ano": perfil["ano"],
+                "Semana": perfil["semana"],
+                "Linhas": perfil["linhas"],
+                "Descartadas": descartadas,
+            }
+        )
+
+    tabela = pd.DataFrame(
+        registros, columns=["Arquivo", "Ano", "Semana", "Linhas", "Descartadas"]
+    )
+    tabela["Percentual (%)"] = (
+        tabela["Descartadas"] / tabela["Linhas"].where(tabela["Linhas"] > 0) * 100
+    ).round(2)
+
+    return tabela.sort_values(["Ano", "Semana"], kind="stable").set_index("Arquivo")
+
+
+def ausentes_por_semana(qualidade):
+    """
+    Linhas e descartes por semana de 'Data Accesso' (segunda-feira)
+
+    Semanas que atravessam dois arquivos são somadas.
+
+    Returns:
+        DataFrame indexado pelo início da semana
+    """
+    linhas = {}
+    descartadas = {}
+    for perfil in qualidade.values():
+        for semana, dados in perfil["semanas"].items():
+            linhas[semana] = linhas.get(semana, 0) + dados["linhas"]
+            descartadas[semana] = (
+                descartadas.get(semana, 0) + _descartes(perfil, dados["padroes"])[0]
+            )
+
+    tabela = pd.DataFrame(
+        {"Linhas": pd.Series(linhas, dtype=np.int64)},
+    )
+    tabela["Descartadas"] = pd.Series(descartadas, dtype=np.int64)
+    tabela["Percentual (%)"] = (tabela["Descartadas"] / tabela["Linhas"] * 100).round(2)
+    tabela.index.name = "Semana"
+
+    return tabela.sort_index()
+
+
+def violacoes(qualidade):
+    """
+    Violações de cada regra de consistência somando todos os arquivos
+
+    Returns:
+        DataFrame com descrição, linhas violando e percentual
+    """
+    total = sum(perfil["linhas"] for perfil in qualidade.values())
+    contagens = {regra: 0 for regra in REGRAS}
+    for perfil in qualidade.values():
+        for regra, quantidade in perfil["regras"].items():
+            contagens[regra] = contagens.get(regra, 0) + quantidade
+
+    tabela = pd.DataFrame(
+        {
+            "Descrição": pd.Series(REGRAS),
+            "Linhas": pd.Series(contagens, dtype=np.int64),
+        }
+    )
+    tabela["Percentual (%)"] = (
+        (tabela["Linhas"] / total * 100).round(2) if total else 0.0
+    )
+    tabela.index.name = "Regra"
+
+    return tabela
+
+
+def relatorio_qualidade(qualidade):
+    """
+    Imprime o relatório de qualidade dos dados
+
+    Args:
+        qualidade: dict retornado por atualizar_qualidade()
+
+    Returns:
+        dict com as tabelas do relatório
+    """
+    descartes = resumo_descartes(qualidade)
+    colunas = ausentes_por_coluna(qualidade)
+    regras = violacoes(qualidade)
+    arquivos = ausentes_por_arquivo(qualidade)
+
+    print("=" * 80)
+    print("QUALIDADE DOS DADOS")
+    print("=" * 80)
+
+    print(f"\nArquivos: {len(qualidade)}")
+    print(f"Linhas lidas: {descartes['linhas']:,}")
+    print(
+        f"Descartadas pelo dropna(): {descartes['descartadas']:,} "
+        f"({descartes['percentual']:.2f}%)"
+    )
+
+    print("\nValores ausentes por coluna:")
+    print("-" * 80)
+    print(colunas[colunas["Ausentes"] > 0])
+
+    print("\nViolações de regras:")
+    print("-" * 80)
+    print(regras)
+
+    print("\nArquivos com mais descartes:")
+    print("-" * 80)
+    print(arquivos.sort_values("Descartadas", ascending=False).head(10))
+
+    return {
+        "descartes": descartes,
+        "colunas": colunas,
+        "regras": regras,
+        "arquivos": arquivos,
+        "semanas": ausentes_por_semana(qualidade),
+    }
+
+
+if __name__ == "__main__":
+    relatorio_qualidade(atualizar_qualidade())
@@ -0,0 +1,172 @@
+"""
+Módulo de séries temporais de Categoria Urgenza
+
+A série diária (dias x categorias) é a base de todas as granularidades:
+semanas e meses são obtidos somando os dias, sem percorrer as linhas
+do DataFrame novamente.
+"""
+
+import numpy as np
+import pandas as pd
+from config import GRANULARIDADES, MESI_ITALIANI, ORDEM_URGENZA, PERIODOS_ANO
+from instrumentacao import instrumentar
+
+
+@instrumentar
+def serie_diaria_urgenza(df):
+    """
+    Conta atendimentos por dia e Categoria Urgenza
+
+    Os dias sem atendimentos aparecem com contagem zero, de modo que o
+    índice é contínuo e as janelas móveis correspondem a dias reais.
+
+    Args:
+        df: DataFrame com colunas 'Data Accesso' e 'Categoria Urgenza'
+
+    Returns:
+        DataFrame com DatetimeIndex diário e uma coluna por categoria
+    """
+    codigos = pd.Categorical(
+        df["Categoria Urgenza"], categories=ORDEM_URGENZA
+    ).codes.astype(np.int64)
+    dias = df["Data Accesso"].to_numpy().astype("datetime64[D]")
+
+    validos = (codigos >= 0) & ~np.isnat(dias)
+    codigos = codigos[validos]
+    dias = dias[validos]
+
+    if len(dias) == 0:
+        return pd.DataFrame(
+            columns=ORDEM_URGENZA, index=pd.DatetimeIndex([], freq="D"), dtype="int64"
+        )
+
+    inicio = dias.min()
+    num_dias = int((dias.max() - inicio).astype(np.int64)) + 1
+    posicao_dia = (dias - inicio).astype(np.int64)
+
+    # Uma única contagem sobre o código combinado (dia, categoria)
+    contagens = np.bincount(
+        posicao_dia * len(ORDEM_URGENZA) + codigos,
+        minlength=num_dias * len(ORDEM_URGENZA),
+    ).reshape(num_dias, len(ORDEM_URGENZA))
+
+    indice = pd.date_range(pd.Timestamp(inicio), periods=num_dias, freq="D")
+    serie = pd.DataFrame(contagens, index=indice, columns=ORDEM_URGENZA)
+    serie.index.name = "Data"
+    serie.columns.name = "Categoria Urgenza"
+
+    return serie
+
+
+def serie_urgenza(serie_diaria, granularidade="mes"):
+    """
+    Agrega a série diária na granularidade desejada
+
+    Args:
+        serie_diaria: Resultado de serie_diaria_urgenza()
+        granularidade: 'dia', 'semana' ou 'mes'
+
+    Returns:
+        DataFrame com DatetimeIndex no início de cada período
+    """
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(
+            f"Granularidade inválida: {granularidade}. "
+            f"Use uma de: {', '.join(GRANULARIDADES)}"
+        )
+
+    if granularidade == "dia":
+        return serie_diaria
+
+    return serie_diaria.resample(
+        GRANULARIDADES[granularidade], label="left", closed="left"
+    ).sum()
+
+
+def media_movel(serie, janela):
+    """
+    Calcula a média móvel de cada categoria
+
+    Args:
+        serie: DataFrame retornado por serie_urgenza()
+        janela: Número de períodos da janela
+
+    Returns:
+        DataFrame com as médias móveis (NaN até completar a janela)
+    """
+    return serie.rolling(window=janela, min_periods=janela).mean()
+
+
+def variacao_anual(serie, granularidade="mes"):
+    """
+    Calcula a variação em relação ao mesmo período do ano anterior
+
+    Args:
+        serie: DataFrame retornado por serie_urgenza()
+        granularidade: Granularidade da série ('dia', 'semana' ou 'mes')
+
+    Returns:
+        dict com as diferenças absolutas e percentuais
+    """
+    anterior = serie.shift(PERIODOS_ANO[granularidade])
+    delta = serie - anterior
+    delta_perc = delta / anterior.where(anterior > 0) * 100
+
+    return {"absoluta": delta, "percentual": delta_perc}
+
+
+def rotulos_periodo(indice, granularidade="mes"):
+    """
+    Gera rótulos legíveis para o índice de uma série
+
+    Args:
+        indice: DatetimeIndex da série
+        granularidade: Granularidade da série
+
+    Returns:
+        Lista de rótulos ('Gennaio/2022', '2022-W01' ou '01/01/2022')
+    """
+    if granularidade == "mes":
+        return [f"{MESI_ITALIANI[data.month]}/{data.year}" for data in indice]
+    if granularidade == "semana":
+        return [
+            f"{data.isocalendar().year}-W{data.isocalendar().week:02d}"
+            for data in indice
+        ]
+    return [data.strftime("%d/%m/%Y") for data in indice]
+
+
+@instrumentar
+def tendencias_urgenza(serie_diaria, granularidade="semana", janela=4):
+    """
+    Análise de tendências de Categoria Urgenza
+
+    Args:
+        serie_diaria: Resultado de serie_diaria_urgenza()
+        granularidade: 'dia', 'semana' ou 'mes'
+        janela: Número de períodos da média móvel
+
+    Returns:
+        dict com série, média móvel e variações anuais
+    """
+    serie = serie_urgenza(serie_diaria, granularidade)
+    movel = media_movel(serie, janela)
+    variacao = variacao_anual(serie, granularidade)
+
+    print("\n" + "=" * 80)
+    print(f"TENDÊNCIAS DE CATEGORIA URGENZA (granularidade: {granularidade})")
+    print("=" * 80)
+    print(f"\nMédia móvel ({janela} períodos) - últimos valores:")
+    print("-" * 80)
+    print(movel.tail(janela).round(2))
+
+    print("\nVariação em relação ao ano anterior (%) - últimos valores:")
+    print("-" * 80)
+    print(variacao["percentual"].tail(janela).round(2))
+
+    return {
+        "serie": serie,
+        "media_movel": movel,
+        "variacao_absoluta": variacao["absoluta"],
+        "variacao_percentual": variacao["percentual"],
+    }
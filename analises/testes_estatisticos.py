@@ -0,0 +1,353 @@
+"""
+Testes de associação entre Categoria Urgenza e outras variáveis
+
+Para cada tabela de contingência (ex.: Categoria Urgenza x Sottogruppo
+Pazienti) calcula:
+
+    - qui-quadrado de Pearson, graus de liberdade e p-valor assintótico
+    - V de Cramér (tamanho do efeito, de 0 a 1)
+    - resíduos padronizados ajustados de cada célula (|r| > 1,96 indica
+      célula acima/abaixo do esperado ao nível de 5%)
+    - p-valor por permutação, sem depender da aproximação assintótica
+
+No teste de permutação, embaralhar os rótulos de uma das variáveis
+mantém os totais das linhas e das colunas, e a tabela resultante segue a
+distribuição hipergeométrica multivariada. As tabelas são sorteadas
+diretamente dessa distribuição, em lotes vetorizados (o mesmo resultado
+de embaralhar os rótulos, sem percorrer as linhas a cada permutação).
+Cada lote tem sua própria semente derivada de SEMENTE_ALEATORIA, então o
+p-valor é o mesmo com qualquer número de processos.
+
+O p-valor assintótico usa scipy se estiver instalado; sem scipy, a
+função gama incompleta é calculada aqui.
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from config import LOTE_PERMUTACOES, PERMUTACOES, SEMENTE_ALEATORIA
+from instrumentacao import instrumentar
+from motores import tabela_cruzada
+
+try:
+    from scipy.stats import chi2 as _chi2
+except ImportError:
+    _chi2 = None
+
+# Pares de colunas testados no relatório
+ASSOCIACOES = {
+    "subgrupo": ("Categoria Urgenza", "Sottogruppo Pazienti"),
+    "faixa": ("Categoria Urgenza", "Fascia d'età"),
+}
+
+
+def _gama_incompleta_superior(a, x):
+    """Função gama incompleta superior regularizada Q(a, x)"""
+    if x <= 0:
+        return 1.0
+
+    log_prefator = a * math.log(x) - x - math.lgamma(a)
+
+    if x < a + 1:
+        # Série de P(a, x); Q = 1 - P
+        termo = soma = 1.0 / a
+        n = a
+        while abs(termo) > abs(soma) * 1e-15:
+            n += 1
+            termo *= x / n
+            soma += termo
+        return max(0.0, 1.0 - soma * math.exp(log_prefator))
+
+    # Fração contínua de Q(a, x) (método de Lentz)
+    minimo = 1e-300
+    b = x + 1 - a
+    c = 1 / minimo
+    d = 1 / b
+    fracao = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = minimo if abs(d) < minimo else d
+        c = b + an / c
+        c = minimo if abs(c) < minimo else c
+        d = 1 / d
+        delta = d * c
+        fracao *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return fracao * math.exp(log_prefator)
+
+
+def p_valor_qui_quadrado(estatistica, graus_liberdade):
+    """
+    P(X >= estatistica) para X com distribuição qui-quadrado
+
+    Args:
+        estatistica: Valor observado do qui-quadrado
+        graus_liberdade: Graus de liberdade
+
+    Returns:
+        float entre 0 e 1
+    """
+    if _chi2 is not None:
+        return float(_chi2.sf(estatistica, graus_liberdade))
+    return _gama_incompleta_superior(graus_liberdade / 2, estatistica / 2)
+
+
+def _sem_vazias(tabela):
+    """Remove linhas e colunas sem observações (e margens 'All')"""
+    tabela = tabela.drop(index="All", columns="All", errors="ignore")
+    return tabela.loc[tabela.sum(axis=1) > 0, tabela.sum(axis=0) > 0]
+
+
+def _esperados(observados):
+    """Frequências esperadas sob independência (array 2D)"""
+    return np.outer(observados.sum(axis=1), observados.sum(axis=0)) / observados.sum()
+
+
+@instrumentar
+def qui_quadrado(tabela):
+    """
+    Teste qui-quadrado de independência de uma tabela de contingência
+
+    Args:
+        tabela: DataFrame de contagens (linhas x colunas); margens 'All' e
+            linhas/colunas vazias são ignoradas
+
+    Returns:
+        dict com estatistica, graus_liberdade, p_valor, v_cramer, n,
+        esperados (DataFrame) e residuos (DataFrame de resíduos
+        padronizados ajustados)
+    """
+    tabela = _sem_vazias(tabela)
+    observados = tabela.to_numpy(dtype=np.float64)
+    n = observados.sum()
+    esperados = _esperados(observados)
+
+    linhas, colunas = observados.shape
+    graus_liberdade = (linhas - 1) * (colunas - 1)
+    estatistica = float(((observados - esperados) ** 2 / esperados).sum())
+
+    # Resíduo ajustado: (O - E) / sqrt(E (1 - linha/n) (1 - coluna/n))
+    proporcao_linhas = observados.sum(axis=1, keepdims=True) / n
+    proporcao_colunas = observados.sum(axis=0, keepdims=True) / n
+    residuos = (observados - esperados) / np.sqrt(
+        esperados * (1 - proporcao_linhas) * (1 - proporcao_colunas)
+    )
+
+    menor_dimensao = min(linhas, colunas) - 1
+    v_cramer = math.sqrt(estatistica / (n * menor_dimensao)) if menor_dimensao else 0.0
+
+    return {
+        "estatistica": estatistica,
+        "graus_liberdade": graus_liberdade,
+        "p_valor": (
+            p_valor_qui_quadrado(estatistica, graus_liberdade)
+            if graus_liberdade
+            else 1.0
+        ),
+        "v_cramer": v_cramer,
+        "n": int(n),
+        "esperados": pd.DataFrame(
+            esperados, index=tabela.index, columns=tabela.columns
+        ),
+        "residuos": pd.DataFrame(residuos, index=tabela.index, columns=tabela.columns),
+    }
+
+
+def tabelas_permutadas(totais_linhas, totais_colunas, quantidade, rng):
+    """
+    Sorteia as tabelas obtidas embaralhando os rótulos de uma variável
+
+    Cada linha da tabela é um sorteio sem reposição das observações ainda
+    não alocadas, feito coluna a coluna por hipergeométricas condicionais,
+    todas vetorizadas sobre as permutações do lote.
+
+    Args:
+        totais_linhas: Array com o total de cada linha
+        totais_colunas: Array com o total de cada coluna
+        quantidade: Número de tabelas (permutações)
+        rng: numpy.random.Generator
+
+    Returns:
+        Array (quantidade x linhas x colunas) de contagens
+    """
+    totais_linhas = np.asarray(totais_linhas, dtype=np.int64)
+    n_linhas, n_colunas = len(totais_linhas), len(totais_colunas)
+    tabelas = np.zeros((quantidade, n_linhas, n_colunas), dtype=np.int64)
+    restantes = np.tile(np.asarray(totais_colunas, dtype=np.int64), (quantidade, 1))
+
+    for i in range(n_linhas - 1):
+        faltam = np.full(quantidade, totais_linhas[i])
+        depois = restantes.sum(axis=1)
+        for j in range(n_colunas - 1):
+            depois = depois - restantes[:, j]
+            tabelas[:, i, j] = rng.hypergeometric(restantes[:, j], depois, faltam)
+            faltam = faltam - tabelas[:, i, j]
+        tabelas[:, i, -1] = faltam
+        restantes -= tabelas[:, i]
+
+    tabelas[:, -1] = restantes
+    return tabelas
+
+
+def _estatisticas_lote(observados, quantidade, semente):
+    """Qui-quadrado de um lote de tabelas permutadas (executa num processo)"""
+    rng = np.random.default_rng(semente)
+    esperados = _esperados(observados)
+    tabelas = tabelas_permutadas(
+        observados.sum(axis=1), observados.sum(axis=0), quantidade, rng
+    )
+    return ((tabelas - esperados) ** 2 / esperados).sum(axis=(1, 2))
+
+
+@instrumentar
+def teste_permutacao(
+    tabela,
+    permutacoes=PERMUTACOES,
+    semente=SEMENTE_ALEATORIA,
+    processos=1,
+    lote=LOTE_PERMUTACOES,
+):
+    """
+    P-valor do qui-quadrado por permutação dos rótulos
+
+    Args:
+        tabela: DataFrame de contagens (linhas x colunas)
+        permutacoes: Número de permutações
+        semente: Semente do gerador (mesma semente, mesmo p-valor)
+        processos: Processos que sorteiam os lotes em paralelo
+        lote: Permutações por lote
+
+    Returns:
+        dict com estatistica, p_valor, permutacoes e semente
+    """
+    observados = _sem_vazias(tabela).to_numpy(dtype=np.int64)
+    esperados = _esperados(observados)
+    estatistica = float(((observados - esperados) ** 2 / esperados).sum())
+
+    tamanhos = [lote] * (permutacoes // lote)
+    if permutacoes % lote:
+        tamanhos.append(permutacoes % lote)
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    argumentos = ([observados] * len(tamanhos), tamanhos, sementes)
+
+    if processos > 1 and len(tamanhos) > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            estatisticas = list(executor.map(_estatisticas_lote, *argumentos))
+    else:
+        estatisticas = list(map(_estatisticas_lote, *argumentos))
+
+    # Tolerância relativa: empates com o observado contam como extremos
+    extremos = sum(
+        int((lote_estatisticas >= estatistica * (1 - 1e-12)).sum())
+        for lote_estatisticas in estatisticas
+    )
+
+    return {
+        "estatistica": estatistica,
+        "p_valor": (extremos + 1) / (permutacoes + 1),
+        "permutacoes": permutacoes,
+        "semente": semente,
+    }
+
+
+def teste_associacao(
+    df,
+    linhas,
+    colunas,
+    permutacoes=PERMUTACOES,
+    semente=SEMENTE_ALEATORIA,
+    processos=1,
+):
+    """
+    Qui-quadrado, V de Cramér, resíduos e teste de permutação de um par
+
+    Args:
+        df: DataFrame ou ArmazemColunas
+        linhas: Coluna das linhas da tabela
+        colunas: Coluna das colunas da tabela
+        permutacoes: Número de permutações (0: sem teste de permutação)
+        semente: Semente do teste de permutação
+        processos: Processos do teste de permutação
+
+    Returns:
+        dict de qui_quadrado() com a tabela observada e p_valor_permutacao
+    """
+    tabela = _sem_vazias(tabela_cruzada(df, linhas, colunas))
+    resultado = qui_quadrado(tabela)
+    resultado["tabela"] = tabela
+
+    resultado["p_valor_permutacao"] = None
+    if permutacoes:
+        resultado["p_valor_permutacao"] = teste_permutacao(
+            tabela, permutacoes, semente, processos
+        )["p_valor"]
+
+    return resultado
+
+
+@instrumentar
+def relatorio_associacao(
+    df, permutacoes=PERMUTACOES, semente=SEMENTE_ALEATORIA, processos=1
+):
+    """
+    Testa a associação de Categoria Urgenza com subgrupo e faixa etária
+
+    Args:
+        df: DataFrame ou ArmazemColunas com as colunas de ASSOCIACOES
+        permutacoes: Número de permutações (0: sem teste de permutação)
+        semente: Semente do teste de permutação
+        processos: Processos do teste de permutação
+
+    Returns:
+        dict {'testes': DataFrame com uma linha por par, e
+        'residuos_<par>': DataFrame de resíduos ajustados}
+    """
+    print("=" * 80)
+    print("TESTES DE ASSOCIAÇÃO COM CATEGORIA URGENZA")
+    print("=" * 80)
+
+    resumo = {}
+    resultados = {}
+    for indice, (nome, (linhas, colunas)) in enumerate(ASSOCIACOES.items(), 1):
+        teste = teste_associacao(df, linhas, colunas, permutacoes, semente, processos)
+
+        print(f"\n{indice}. {linhas.upper()} x {colunas.upper()}")
+        print("-" * 80)
+        print(
+            f"Qui-quadrado: {teste['estatistica']:,.2f} "
+            f"(gl = {teste['graus_liberdade']}, n = {teste['n']:,})"
+        )
+        print(f"p-valor (assintótico): {teste['p_valor']:.4g}")
+        if teste["p_valor_permutacao"] is not None:
+            print(
+                f"p-valor ({permutacoes:,} permutações, semente {semente}): "
+                f"{teste['p_valor_permutacao']:.4g}"
+            )
+        print(f"V de Cramér: {teste['v_cramer']:.4f}")
+        print("\nResíduos padronizados ajustados (|r| > 1,96: p < 0,05):")
+        print(teste["residuos"].round(2))
+
+        resumo[f"{linhas} x {colunas}"] = {
+            "Qui-quadrado": teste["estatistica"],
+            "gl": teste["graus_liberdade"],
+            "p-valor": teste["p_valor"],
+            "p-valor (permutação)": teste["p_valor_permutacao"],
+            "V de Cramér": teste["v_cramer"],
+            "n": teste["n"],
+        }
+        resultados[f"residuos_{nome}"] = teste["residuos"]
+
+    return {"testes": pd.DataFrame.from_dict(resumo, orient="index"), **resultados}
+
+
+if __name__ == "__main__":
+    import os
+
+    from armazem_colunas import obter_armazem
+
+    relatorio_associacao(obter_armazem(), processos=os.cpu_count() or 1)
@@ -3,24 +3,40 @@ Funções utilitárias para análise de dados
 """
 
 import os
+import hashlib
+import html
+import functools
+import json
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from catalogo import (
+    atualizar_catalogo,
+    carregar_catalogo,
+    entrada_arquivo,
+    podar_arquivos,
+    registrar_arquivo,
+    salvar_catalogo,
+    selecionar_arquivos,
+)
+from indice_pacientes import codificar_pacientes, ids_pacientes
+from instrumentacao import instrumentar
+
+# matplotlib/seaborn são importados só quando um gráfico é gerado
+_graficos = {}
 
 
 def configurar_ambiente():
     """
     Configura o ambiente de análise com estilos e configurações padrão
+
+    O estilo dos gráficos é aplicado por carregar_graficos(), na primeira
+    vez que um gráfico é gerado, para que execuções sem gráficos não
+    importem matplotlib e seaborn.
     """
     warnings.filterwarnings("ignore")
 
-    # Tamanho e estilo dos gráficos
-    plt.style.use("bmh")
-    plt.rcParams["figure.figsize"] = [22, 9]
-    plt.rcParams["font.size"] = 21
-
     # Configuração de exibição das linhas e colunas do pandas
     pd.options.display.max_columns = None
     pd.options.display.max_rows = None
@@ -29,37 +45,161 @@ def configurar_ambiente():
     # Configuração do pandas para quantidade de casas decimais
     pd.set_option("display.float_format", lambda x: "%.2f" % x)
 
-    sns.set()
+
+def carregar_graficos():
+    """
+    Importa matplotlib e seaborn e aplica o estilo padrão (uma única vez)
+
+    Returns:
+        tuple (pyplot, seaborn)
+    """
+    if not _graficos:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        # Tamanho e estilo dos gráficos
+        plt.style.use("bmh")
+        plt.rcParams["figure.figsize"] = [22, 9]
+        plt.rcParams["font.size"] = 21
+
+        sns.set()
+
+        _graficos["plt"] = plt
+        _graficos["sns"] = sns
+
+    return _graficos["plt"], _graficos["sns"]
+
+
+def resumo_contagem(serie, top=None, outros="Outros"):
+    """
+    Contagem das categorias mais frequentes, com as demais agrupadas
+
+    Args:
+        serie: Series com os valores
+        top: Número de categorias mantidas (padrão: config.TOP_CATEGORIAS)
+        outros: Rótulo da soma das demais categorias
+
+    Returns:
+        Series {categoria: contagem}, da mais frequente à menos frequente,
+        com 'outros' por último (só se houver categorias agrupadas)
+    """
+    return agrupar_contagens(serie.value_counts(), top, outros)
+
+
+def agrupar_contagens(contagens, top=None, outros="Outros"):
+    """
+    Mantém as categorias mais frequentes de um value_counts() e soma as demais
+
+    Args:
+        contagens: Series de value_counts() (ordem decrescente)
+        top: Número de categorias mantidas (padrão: config.TOP_CATEGORIAS)
+        outros: Rótulo da soma das demais categorias
+
+    Returns:
+        Series no formato de resumo_contagem()
+    """
+    from config import TOP_CATEGORIAS
+
+    top = TOP_CATEGORIAS if top is None else top
+    if len(contagens) <= top:
+        return contagens
+
+    resumo = contagens.iloc[:top].copy()
+    resumo.index = resumo.index.astype(object)
+    resumo[outros] = contagens.iloc[top:].sum()
+    return resumo
+
+
+def resumo_boxplot(serie):
+    """
+    Estatísticas de um boxplot (quartis, bigodes e outliers) sem plotar
+
+    Os quartis vêm de uma única chamada vetorizada a np.quantile; os
+    bigodes seguem a regra de Tukey (1,5 x IQR), como no seaborn. Só os
+    valores distintos dos outliers são guardados (no máximo
+    config.MAX_OUTLIERS, espaçados entre o menor e o maior).
+
+    Args:
+        serie: Series numérica
+
+    Returns:
+        dict no formato de Axes.bxp (label, med, q1, q3, whislo, whishi,
+        fliers) com mean e n
+    """
+    from config import MAX_OUTLIERS
+
+    valores = pd.to_numeric(serie, errors="coerce").to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+    valores = valores[~np.isnan(valores)]
+    resumo = {"label": str(serie.name), "n": int(len(valores))}
+    if len(valores) == 0:
+        return resumo
+
+    q1, mediana, q3 = np.quantile(valores, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    dentro = valores[(valores >= q1 - 1.5 * iqr) & (valores <= q3 + 1.5 * iqr)]
+    outliers = np.unique(
+        valores[(valores < q1 - 1.5 * iqr) | (valores > q3 + 1.5 * iqr)]
+    )
+    if len(outliers) > MAX_OUTLIERS:
+        outliers = outliers[np.linspace(0, len(outliers) - 1, MAX_OUTLIERS).astype(int)]
+
+    resumo.update(
+        {
+            "mean": float(valores.mean()),
+            "med": float(mediana),
+            "q1": float(q1),
+            "q3": float(q3),
+            "whislo": float(dentro.min()),
+            "whishi": float(dentro.max()),
+            "fliers": outliers.tolist(),
+        }
+    )
+    return resumo
 
 
 def exibe_boxplot(data, col):
     """
     Exibe múltiplos boxplots lado a lado
 
+    Cada boxplot é desenhado a partir do resumo de resumo_boxplot(), sem
+    passar as colunas completas ao matplotlib.
+
     Args:
         data: DataFrame com os dados
         col: Número de colunas para exibição
     """
+    plt, sns = carregar_graficos()
     indice = 1
     for coluna in data.columns:
-        plt.subplot(1, col, indice)
-        sns.boxplot(data[coluna]).set(title=coluna)
+        ax = plt.subplot(1, col, indice)
+        resumo = resumo_boxplot(data[coluna])
+        if resumo["n"] > 0:
+            ax.bxp([resumo], showfliers=True, patch_artist=True)
+        ax.set(title=coluna, xticklabels=[])
         indice += 1
 
 
-def exibe_countplot(data, col):
+def exibe_countplot(data, col, top=None):
     """
     Exibe múltiplos countplots lado a lado
 
+    As contagens são agregadas antes de plotar: só as top categorias mais
+    frequentes de cada coluna aparecem, e as demais viram "Outros".
+
     Args:
         data: DataFrame com os dados
         col: Número de colunas para exibição
+        top: Categorias por gráfico (padrão: config.TOP_CATEGORIAS)
     """
+    plt, sns = carregar_graficos()
     indice = 1
     for coluna in data.columns:
+        resumo = resumo_contagem(data[coluna], top)
         plt.subplot(1, col, indice)
         plt.xticks(rotation=90)
-        sns.countplot(data=data, x=data[coluna]).set(
+        sns.barplot(x=resumo.index.astype(str), y=resumo.to_numpy()).set(
             title=coluna, ylabel="Contagem", xlabel=None
         )
         indice += 1
@@ -69,6 +209,10 @@ def plota_ausentes(data, title, x_title, perc_minimo=0):
     """
     Plota gráfico de valores ausentes e retorna estatísticas
 
+    Para o perfil dos arquivos brutos (linhas descartadas pelo dropna(),
+    ausentes por arquivo e por semana, violações de regras), ver
+    qualidade_dados.py.
+
     Args:
         data: DataFrame com os dados
         title: Título do gráfico
@@ -78,88 +222,449 @@ def plota_ausentes(data, title, x_title, perc_minimo=0):
     Returns:
         DataFrame com estatísticas de valores ausentes
     """
+    from qualidade_dados import contar_ausentes
+
+    # Máscara de ausentes calculada uma única vez para todas as colunas
+    ausentes = contar_ausentes(data)
+
     # Pega as colunas com dados ausentes
-    colunas_com_nan = [col for col in data if data[col].isna().sum() > perc_minimo]
+    colunas_com_nan = ausentes[ausentes > perc_minimo]
+
+    print("Contagem de faltantes")
+    if colunas_com_nan.empty:
+        print(ausentes)
+        return ausentes
 
     # Plot do gráfico de barras com o percentual
-    if len(colunas_com_nan) > 0:
-        ax = (
-            data[colunas_com_nan]
-            .isna()
-            .mean()
-            .sort_values(ascending=True)
-            .mul(100)
-            .round(1)
-            .plot(kind="barh")
+    carregar_graficos()
+    ax = (
+        (colunas_com_nan / len(data))
+        .sort_values(ascending=True)
+        .mul(100)
+        .round(1)
+        .plot(kind="barh")
+    )
+    ax.set_xlabel(x_title)
+    ax.set_title(title)
+    ax.bar_label(ax.containers[0])
+
+    # Tabela da contagem dos dados faltantes
+    missing_counts = colunas_com_nan.sort_values(ascending=True)
+    print(missing_counts)
+    return missing_counts
+
+
+def colunas_necessarias(analises):
+    """
+    Projeção de colunas para um conjunto de análises
+
+    Args:
+        analises: Nomes das análises (chaves de COLUNAS_ANALISES)
+
+    Returns:
+        Lista de colunas (nomes já sem entidades HTML, ex.: 'Età')
+    """
+    from config import COLUNAS_ANALISES, COLUNAS_CHAVE
+
+    colunas = list(COLUNAS_CHAVE)
+    for analise in analises:
+        for coluna in COLUNAS_ANALISES[analise]:
+            if coluna not in colunas:
+                colunas.append(coluna)
+
+    return colunas
+
+
+def _seletor_colunas(colunas=None, verificadas=False):
+    """
+    Cria o filtro de colunas passado ao leitor via usecols
+
+    Sem projeção, todas as colunas exceto COLUNAS_REMOVER são lidas, mais
+    COLUNA_ESTRUTURA (que preparar_dataframe() só mantém com estrutura=True).
+    Os cabeçalhos são comparados sem entidades HTML ('Et&agrave;' == 'Età').
+    Com verificadas=True, a projeção inclui também as colunas verificadas
+    por ausentes (ver _coluna_verificada).
+    """
+    from config import COLUNA_ESTRUTURA
+
+    if colunas is None:
+        return lambda cabecalho: (
+            _coluna_verificada(cabecalho)
+            or html.unescape(cabecalho) == COLUNA_ESTRUTURA
         )
-        ax.set_xlabel(x_title)
-        ax.set_title(title)
-        ax.bar_label(ax.containers[0])
-
-        # Tabela da contagem dos dados faltantes
-        print("Contagem de faltantes")
-        missing_counts = data[colunas_com_nan].isna().sum().sort_values(ascending=True)
-        print(missing_counts)
-        return missing_counts
-    else:
-        print("Contagem de faltantes")
-        missing_counts = data.isna().sum()
-        print(missing_counts)
-        return missing_counts
+
+    colunas = set(colunas)
+    if verificadas:
+        return lambda cabecalho: (
+            html.unescape(cabecalho) in colunas or _coluna_verificada(cabecalho)
+        )
+    return lambda cabecalho: html.unescape(cabecalho) in colunas
 
 
-def carrega_dados(caminho):
+def _coluna_verificada(cabecalho):
     """
-    Carrega e concatena múltiplos arquivos CSV de um diretório
+    Se a coluna entra no descarte de linhas com ausentes
+
+    São todas as colunas exceto COLUNAS_REMOVER, as mesmas do dropna() de
+    preparar_dataframe() numa carga completa.
+    """
+    from config import COLUNAS_REMOVER
+
+    return html.unescape(cabecalho) not in COLUNAS_REMOVER
+
+
+def _ler_csv(caminho_arquivo, colunas=None, todas=False, verificadas=False):
+    """
+    Lê um CSV semanal tentando diferentes encodings
 
     Args:
-        caminho: Caminho do diretório contendo os arquivos CSV
+        caminho_arquivo: Caminho do arquivo CSV
+        colunas: Projeção de colunas (None: todas exceto COLUNAS_REMOVER)
+        todas: Se True, lê todas as colunas, ignorando a projeção
+        verificadas: Se True, lê também as colunas verificadas por ausentes
 
     Returns:
-        DataFrame consolidado sem duplicatas
+        DataFrame com as colunas de data já convertidas
     """
-    lista_arquivos = os.listdir(caminho)
-    lista_arquivos = [arquivo for arquivo in lista_arquivos if arquivo.endswith(".csv")]
-    df_list = []
+    from config import COLUNAS_DATA
 
-    for arquivo in lista_arquivos:
-        caminho_arquivo = os.path.join(caminho, arquivo)
+    if todas:
+        usecols = None
+        datas = COLUNAS_DATA
+    else:
+        usecols = _seletor_colunas(colunas, verificadas)
+        datas = [coluna for coluna in COLUNAS_DATA if usecols(coluna)]
 
-        # Tentar diferentes encodings
+    for encoding in ("utf-8", "latin-1", "iso-8859-1"):
         try:
-            df_temp = pd.read_csv(
+            return pd.read_csv(
                 caminho_arquivo,
                 sep=",",
-                encoding="utf-8",
-                parse_dates=["Data Accesso", "Data Fine Contatto", "Data Nascita"],
+                encoding=encoding,
+                usecols=usecols,
+                parse_dates=datas,
                 dayfirst=True,
             )
         except UnicodeDecodeError:
-            try:
-                df_temp = pd.read_csv(
-                    caminho_arquivo,
-                    sep=",",
-                    encoding="latin-1",
-                    parse_dates=["Data Accesso", "Data Fine Contatto", "Data Nascita"],
-                    dayfirst=True,
-                )
-            except UnicodeDecodeError:
-                df_temp = pd.read_csv(
-                    caminho_arquivo,
-                    sep=",",
-                    encoding="iso-8859-1",
-                    parse_dates=["Data Accesso", "Data Fine Contatto", "Data Nascita"],
-                    dayfirst=True,
-                )
+            if encoding == "iso-8859-1":
+                raise
+
+
+def ler_arquivo_bruto(caminho_arquivo):
+    """
+    Lê um CSV semanal com todas as colunas, sem nenhuma limpeza
+
+    Returns:
+        DataFrame com os cabeçalhos sem entidades HTML e as datas convertidas
+    """
+    df = _ler_csv(caminho_arquivo, todas=True)
+    df.columns = [html.unescape(coluna) for coluna in df.columns]
+    return df
+
+
+def formato_cache():
+    """Formato do cache de arquivos: parquet se pyarrow estiver instalado"""
+    try:
+        import pyarrow  # noqa: F401
+
+        return "parquet"
+    except ImportError:
+        return "pickle"
+
+
+def _ler_com_cache(
+    caminho_arquivo, cache_dir, colunas=None, inicio=None, fim=None, verificadas=False
+):
+    """
+    Lê um CSV usando (e preenchendo) o cache de arquivos já processados
+
+    O nome da entrada inclui tamanho e data de modificação do CSV, de
+    modo que um arquivo alterado é lido novamente. A pasta da entrada
+    inclui um resumo do caminho absoluto do diretório do CSV: árvores de
+    dados com os mesmos nomes de arquivo (ex.: dados sintéticos do
+    benchmark e dados reais) não removem as entradas umas das outras. O cache guarda todas
+    as colunas; a projeção e o filtro de período são aplicados na
+    leitura (no parquet, só as colunas pedidas e as linhas do período
+    são lidas do disco).
+
+    Args:
+        caminho_arquivo: Caminho do arquivo CSV
+        cache_dir: Diretório do cache
+        colunas: Projeção de colunas (None: todas exceto COLUNAS_REMOVER)
+        inicio: Data inicial de 'Data Accesso' (inclusiva) ou None
+        fim: Data final de 'Data Accesso' (inclusiva) ou None
+        verificadas: Se True, lê também as colunas verificadas por ausentes
+
+    Returns:
+        DataFrame igual ao retornado por _ler_csv() (filtrado pelo período)
+    """
+    formato = formato_cache()
+    usecols = _seletor_colunas(colunas, verificadas)
+    info = os.stat(caminho_arquivo)
+    origem = os.path.dirname(os.path.realpath(caminho_arquivo))
+    resumo = hashlib.sha1(origem.encode("utf-8")).hexdigest()[:8]
+    pasta = os.path.join(cache_dir, f"{os.path.basename(origem)}-{resumo}")
+    base = os.path.splitext(os.path.basename(caminho_arquivo))[0]
+    entrada = os.path.join(
+        pasta, f"{base}-{info.st_size}-{info.st_mtime_ns}.{formato[:3]}"
+    )
+
+    if os.path.exists(entrada):
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+
+            filtros = []
+            if inicio is not None:
+                filtros.append(("Data Accesso", ">=", pd.Timestamp(inicio)))
+            if fim is not None:
+                filtros.append(("Data Accesso", "<=", pd.Timestamp(fim)))
+
+            cabecalhos = pq.read_schema(entrada).names
+            return pd.read_parquet(
+                entrada,
+                columns=[cabecalho for cabecalho in cabecalhos if usecols(cabecalho)],
+                filters=filtros or None,
+            )
+        df = filtrar_periodo(pd.read_pickle(entrada), inicio, fim)
+        return df[[cabecalho for cabecalho in df.columns if usecols(cabecalho)]]
+
+    df = _ler_csv(caminho_arquivo, todas=True)
+
+    # Remove versões anteriores do mesmo arquivo
+    os.makedirs(pasta, exist_ok=True)
+    for antigo in os.listdir(pasta):
+        if antigo.startswith(f"{base}-"):
+            os.remove(os.path.join(pasta, antigo))
+
+    if formato == "parquet":
+        df.to_parquet(entrada)
+    else:
+        df.to_pickle(entrada)
+
+    df = filtrar_periodo(df, inicio, fim)
+    return df[[cabecalho for cabecalho in df.columns if usecols(cabecalho)]]
+
+
+def _ler_arquivo(caminho_arquivo, colunas, cache_dir, inicio, fim, catalogo):
+    """
+    Lê um arquivo (com ou sem cache) e registra seu período no catálogo
+
+    Na primeira leitura de um arquivo o filtro de período não é aplicado
+    no leitor, para que o intervalo completo de datas seja registrado;
+    nas seguintes ele é levado até o leitor do cache.
+
+    Com projeção, as colunas verificadas por ausentes também são lidas e
+    as linhas com algum ausente nelas são descartadas aqui, como faria o
+    dropna() de uma carga completa: as linhas carregadas não dependem das
+    análises selecionadas.
+
+    Returns:
+        DataFrame com a projeção de colunas, filtrado pelo período
+    """
+    registrar = entrada_arquivo(catalogo, caminho_arquivo) is None
+    verificadas = colunas is not None
+
+    if cache_dir and not registrar:
+        df = _ler_com_cache(
+            caminho_arquivo, cache_dir, colunas, inicio, fim, verificadas
+        )
+    elif cache_dir:
+        df = _ler_com_cache(
+            caminho_arquivo, cache_dir, colunas, verificadas=verificadas
+        )
+    else:
+        df = _ler_csv(caminho_arquivo, colunas, verificadas=verificadas)
+
+    if registrar:
+        registrar_arquivo(catalogo, caminho_arquivo, df)
+
+    df = filtrar_periodo(df, inicio, fim)
+    if verificadas:
+        checadas = [
+            cabecalho for cabecalho in df.columns if _coluna_verificada(cabecalho)
+        ]
+        projecao = set(colunas)
+        df = df.loc[
+            df[checadas].notna().all(axis=1),
+            [
+                cabecalho
+                for cabecalho in df.columns
+                if html.unescape(cabecalho) in projecao
+            ],
+        ]
+
+    return df
+
+
+def _carregar_arquivos(arquivos, catalogo, colunas, cache_dir, workers, inicio, fim):
+    """
+    Lê, concatena e remove duplicatas de uma lista de arquivos CSV
+
+    Os arquivos que o catálogo sabe estarem fora do período não são lidos.
+
+    Returns:
+        DataFrame consolidado sem duplicatas
+    """
+    # Com todos os arquivos podados, um é lido só para obter o esquema
+    selecionados = podar_arquivos(catalogo, arquivos, inicio, fim) or arquivos[:1]
+    novos = [
+        arquivo
+        for arquivo in selecionados
+        if entrada_arquivo(catalogo, arquivo) is None
+    ]
+
+    ler = functools.partial(
+        _ler_arquivo,
+        colunas=colunas,
+        cache_dir=cache_dir,
+        inicio=inicio,
+        fim=fim,
+        catalogo=catalogo,
+    )
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            df_list = list(executor.map(ler, selecionados))
+    else:
+        df_list = [ler(arquivo) for arquivo in selecionados]
 
-        df_list.append(df_temp)
+    if novos:
+        salvar_catalogo(catalogo)
 
     df = pd.concat(df_list, ignore_index=True)
+
+    # Cabeçalhos exportados com entidades HTML (ex.: 'Et&agrave;' -> 'Età')
+    df.columns = [html.unescape(coluna) for coluna in df.columns]
+
     df_unicos = df.drop_duplicates(keep="first")
 
     return df_unicos
 
 
+@instrumentar
+def carrega_dados(
+    caminho, colunas=None, cache_dir=None, workers=1, inicio=None, fim=None
+):
+    """
+    Carrega e concatena múltiplos arquivos CSV de um diretório
+
+    Somente as colunas da projeção e as verificadas por ausentes são
+    lidas do arquivo (usecols); as verificadas são descartadas depois de
+    filtrar as linhas incompletas, de modo que a projeção não muda quais
+    linhas são carregadas. Com período definido, os arquivos que o
+    catálogo sabe estarem fora dele não são lidos.
+
+    Args:
+        caminho: Caminho do diretório contendo os arquivos CSV
+        colunas: Projeção de colunas, ex.: colunas_necessarias(["urgenza"])
+            (None: todas exceto COLUNAS_REMOVER)
+        cache_dir: Diretório para cache dos arquivos já processados (opcional)
+        workers: Número de threads de leitura
+        inicio: Data inicial de 'Data Accesso' (inclusiva) ou None
+        fim: Data final de 'Data Accesso' (inclusiva) ou None
+
+    Returns:
+        DataFrame consolidado sem duplicatas
+    """
+    lista_arquivos = os.listdir(caminho)
+    lista_arquivos = [
+        os.path.join(caminho, arquivo)
+        for arquivo in lista_arquivos
+        if arquivo.endswith(".csv")
+    ]
+
+    return _carregar_arquivos(
+        lista_arquivos, carregar_catalogo(), colunas, cache_dir, workers, inicio, fim
+    )
+
+
+@instrumentar
+def carrega_particoes(
+    anos=None,
+    inicio=None,
+    fim=None,
+    colunas=None,
+    cache_dir=None,
+    workers=1,
+    base=None,
+):
+    """
+    Carrega as partições do catálogo (todas ou um subconjunto)
+
+    As partições são descobertas sob CAMINHO_BASE; a remoção de
+    duplicatas vale para todo o conjunto carregado, inclusive entre anos.
+
+    Args:
+        anos: Anos das partições (ex.: ['2023']) ou None para todos
+        inicio: Data inicial de 'Data Accesso' (inclusiva) ou None
+        fim: Data final de 'Data Accesso' (inclusiva) ou None
+        colunas: Projeção de colunas (None: todas exceto COLUNAS_REMOVER)
+        cache_dir: Diretório para cache dos arquivos já processados (opcional)
+        workers: Número de threads de leitura
+        base: Diretório das partições (padrão: CAMINHO_BASE)
+
+    Returns:
+        DataFrame consolidado sem duplicatas
+    """
+    from config import CAMINHO_BASE
+
+    base = base or CAMINHO_BASE
+    catalogo = atualizar_catalogo(base, workers)
+    arquivos = selecionar_arquivos(catalogo, anos, base=base)
+
+    if not arquivos:
+        raise ValueError(f"Nenhum arquivo encontrado em {base} para os anos {anos}")
+
+    return _carregar_arquivos(
+        arquivos, catalogo, colunas, cache_dir, workers, inicio, fim
+    )
+
+
+def filtrar_periodo(df, inicio=None, fim=None):
+    """
+    Filtra o DataFrame por intervalo de 'Data Accesso' (inclusivo)
+
+    Args:
+        df: DataFrame com coluna 'Data Accesso'
+        inicio: Data inicial (str ou Timestamp) ou None
+        fim: Data final (str ou Timestamp) ou None
+
+    Returns:
+        DataFrame filtrado
+    """
+    mascara = np.ones(len(df), dtype=bool)
+    if inicio is not None:
+        mascara &= (df["Data Accesso"] >= pd.Timestamp(inicio)).to_numpy()
+    if fim is not None:
+        mascara &= (df["Data Accesso"] <= pd.Timestamp(fim)).to_numpy()
+
+    return df[mascara] if not mascara.all() else df
+
+
+def versao_dados(df):
+    """
+    Calcula um identificador curto do conteúdo do conjunto de dados
+
+    O hash considera todas as colunas (em ordem de nome) de todas as
+    linhas: qualquer valor alterado, linha adicionada ou removida muda a
+    versão. Ela é a chave dos caches derivados dos dados (banco de
+    consulta, réplicas bootstrap, modelos de previsão).
+
+    Args:
+        df: DataFrame (normalmente com 'Numero Scheda PS' e 'Data Accesso')
+
+    Returns:
+        str hexadecimal com 16 caracteres
+    """
+    hashes = pd.util.hash_pandas_object(df[sorted(df.columns)], index=False).to_numpy()
+
+    # Soma módulo 2^64: independente da ordem das linhas, sensível ao conteúdo
+    soma = int(hashes.sum(dtype=np.uint64))
+
+    return f"{(soma ^ len(df)) & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+@instrumentar
 def criar_subcategoria(df):
     """
     Cria coluna de subcategoria de pacientes baseado em número de atendimentos
@@ -170,29 +675,23 @@ def criar_subcategoria(df):
     Returns:
         DataFrame com coluna 'Sottogruppo Pazienti' adicionada
     """
-    # Contar quantos atendimentos cada Paziente teve
-    contagem_por_paciente = df.groupby("Paziente").size()
+    # Contar quantos atendimentos cada Paziente teve (sobre os IDs inteiros)
+    ids = ids_pacientes(df)
+    contagem_por_paciente = np.bincount(ids[ids >= 0])
 
-    # Criar categorias
-    def categorizar_paciente(num_atendimentos):
-        if num_atendimentos < 4:
-            return "Common user"
-        elif 4 <= num_atendimentos <= 5:
-            return "Frequent User"
-        elif 6 <= num_atendimentos <= 9:
-            return "Heavy User"
-        else:  # >= 10
-            return "High User"
+    # Categorias: < 4, 4-5, 6-9 e >= 10 atendimentos
+    subgrupos = np.array(["Common user", "Frequent User", "Heavy User", "High User"])
+    categoria_por_paciente = subgrupos[
+        np.searchsorted([4, 6, 10], contagem_por_paciente, side="right")
+    ]
 
-    # Mapear a categoria para cada paciente
-    categoria_por_paciente = contagem_por_paciente.apply(categorizar_paciente)
-
-    # Adicionar a coluna ao dataframe original
-    df["Sottogruppo Pazienti"] = df["Paziente"].map(categoria_por_paciente)
+    # Mapear a categoria para cada linha do dataframe original
+    df["Sottogruppo Pazienti"] = categoria_por_paciente[ids]
 
     return df
 
 
+@instrumentar
 def criar_categoria_urgenza(df):
     """
     Cria coluna de categoria de urgência mapeando os códigos
@@ -203,21 +702,59 @@ def criar_categoria_urgenza(df):
     Returns:
         DataFrame com coluna 'Categoria Urgenza' adicionada
     """
-    mapeamento_urgenza = {
-        1: "Bianca",
-        2: "Verde",
-        3: "Gialla",
-        4: "Arancione",
-        5: "Rossa",
-    }
+    from config import MAPEAMENTO_URGENZA
 
-    df["Categoria Urgenza"] = df["Urgenza"].map(mapeamento_urgenza)
+    df["Categoria Urgenza"] = df["Urgenza"].map(MAPEAMENTO_URGENZA)
     return df
 
 
+def _componentes_data(datas):
+    """
+    Ano, mês e dia de datas como inteiros (aritmética de datetime64)
+
+    Returns:
+        tuple (array de anos, array mês * 100 + dia, máscara de ausentes)
+    """
+    dias = np.asarray(datas, dtype="datetime64[D]")
+    meses = dias.astype("datetime64[M]")
+    anos = dias.astype("datetime64[Y]")
+
+    mes = (meses - anos.astype("datetime64[M]")).astype(np.int64)
+    dia = (dias - meses.astype("datetime64[D]")).astype(np.int64)
+    return anos.astype(np.int64) + 1970, mes * 100 + dia, np.isnat(dias)
+
+
+def idade_em_anos(nascimento, data):
+    """
+    Idade em anos completos numa data (vetorizado)
+
+    A idade é a diferença dos anos, menos 1 se o aniversário ainda não
+    chegou (mês e dia comparados como mês * 100 + dia); quem nasceu em 29
+    de fevereiro completa anos em 1º de março nos anos não bissextos.
+
+    Args:
+        nascimento: Series datetime com as datas de nascimento
+        data: Series datetime com as datas de referência
+
+    Returns:
+        Series com a idade (NaN se alguma das datas for ausente)
+    """
+    ano_nascimento, dia_nascimento, ausente_nascimento = _componentes_data(nascimento)
+    ano, dia, ausente = _componentes_data(data)
+
+    idade = ano - ano_nascimento - (dia < dia_nascimento)
+    ausente = ausente | ausente_nascimento
+    if ausente.any():
+        idade = np.where(ausente, np.nan, idade)
+
+    return pd.Series(idade, index=getattr(data, "index", None))
+
+
+@instrumentar
 def criar_features_temporais(df):
     """
     Cria features temporais a partir da coluna 'Data Accesso'
+    (dia da semana, hora, semana ISO e mês)
 
     Args:
         df: DataFrame com coluna 'Data Accesso' em formato datetime
@@ -225,11 +762,14 @@ def criar_features_temporais(df):
     Returns:
         DataFrame com features temporais adicionadas
     """
-    from config import MAPEAMENTO_DIAS
+    from config import MAPEAMENTO_DIAS, MESI_ITALIANI
 
     # Dia da semana
     df["Dia_Semana"] = df["Data Accesso"].dt.dayofweek.map(MAPEAMENTO_DIAS)
 
+    # Hora do dia (0 quando o arquivo traz apenas a data)
+    df["Ora"] = df["Data Accesso"].dt.hour
+
     # Semana do ano
     df["Settimana"] = df["Data Accesso"].dt.isocalendar().week
 
@@ -237,73 +777,215 @@ def criar_features_temporais(df):
     df["Mese_anno"] = df["Data Accesso"].dt.to_period("M")
 
     # Mês e ano em formato italiano
-    mesi_italiani = {
-        1: "Gennaio",
-        2: "Febbraio",
-        3: "Marzo",
-        4: "Aprile",
-        5: "Maggio",
-        6: "Giugno",
-        7: "Luglio",
-        8: "Agosto",
-        9: "Settembre",
-        10: "Ottobre",
-        11: "Novembre",
-        12: "Dicembre",
-    }
-
     df["Mese_anno_It"] = df["Data Accesso"].apply(
-        lambda x: f"{mesi_italiani[x.month]}/{x.year}"
+        lambda x: f"{MESI_ITALIANI[x.month]}/{x.year}"
     )
 
     return df
 
 
-def criar_faixa_etaria(df):
+def rotulos_faixas(limites):
+    """
+    Rótulos das faixas etárias no padrão de ORDEM_FAIXAS
+
+    Args:
+        limites: Idade mínima de cada faixa (ex.: [0, 18, 65])
+
+    Returns:
+        Lista de rótulos (ex.: ['< 18 anni', '18-64 anni', '> 64 anni'])
+    """
+    limites = [int(limite) for limite in limites]
+    if len(limites) < 2:
+        return [f">= {limites[0]} anni"] if limites else []
+
+    rotulos = [f"< {limites[1]} anni"]
+    rotulos += [
+        f"{inicio}-{fim - 1} anni" for inicio, fim in zip(limites[1:], limites[2:])
+    ]
+    rotulos.append(f"> {limites[-1] - 1} anni")
+    return rotulos
+
+
+def faixa_etaria(idade, limites=None, rotulos=None):
+    """
+    Faixa etária de cada idade como categoria ordenada
+
+    Cada faixa vai do seu limite (inclusivo) até o limite seguinte
+    (exclusivo), de modo que a idade 0 pertence à primeira faixa. A busca
+    binária nos limites é barata: outras divisões em faixas podem ser
+    calculadas sob demanda sobre a mesma coluna de idades.
+
+    Args:
+        idade: Series ou array com idades em anos completos
+        limites: Idade mínima de cada faixa, crescente (None: LIMITES_FAIXAS)
+        rotulos: Rótulo de cada faixa (None: ORDEM_FAIXAS com os limites
+            padrão ou rotulos_faixas(limites))
+
+    Returns:
+        pd.Categorical ordenado (NaN para idades ausentes ou abaixo do
+        primeiro limite)
+
+    Raises:
+        ValueError: se os limites não forem crescentes ou o número de
+            rótulos for diferente do número de faixas
+    """
+    from config import LIMITES_FAIXAS, ORDEM_FAIXAS
+
+    if limites is None:
+        limites = LIMITES_FAIXAS
+    if rotulos is None:
+        padrao = list(limites) == list(LIMITES_FAIXAS)
+        rotulos = ORDEM_FAIXAS if padrao else rotulos_faixas(limites)
+
+    limites = np.asarray(limites, dtype=np.float64)
+    if len(limites) == 0 or np.any(np.diff(limites) <= 0):
+        raise ValueError(f"Limites de faixas inválidos: {limites.tolist()}")
+    if len(rotulos) != len(limites):
+        raise ValueError(
+            f"São necessários {len(limites)} rótulos para as faixas, "
+            f"recebidos {len(rotulos)}"
+        )
+
+    valores = np.asarray(idade, dtype=np.float64)
+    codigos = np.searchsorted(limites, valores, side="right") - 1
+    codigos[np.isnan(valores)] = -1
+
+    return pd.Categorical.from_codes(codigos, categories=rotulos, ordered=True)
+
+
+@instrumentar
+def criar_faixa_etaria(df, limites=None, rotulos=None):
     """
-    Cria faixas etárias a partir da coluna 'Età'
+    Cria a idade no atendimento e as faixas etárias
+
+    A idade é calculada de 'Data Nascita' e 'Data Accesso' (coluna 'Età
+    Accesso'). A coluna 'Età' dos arquivos não serve para isso: ela
+    corresponde à idade na data da extração dos dados, não à idade no
+    atendimento (ver analise_geral.validar_idade). Sem as datas, as faixas
+    usam 'Età'.
 
     Args:
-        df: DataFrame com coluna 'Età'
+        df: DataFrame com 'Data Nascita' e 'Data Accesso' ou com 'Età'
+        limites: Idade mínima de cada faixa (ver faixa_etaria)
+        rotulos: Rótulo de cada faixa (ver faixa_etaria)
 
     Returns:
-        DataFrame com coluna 'Fascia d'età' adicionada
+        DataFrame com colunas 'Età Accesso' (se houver as datas) e
+        'Fascia d'età' adicionadas
     """
-    bins = [0, 14, 44, 64, 120]
-    labels = ["< 15 anni", "15-44 anni", "45-64 anni", "> 64 anni"]
+    if {"Data Nascita", "Data Accesso"}.issubset(df.columns):
+        df["Età Accesso"] = idade_em_anos(df["Data Nascita"], df["Data Accesso"])
+        idade = df["Età Accesso"]
+    else:
+        idade = df["Età"]
 
-    df["Fascia d'età"] = pd.cut(df["Età"], bins=bins, labels=labels)
+    df["Fascia d'età"] = pd.Series(
+        faixa_etaria(idade, limites, rotulos), index=df.index
+    )
 
     return df
 
 
-def preparar_dataframe(df):
+@instrumentar
+def preparar_dataframe(df, estrutura=False):
     """
     Aplica todas as transformações de preparação no DataFrame
 
+    Funciona com DataFrames carregados com projeção de colunas: cada
+    feature derivada só é criada se a coluna de origem estiver presente.
+
     Args:
         df: DataFrame bruto
+        estrutura: Se True, mantém COLUNA_ESTRUTURA ('Struttura') como
+            categórica para a análise por estrutura; ela não entra na
+            remoção de linhas com valores ausentes
 
     Returns:
         DataFrame preparado
     """
-    from config import COLUNAS_REMOVER
+    from config import COLUNA_ESTRUTURA, COLUNAS_REMOVER
 
     # Remover colunas desnecessárias
-    df = df.drop(columns=COLUNAS_REMOVER, errors="ignore")
+    manter = [COLUNA_ESTRUTURA] if estrutura else []
+    df = df.drop(
+        columns=[coluna for coluna in COLUNAS_REMOVER if coluna not in manter],
+        errors="ignore",
+    )
 
     # Remover linhas com valores ausentes
-    df = df.dropna()
+    df = df.dropna(subset=df.columns.difference(manter))
 
     # Alterar tipos de dados
     if "Sessione Ticket" in df.columns:
         df["Sessione Ticket"] = df["Sessione Ticket"].astype("Int64")
-    df["Numero Scheda PS"] = df["Numero Scheda PS"].astype("str")
-
-    # Criar features derivadas
-    df = criar_subcategoria(df)
-    df = criar_categoria_urgenza(df)
-    df = criar_features_temporais(df)
-    df = criar_faixa_etaria(df)
+    if "Numero Scheda PS" in df.columns:
+        df["Numero Scheda PS"] = df["Numero Scheda PS"].astype("str")
+    if COLUNA_ESTRUTURA in df.columns:
+        df[COLUNA_ESTRUTURA] = df[COLUNA_ESTRUTURA].astype("category")
+
+    # Criar features derivadas (só as que a projeção de colunas permite)
+    if "Paziente" in df.columns:
+        # Dicionário de pacientes: ID int32 para agrupar sobre inteiros
+        df["ID Paziente"] = codificar_pacientes(df["Paziente"])[0]
+        df = criar_subcategoria(df)
+    if "Urgenza" in df.columns:
+        df = criar_categoria_urgenza(df)
+    if "Data Accesso" in df.columns:
+        df = criar_features_temporais(df)
+    if "Età" in df.columns or {"Data Nascita", "Data Accesso"}.issubset(df.columns):
+        df = criar_faixa_etaria(df)
 
     return df
+
+
+def _tabela_para_exportar(tabela):
+    """Converte Series/DataFrame em DataFrame com nomes de colunas em texto"""
+    if isinstance(tabela, pd.Series):
+        tabela = tabela.to_frame(name=tabela.name or "valor")
+    tabela = tabela.copy()
+    if isinstance(tabela.columns, pd.MultiIndex):
+        tabela.columns = [" | ".join(map(str, nivel)) for nivel in tabela.columns]
+    else:
+        tabela.columns = [str(coluna) for coluna in tabela.columns]
+    return tabela
+
+
+def exportar_tabelas(tabelas, diretorio, formato="json"):
+    """
+    Grava tabelas de resultados em formato legível por máquina
+
+    Args:
+        tabelas: dict {analise: {nome: DataFrame ou Series}}
+        diretorio: Diretório de saída
+        formato: 'json' (um arquivo por análise) ou 'parquet' (um por tabela)
+
+    Returns:
+        Lista com os caminhos dos arquivos gravados
+    """
+    if formato not in ("json", "parquet"):
+        raise ValueError(f"Formato inválido: {formato}. Use 'json' ou 'parquet'")
+
+    os.makedirs(diretorio, exist_ok=True)
+    arquivos = []
+
+    for analise, tabelas_analise in tabelas.items():
+        if formato == "json":
+            documento = {
+                nome: json.loads(
+                    _tabela_para_exportar(tabela).to_json(
+                        orient="split", date_format="iso"
+                    )
+                )
+                for nome, tabela in tabelas_analise.items()
+            }
+            caminho = os.path.join(diretorio, f"{analise}.json")
+            with open(caminho, "w", encoding="utf-8") as arquivo:
+                json.dump(documento, arquivo, indent=2, ensure_ascii=False)
+            arquivos.append(caminho)
+        else:
+            for nome, tabela in tabelas_analise.items():
+                caminho = os.path.join(diretorio, f"{analise}__{nome}.parquet")
+                _tabela_para_exportar(tabela).to_parquet(caminho)
+                arquivos.append(caminho)
+
+    return arquivos